@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Back up and restore the worlds of a FabricMC server, the command run by bin/backup.sh and the backup timer.
+
+The role installs the module_utils it needs in the lib directory next to bin, they're
+imported as the ansible.module_utils package they're written for, without Ansible itself
+being installed on the host.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import types
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+# Only the role's helpers are needed from that package, not the rest of Ansible
+for package_name, package_path in (('ansible', []), ('ansible.module_utils', [LIB_DIR])):
+    sys.modules[package_name] = types.ModuleType(package_name)
+    sys.modules[package_name].__path__ = package_path
+
+from ansible.module_utils.fabricmc_backup import (
+    ZSTANDARD_IMPORT_ERROR, backup_lock, restore, run_backup, snapshot_ids
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Back up and restore the worlds of a FabricMC server')
+    parser.add_argument('--install-dir', required=True, help='Install directory of the server')
+    parser.add_argument('--backup-dir', required=True, help='Directory of the objects and snapshots')
+    parser.add_argument('--keep', type=int, default=7, help='Number of snapshots kept after a backup, 0 keeps all')
+    parser.add_argument('--level', type=int, default=3, help='zstd compression level of new objects')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backup_parser = subparsers.add_parser('backup', help='Write a snapshot of the worlds and prune old ones')
+    backup_parser.add_argument('worlds', nargs='*', help='Worlds to back up, defaults to all of them')
+    subparsers.add_parser('list', help='List the snapshots, oldest first')
+    restore_parser = subparsers.add_parser('restore', help='Restore the worlds of a snapshot, the server must be stopped')
+    restore_parser.add_argument('snapshot', help='Snapshot id or latest')
+    restore_parser.add_argument('worlds', nargs='*', help='Worlds to restore, defaults to all worlds of the snapshot')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(format='[fabric-backup] [%(levelname)s] [%(asctime)s] %(message)s', datefmt='%Y%m%d%H%M%S',
+                        level=logging.INFO)
+    logger = logging.getLogger('fabric_backup')
+    if ZSTANDARD_IMPORT_ERROR:
+        sys.exit(f"The zstandard Python library is required:\n{ZSTANDARD_IMPORT_ERROR}")
+    try:
+        if args.command == 'backup':
+            print(json.dumps(run_backup(args.install_dir, args.backup_dir, args.keep, logger, args.worlds, args.level)))
+        elif args.command == 'list':
+            for snapshot_id in snapshot_ids(args.backup_dir):
+                print(snapshot_id)
+        else:
+            with backup_lock(args.backup_dir):
+                restore(args.backup_dir, args.snapshot, os.path.join(args.install_dir, 'workspace'), logger,
+                        args.worlds)
+    except Exception as error:
+        logger.error(str(error))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Export the performance metrics of a FabricMC server to Prometheus, the command run by the exporter service.
+
+The role installs the module_utils it needs in the lib directory next to bin, they're
+imported as the ansible.module_utils package they're written for, without Ansible itself
+being installed on the host.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import types
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+# Only the role's helpers are needed from that package, not the rest of Ansible
+for package_name, package_path in (('ansible', []), ('ansible.module_utils', [LIB_DIR])):
+    sys.modules[package_name] = types.ModuleType(package_name)
+    sys.modules[package_name].__path__ = package_path
+
+from ansible.module_utils.fabricmc_exporter import Exporter, serve, write_atomically
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export the performance metrics of a FabricMC server to Prometheus')
+    parser.add_argument('--install-dir', required=True, help='Install directory of the server')
+    parser.add_argument('--server', required=True, help='Value of the server label of every metric')
+    parser.add_argument('--state-file', required=True, help='File saving the log position and counters')
+    parser.add_argument('--textfile', help='Prometheus textfile collector file to write the metrics to')
+    parser.add_argument('--listen', help='host:port to serve the metrics on /metrics')
+    parser.add_argument('--interval', type=float, default=15, help='Seconds between collections')
+    parser.add_argument('--no-rcon', action='store_true', help='Only export the metrics of the log')
+    parser.add_argument('--once', action='store_true', help='Collect once, write the textfile or print the metrics')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(format='[fabric-exporter] [%(levelname)s] [%(asctime)s] %(message)s', datefmt='%Y%m%d%H%M%S',
+                        level=logging.INFO)
+    logger = logging.getLogger('fabric_exporter')
+    exporter = Exporter(args.install_dir, args.server, args.state_file, logger, not args.no_rcon)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    if args.listen and not args.once:
+        serve(exporter, args.listen)
+        logger.info(f"Serving metrics on http://{args.listen}/metrics")
+    try:
+        while True:
+            metrics = exporter.collect()
+            if args.textfile:
+                write_atomically(args.textfile, metrics)
+            elif args.once:
+                sys.stdout.write(metrics)
+            if args.once or stopping.wait(args.interval):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.close()
+
+
+if __name__ == '__main__':
+    main()
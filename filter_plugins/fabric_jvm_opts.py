@@ -0,0 +1,131 @@
+DOCUMENTATION = r'''
+---
+name: fabric_jvm_opts
+short_description: Compute the JVM options of a FabricMC server from the host's memory and CPUs
+description:
+  - Sizes the heap from the host's memory, leaving headroom for the OS and for the off-heap memory of
+    every instance, with -Xms equal to -Xmx, and sets the GC flags and thread counts of the profile.
+  - C(g1-aikar) uses Aikar's G1 flags, C(zgc) uses generational ZGC, which needs -XX:+ZGenerational up to
+    Java 22 and is the only mode from Java 23 on, where the flag is deprecated then obsolete, C(auto) picks ZGC for large heaps
+    on hosts with many CPUs and G1 otherwise, C(custom) returns java_opts unchanged.
+options:
+  _input:
+    description: JVM profile, one of auto, g1-aikar, zgc or custom
+    required: true
+  memtotal_mb:
+    description: Host memory in MB, e.g. the ansible_memtotal_mb fact, required unless the profile is custom
+  vcpus:
+    description: Host vCPUs, e.g. the ansible_processor_vcpus fact, required unless the profile is custom
+  instances:
+    description: Number of server instances sharing the host
+    default: 1
+  java_opts:
+    description: Options returned as they are by the custom profile
+    default: ''
+  extra_opts:
+    description: Options appended to the computed ones
+    default: ''
+  large_pages:
+    description: Use transparent huge pages, auto enables them for heaps of 8 GB and more
+    default: auto
+  java_version:
+    description: Major version of the server's Java, -XX:+ZGenerational is only added for 22 and older
+    default: null
+'''
+
+EXAMPLES = r'''
+- name: Show JVM options
+  ansible.builtin.debug:
+    msg: "{{ 'auto' | fabric_jvm_opts(ansible_memtotal_mb, ansible_processor_vcpus) }}"
+'''
+
+RETURN = r'''
+_value:
+  description: JVM options to pass to java before -jar
+  type: str
+'''
+
+from ansible.errors import AnsibleFilterError
+
+PROFILES = ['auto', 'g1-aikar', 'zgc', 'custom']
+MIN_HEAP_MB = 512
+HEAP_ALIGNMENT_MB = 256
+LARGE_PAGES_MIN_HEAP_MB = 8192
+ZGC_MIN_HEAP_MB = 16384
+ZGC_MIN_VCPUS = 8
+
+# Aikar's flags, https://docs.papermc.io/paper/aikars-flags, the G1 sizes change for heaps of 12 GB and more
+G1_AIKAR_OPTS = [
+    '-XX:+UseG1GC', '-XX:+ParallelRefProcEnabled', '-XX:MaxGCPauseMillis=200', '-XX:+UnlockExperimentalVMOptions',
+    '-XX:+DisableExplicitGC', '-XX:G1HeapWastePercent=5', '-XX:G1MixedGCCountTarget=4',
+    '-XX:G1MixedGCLiveThresholdPercent=90', '-XX:G1RSetUpdatingPauseTimePercent=5', '-XX:SurvivorRatio=32',
+    '-XX:+PerfDisableSharedMem', '-XX:MaxTenuringThreshold=1',
+]
+G1_SMALL_HEAP_OPTS = [
+    '-XX:G1NewSizePercent=30', '-XX:G1MaxNewSizePercent=40', '-XX:G1HeapRegionSize=8M', '-XX:G1ReservePercent=20',
+    '-XX:InitiatingHeapOccupancyPercent=15',
+]
+G1_LARGE_HEAP_OPTS = [
+    '-XX:G1NewSizePercent=40', '-XX:G1MaxNewSizePercent=50', '-XX:G1HeapRegionSize=16M', '-XX:G1ReservePercent=15',
+    '-XX:InitiatingHeapOccupancyPercent=20',
+]
+ZGC_OPTS = ['-XX:+UseZGC', '-XX:+DisableExplicitGC', '-XX:+PerfDisableSharedMem']
+# Generational ZGC is opt-in up to Java 22, the default from 23 on and the only mode from 24 on
+ZGC_GENERATIONAL_OPT = '-XX:+ZGenerational'
+ZGC_GENERATIONAL_MAX_JAVA_VERSION = 22
+
+
+def heap_size(memtotal_mb, instances):
+    """Return the heap of every instance in MB, aligned down to 256 MB.
+
+    The OS keeps a tenth of the memory, at least 1 GB, and every instance keeps
+    15% of its share, at least 512 MB, for metaspace, code cache, thread stacks
+    and direct buffers.
+    """
+    share_mb = (memtotal_mb - max(1024, memtotal_mb // 10)) // instances
+    heap_mb = (share_mb - max(512, share_mb * 15 // 100)) // HEAP_ALIGNMENT_MB * HEAP_ALIGNMENT_MB
+    if heap_mb < MIN_HEAP_MB:
+        raise AnsibleFilterError(
+            f"{memtotal_mb} MB of memory leaves less than {MIN_HEAP_MB} MB of heap for each of {instances} instance(s)"
+        )
+    return heap_mb
+
+
+def jvm_opts(profile, memtotal_mb=None, vcpus=None, instances=1, java_opts='', extra_opts='', large_pages='auto',
+             java_version=None):
+    """Return the JVM options of the profile for a host with memtotal_mb of memory and vcpus shared by instances."""
+    if profile not in PROFILES:
+        raise AnsibleFilterError(f"Unknown JVM profile '{profile}', expected one of {', '.join(PROFILES)}")
+    if profile == 'custom':
+        return java_opts
+    if not memtotal_mb or not vcpus:
+        raise AnsibleFilterError(
+            f"JVM profile '{profile}' needs the host's memory and vCPUs, gather the hardware facts or use the custom profile"
+        )
+    memtotal_mb, vcpus, instances = int(memtotal_mb), int(vcpus), max(1, int(instances))
+    heap_mb = heap_size(memtotal_mb, instances)
+    gc_threads = max(1, vcpus // instances)
+    if profile == 'auto':
+        profile = 'zgc' if heap_mb >= ZGC_MIN_HEAP_MB and gc_threads >= ZGC_MIN_VCPUS else 'g1-aikar'
+
+    opts = [f"-Xms{heap_mb}M", f"-Xmx{heap_mb}M", '-XX:+AlwaysPreTouch']
+    if profile == 'zgc':
+        opts += ZGC_OPTS
+        if java_version and int(java_version) <= ZGC_GENERATIONAL_MAX_JAVA_VERSION:
+            opts.insert(opts.index('-XX:+UseZGC') + 1, ZGC_GENERATIONAL_OPT)
+    else:
+        opts += G1_AIKAR_OPTS + (G1_LARGE_HEAP_OPTS if heap_mb >= 12288 else G1_SMALL_HEAP_OPTS)
+    # Instances sharing the host split its CPUs instead of each sizing its GC for all of them
+    opts += [f"-XX:ParallelGCThreads={gc_threads}", f"-XX:ConcGCThreads={max(1, (gc_threads + 2) // 4)}"]
+    large_pages = str(large_pages).lower()
+    if large_pages == 'true' or (large_pages == 'auto' and heap_mb >= LARGE_PAGES_MIN_HEAP_MB):
+        opts.append('-XX:+UseTransparentHugePages')
+    if extra_opts:
+        opts.append(extra_opts)
+    return ' '.join(opts)
+
+
+class FilterModule:
+
+    def filters(self):
+        return {'fabric_jvm_opts': jvm_opts}
@@ -0,0 +1,100 @@
+DOCUMENTATION = r'''
+---
+name: fabric_server_perf_properties
+short_description: Compute the performance related server properties of a FabricMC server from the host's vCPUs
+description:
+  - Returns view-distance, simulation-distance, network-compression-threshold, sync-chunk-writes, max-tick-time
+    and entity-broadcast-range-percentage, the distances grow with the vCPUs of every instance up to a cap.
+  - C(low-latency) keeps the simulation distance short so that ticks stay fast for a few players, C(balanced)
+    grows both distances, C(high-density) trades distances and entity tracking for more players per host,
+    C(none) returns no properties.
+options:
+  _input:
+    description: Performance profile, one of none, low-latency, balanced or high-density
+    required: true
+  vcpus:
+    description: Host vCPUs, e.g. the ansible_processor_vcpus fact, required unless the profile is none
+  instances:
+    description: Number of server instances sharing the host
+    default: 1
+'''
+
+EXAMPLES = r'''
+- name: Show server properties
+  ansible.builtin.debug:
+    msg: "{{ 'low-latency' | fabric_server_perf_properties(ansible_processor_vcpus) | combine(fabmc_server_properties) }}"
+'''
+
+RETURN = r'''
+_value:
+  description: Server properties of the profile
+  type: dict
+'''
+
+from ansible.errors import AnsibleFilterError
+
+# Minecraft clamps both distances to [3, 32]
+MIN_DISTANCE = 3
+
+# Distances are (base with 1 vCPU, added per extra vCPU, cap)
+PERF_PROFILES = {
+    'low-latency': {
+        'view_distance': (6, 1, 12),
+        'simulation_distance': (4, 0.5, 6),
+        # Small packets are sent as they are instead of spending CPU time on compressing them
+        'network_compression_threshold': 512,
+        'max_tick_time': 60000,
+        'entity_broadcast_range_percentage': 100,
+    },
+    'balanced': {
+        'view_distance': (6, 1, 12),
+        'simulation_distance': (5, 1, 10),
+        'network_compression_threshold': 256,
+        'max_tick_time': 60000,
+        'entity_broadcast_range_percentage': 100,
+    },
+    'high-density': {
+        'view_distance': (4, 0.5, 8),
+        'simulation_distance': (3, 0.5, 6),
+        'network_compression_threshold': 256,
+        # Leave the watchdog more slack before it kills a loaded server
+        'max_tick_time': 120000,
+        'entity_broadcast_range_percentage': 60,
+    },
+}
+PROFILES = ['none'] + list(PERF_PROFILES)
+
+
+def scaled_distance(distance, vcpus):
+    """Return the distance of vcpus from its (base, per vCPU, cap) tuple."""
+    base, per_vcpu, cap = distance
+    return max(MIN_DISTANCE, min(cap, int(base + per_vcpu * (vcpus - 1))))
+
+
+def perf_properties(profile, vcpus=None, instances=1):
+    """Return the server properties of the profile for a host with vcpus shared by instances."""
+    if profile not in PROFILES:
+        raise AnsibleFilterError(f"Unknown server performance profile '{profile}', expected one of {', '.join(PROFILES)}")
+    if profile == 'none':
+        return {}
+    if not vcpus:
+        raise AnsibleFilterError(
+            f"Server performance profile '{profile}' needs the host's vCPUs, gather the hardware facts or use the none profile"
+        )
+    vcpus = max(1, int(vcpus) // max(1, int(instances)))
+    preset = PERF_PROFILES[profile]
+    return {
+        'view-distance': scaled_distance(preset['view_distance'], vcpus),
+        'simulation-distance': scaled_distance(preset['simulation_distance'], vcpus),
+        'network-compression-threshold': preset['network_compression_threshold'],
+        # Chunks are written off the server thread instead of blocking ticks on fsync
+        'sync-chunk-writes': False,
+        'max-tick-time': preset['max_tick_time'],
+        'entity-broadcast-range-percentage': preset['entity_broadcast_range_percentage'],
+    }
+
+
+class FilterModule:
+
+    def filters(self):
+        return {'fabric_server_perf_properties': perf_properties}
@@ -0,0 +1,78 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_backup
+short_description: Back up and restore the worlds of a FabricMC server with incremental deduplicated snapshots
+description:
+  - C(present) writes a snapshot of the worlds to backup_dir, files are stored zstd compressed by content hash
+    so unchanged region files cost nothing, then removes all but the keep most recent snapshots. It runs with
+    idle CPU and I/O priority.
+  - When the server is running, autosaves are turned off and the worlds flushed with save-all flush over RCON
+    during the snapshot, RCON must then be enabled in server.properties with rcon.password.
+  - C(restored) replaces the worlds with the ones of a snapshot, the server must be stopped.
+requirements:
+  - conflog
+  - zstandard
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+from ansible.module_utils.fabricmc_backup import (
+    ZSTANDARD_IMPORT_ERROR, backup_lock, find_worlds, load_snapshot, restore, run_backup
+)
+import os
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-backup] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_backup')
+
+
+def main():
+
+    module_args = dict(
+        install_dir=dict(type="str", required=True),
+        backup_dir=dict(type="str", required=True),
+        worlds=dict(type="list", elements="str", required=False, default=[]),
+        keep=dict(type="int", required=False, default=7),
+        level=dict(type="int", required=False, default=3),
+        state=dict(type="str", required=False, default="present", choices=["present", "restored"]),
+        snapshot=dict(type="str", required=False, default="latest"),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    install_dir = module.params["install_dir"]
+    backup_dir = module.params["backup_dir"]
+    worlds = module.params["worlds"]
+    keep = module.params["keep"]
+    level = module.params["level"]
+    state = module.params["state"]
+    snapshot = module.params["snapshot"]
+
+    if ZSTANDARD_IMPORT_ERROR:
+        module.fail_json(msg=missing_required_lib("zstandard"), exception=ZSTANDARD_IMPORT_ERROR)
+
+    workspace_dir = os.path.join(install_dir, "workspace")
+    try:
+        if state == "restored":
+            manifest = load_snapshot(backup_dir, snapshot)
+            result = {"changed": True, "snapshot": manifest["id"], "worlds": worlds or manifest["worlds"]}
+            if not module.check_mode:
+                with backup_lock(backup_dir):
+                    restore(backup_dir, manifest["id"], workspace_dir, logger, worlds)
+        elif module.check_mode:
+            result = {"changed": True, "worlds": worlds or find_worlds(workspace_dir)}
+        else:
+            result = dict(run_backup(install_dir, backup_dir, keep, logger, worlds, level, module.warn), changed=True)
+    except Exception as error:
+        module.fail_json(msg=str(error))
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
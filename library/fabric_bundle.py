@@ -0,0 +1,139 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_bundle
+short_description: Export the launcher, Fabric API, mods and datapacks resolved on the Ansible controller as an offline bundle, or extract it there
+requirements:
+  - conflog
+  - zstandard
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+from ansible.module_utils.fabricmc_bundle import (
+    KIND_DIRS, ZSTANDARD_IMPORT_ERROR, bundle_entry, check_manifest, new_manifest, read_manifest, select_entries,
+    write_bundle
+)
+from ansible.module_utils.fabricmc_files import HashIndex, hash_files
+from ansible.module_utils.fabricmc_install import reconcile_files
+import os
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-bundle] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_bundle')
+
+
+def collect_entries(src_dir, kind, files):
+    """Return the bundle entries of files found under the kind's directory of src_dir, with their sha1 and size."""
+    dir_path = os.path.join(src_dir, KIND_DIRS[kind])
+    hash_index = HashIndex(dir_path)
+    file_paths = [os.path.join(dir_path, file['filename']) for file in files]
+    for file_path in file_paths:
+        if not os.path.isfile(file_path):
+            raise Exception(f"File '{os.path.basename(file_path)}' was not found in '{dir_path}'")
+    digests = hash_files(hash_index, file_paths, ['sha1'], os.cpu_count() or 1)
+    entries = []
+    for file, file_path, file_digests in zip(files, file_paths, digests):
+        sha1 = file_digests['sha1']
+        if file.get('sha1') and file['sha1'] != sha1:
+            raise Exception(f"Checksum mismatch for '{file_path}': expected sha1={file['sha1']}, got {sha1}")
+        entries.append(bundle_entry(kind, file['filename'], sha1, os.path.getsize(file_path), file.get('slug')))
+    hash_index.save()
+    return entries
+
+
+def extract_bundle(path, dest_dir, minecraft_version, check_mode=False):
+    """Extract every entry of the bundle at path missing from the kind's directory of dest_dir.
+
+    Returns the manifest, pushed to hosts on its own so they only receive the
+    extracted files they don't already have, and the paths of the extracted entries.
+    """
+    manifest = read_manifest(path)
+    check_manifest(path, manifest, minecraft_version)
+    extracted = []
+    for kind, kind_dir in KIND_DIRS.items():
+        result = reconcile_files(
+            os.path.join(dest_dir, kind_dir), select_entries(path, manifest, kind), logger, bundle=path,
+            check_mode=check_mode
+        )
+        extracted += [f"{kind_dir}/{filename}" for filename in result["added"] + result.get("replaced", [])]
+    return manifest, extracted
+
+
+def main():
+
+    file_options = dict(
+        filename=dict(type="str", required=True),
+        sha1=dict(type="str", required=False),
+        slug=dict(type="str", required=False),
+    )
+    module_args = dict(
+        path=dict(type="path", required=True),
+        src_dir=dict(type="path", required=True),
+        minecraft_version=dict(type="str", required=True),
+        fabric_loader_version=dict(type="str", required=True),
+        installer_version=dict(type="str", required=True),
+        mods=dict(type="list", elements="dict", required=False, default=[], options=file_options),
+        datapacks=dict(type="list", elements="dict", required=False, default=[], options=file_options),
+        compression_level=dict(type="int", required=False, default=3),
+        state=dict(type="str", required=False, default="exported", choices=["exported", "extracted"]),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    if ZSTANDARD_IMPORT_ERROR:
+        module.fail_json(msg=missing_required_lib("zstandard"), exception=ZSTANDARD_IMPORT_ERROR)
+
+    path = module.params["path"]
+    src_dir = module.params["src_dir"]
+    minecraft_version = module.params["minecraft_version"]
+    fabric_loader_version = module.params["fabric_loader_version"]
+    installer_version = module.params["installer_version"]
+    mods = module.params["mods"]
+    datapacks = module.params["datapacks"]
+    compression_level = module.params["compression_level"]
+    state = module.params["state"]
+
+    if state == "extracted":
+        logger.info(f"Extracting bundle '{path}' into '{src_dir}'...")
+        manifest, extracted = extract_bundle(path, src_dir, minecraft_version, module.check_mode)
+        module.exit_json(changed=bool(extracted), path=path, manifest=manifest, extracted=extracted)
+
+    logger.info(f"Exporting bundle '{path}' for Minecraft version '{minecraft_version}' from '{src_dir}'...")
+
+    launcher = {'filename': f"minecraft_server_launcher.{minecraft_version}-{fabric_loader_version}-{installer_version}.jar"}
+    entries = collect_entries(src_dir, 'launcher', [launcher])
+    entries += collect_entries(src_dir, 'mods', mods)
+    entries += collect_entries(src_dir, 'datapacks', datapacks)
+    manifest = new_manifest(minecraft_version, fabric_loader_version, installer_version, entries)
+
+    # Identical manifests mean identical content, the bundle is only rewritten when the resolved set changed
+    changed = True
+    if os.path.isfile(path):
+        try:
+            changed = read_manifest(path) != manifest
+        except Exception as error:
+            logger.warning(f"Existing bundle '{path}' is not readable, exporting it again: {error}")
+
+    if changed and not module.check_mode:
+        src_paths = {
+            entry['path']: os.path.join(src_dir, KIND_DIRS[entry['kind']], entry['filename']) for entry in entries
+        }
+        write_bundle(path, manifest, src_paths, compression_level)
+        logger.info(f"Exported '{len(entries)}' file(s) into bundle '{path}'")
+
+    module.exit_json(
+        changed=changed,
+        path=path,
+        entries=len(entries),
+        size=sum(entry['size'] for entry in entries),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_cds
+short_description: Generate the AppCDS archive of a FabricMC server with a training run
+description:
+  - The archive is keyed on a digest of the Java version, the server launcher jar and the mod files, Fabric API
+    included, and is only regenerated by a training run when that digest changes.
+  - The training run boots the server in its workspace with -XX:ArchiveClassesAtExit and stops it once it's done,
+    the server must not be running.
+  - The current archive is always reachable through the <install_dir>/cds/fabricmc.jsa symlink, to be passed to
+    -XX:SharedArchiveFile.
+requirements:
+  - conflog
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_files import HashIndex, list_files, swap_symlink
+from ansible.module_utils.fabricmc_server import boot_server
+import hashlib
+import json
+import os
+import shlex
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-cds] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_cds')
+
+ARCHIVE_LINK_NAME = 'fabricmc.jsa'
+BOOT_TIMES_FILENAME = 'boot-times.json'
+
+
+def archive_key(java_version, launcher_path, mods_dir, check_mode):
+    """Return the digest of the Java version, the launcher jar and the mod files the archive is valid for."""
+    launcher_index = HashIndex(os.path.dirname(launcher_path))
+    mods_index = HashIndex(mods_dir)
+    files = [[os.path.basename(launcher_path), launcher_index.digest(launcher_path, 'sha1')]]
+    files += [[os.path.basename(path), mods_index.digest(path, 'sha1')] for path in list_files(mods_dir, '.jar')]
+    if not check_mode:
+        launcher_index.save()
+        mods_index.save()
+    return hashlib.sha256(json.dumps([java_version, files]).encode()).hexdigest()
+
+
+def main():
+
+    module_args = dict(
+        install_dir=dict(type="str", required=True),
+        java=dict(type="str", required=False, default="java"),
+        java_opts=dict(type="str", required=False, default=""),
+        timeout=dict(type="int", required=False, default=600),
+        measure=dict(type="bool", required=False, default=False),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    install_dir = module.params["install_dir"]
+    java = module.params["java"]
+    java_opts = module.params["java_opts"]
+    timeout = module.params["timeout"]
+    measure = module.params["measure"]
+
+    bin_dir = os.path.join(install_dir, "bin")
+    workspace_dir = os.path.join(install_dir, "workspace")
+    cds_dir = os.path.join(install_dir, "cds")
+    launcher_link_path = os.path.join(bin_dir, "minecraft_server_launcher.jar")
+    launcher_path = os.path.realpath(launcher_link_path)
+    if not os.path.isfile(launcher_path):
+        module.fail_json(msg=f"Launcher jar file '{launcher_path}' was not found")
+
+    # Archives only map into the exact JVM build which created them
+    rc, stdout, stderr = module.run_command([java, "-version"], check_rc=True)
+    key = archive_key((stdout + stderr).strip(), launcher_path, os.path.join(workspace_dir, "mods"), module.check_mode)
+    archive_path = os.path.join(cds_dir, f"fabricmc-{key[:16]}.jsa")
+    link_path = os.path.join(cds_dir, ARCHIVE_LINK_NAME)
+    changed = not os.path.isfile(archive_path) or os.path.realpath(link_path) != archive_path
+    result = {"changed": changed, "archive": archive_path, "key": key}
+    if module.check_mode:
+        module.exit_json(**result)
+
+    # The JVM only maps an archive for the class path it was created with, i.e. the one of start.sh
+    command = [java] + shlex.split(java_opts)
+    launcher_args = ["-jar", launcher_link_path, "nogui"]
+    if not os.path.isfile(archive_path):
+        logger.info(f"Training AppCDS archive '{archive_path}' with a server boot...")
+        os.makedirs(cds_dir, mode=0o755, exist_ok=True)
+        part_path = f"{archive_path}.part"
+        try:
+            result["training"] = boot_server(
+                command + [f"-XX:ArchiveClassesAtExit={part_path}"] + launcher_args, workspace_dir, timeout, logger
+            )
+        except Exception as error:
+            module.fail_json(msg=f"AppCDS training run failed: {error}", **result)
+        if not os.path.isfile(part_path):
+            module.fail_json(msg=f"AppCDS training run did not write archive '{part_path}'", **result)
+        os.replace(part_path, archive_path)
+    swap_symlink(archive_path, link_path)
+    for filename in os.listdir(cds_dir):
+        if filename.startswith("fabricmc-") and os.path.join(cds_dir, filename) != archive_path:
+            logger.info(f"Removing outdated AppCDS archive '{filename}'")
+            os.remove(os.path.join(cds_dir, filename))
+
+    if measure:
+        try:
+            boot_times = {
+                "without_archive": boot_server(command + launcher_args, workspace_dir, timeout, logger),
+                "with_archive": boot_server(
+                    command + [f"-XX:SharedArchiveFile={link_path}"] + launcher_args, workspace_dir, timeout, logger
+                ),
+            }
+        except Exception as error:
+            module.fail_json(msg=f"AppCDS boot time measurement failed: {error}", **result)
+        with open(os.path.join(cds_dir, BOOT_TIMES_FILENAME), 'w') as boot_times_file:
+            json.dump(dict(boot_times, archive=archive_path), boot_times_file, indent=2)
+        result["boot_times"] = boot_times
+
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
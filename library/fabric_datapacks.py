@@ -6,22 +6,15 @@ module: fabric_datapacks
 short_description: Install Fabric datapacks
 requirements:
   - conflog
-  - modrinth-api-wrapper
   - requests
 '''
 
 from conflog import Conflog
 from ansible.module_utils.basic import AnsibleModule
-import hashlib
+from ansible.module_utils.fabricmc_install import Installer
+from ansible.module_utils.fabricmc_metrics import write_metrics
+from ansible.module_utils.fabricmc_modrinth import CACHE_MODES
 import os
-import requests
-import sys
-import time
-
-if sys.version_info[:2] == (3, 8):
-    from modrinth_api_wrapper_pakkunbot import Client
-else:
-    from modrinth_api_wrapper import Client
 
 conf_dict={
     'handlers': 'stream',
@@ -33,152 +26,105 @@ cfl = Conflog(conf_dict=conf_dict)
 logger = cfl.get_logger('fabric_datapacks')
 
 
-def get_expected_hash(file_info):
-    """Return expected checksum tuple (algorithm, value) from Modrinth file metadata."""
-    hashes = getattr(file_info, 'hashes', None)
-    if not hashes:
-        return None, None
-
-    if isinstance(hashes, dict):
-        hash_map = hashes
-    else:
-        hash_map = {}
-        for algorithm in ('sha1', 'sha512', 'sha256'):
-            hash_value = getattr(hashes, algorithm, None)
-            if hash_value:
-                hash_map[algorithm] = hash_value
-
-    for algorithm in ('sha1', 'sha512', 'sha256'):
-        hash_value = hash_map.get(algorithm)
-        if hash_value:
-            return algorithm, hash_value
-
-    return None, None
-
-
-def calculate_file_hash(file_path, algorithm):
-    hasher = hashlib.new(algorithm)
-    with open(file_path, 'rb') as file_handle:
-        for chunk in iter(lambda: file_handle.read(8192), b''):
-            hasher.update(chunk)
-    return hasher.hexdigest()
-
-
-def download_datapack(client, datapack_slug, game_version, dest_dir):
-    """Download a datapack from Modrinth.
-
-    Returns True if a datapack was downloaded, False if it already existed.
-    """
-    logger.info(f"Fetching project versions for '{datapack_slug}'...")
-
-    versions = client.list_project_versions(datapack_slug)
-
-    compatible_versions = [
-        v for v in versions
-        if game_version in v.game_versions
-    ]
-
-    if not compatible_versions:
-        raise Exception(
-            f"No compatible version found for datapack '{datapack_slug}' with Minecraft {game_version}"
-        )
-
-    version = compatible_versions[0]
-
-    primary_file = None
-    for file in version.files:
-        if file.primary and file.filename.lower().endswith('.zip'):
-            primary_file = file
-            break
-
-    if not primary_file:
-        for file in version.files:
-            if file.filename.lower().endswith('.zip'):
-                primary_file = file
-                break
-
-    if not primary_file:
-        raise Exception(f"No downloadable zip file found for datapack '{datapack_slug}'")
-
-    download_url = primary_file.url
-    filename = primary_file.filename
-    dest_path = os.path.join(dest_dir, filename)
-    expected_hash_algorithm, expected_hash_value = get_expected_hash(primary_file)
-
-    if os.path.exists(dest_path):
-        if expected_hash_algorithm and expected_hash_value:
-            existing_hash_value = calculate_file_hash(dest_path, expected_hash_algorithm)
-            if existing_hash_value == expected_hash_value:
-                logger.info(f"Datapack '{filename}' already exists at '{dest_path}' with valid checksum, skipping download")
-                return False
-
-            logger.warning(f"Datapack '{filename}' exists at '{dest_path}' but checksum mismatch, re-downloading")
-            os.remove(dest_path)
-        else:
-            logger.info(f"Datapack '{filename}' already exists at '{dest_path}', skipping download")
-            return False
-
-    logger.info(f"Downloading '{filename}' from {download_url}...")
-    response = requests.get(download_url, stream=True)
-    response.raise_for_status()
-
-    download_hasher = hashlib.new(expected_hash_algorithm) if expected_hash_algorithm else None
-    with open(dest_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if not chunk:
-                continue
-            f.write(chunk)
-            if download_hasher:
-                download_hasher.update(chunk)
-
-    if download_hasher and expected_hash_value:
-        downloaded_hash_value = download_hasher.hexdigest()
-        if downloaded_hash_value != expected_hash_value:
-            os.remove(dest_path)
-            raise Exception(
-                f"Checksum mismatch for datapack '{datapack_slug}' file '{filename}': expected "
-                f"{expected_hash_algorithm}={expected_hash_value}, got {downloaded_hash_value}"
-            )
-
-    logger.info(f"Successfully downloaded '{filename}' to '{dest_path}'")
-    return True
-
-
 def main():
 
     module_args = dict(
         minecraft_version=dict(type="str", required=True),
-        datapacks=dict(type="list", elements="str", required=True),
-        datapacks_download_delay=dict(type="int", required=True),
-        world=dict(type="str", required=True),
-        install_dir=dict(type="str", required=True),
+        datapacks=dict(type="list", elements="str", required=False),
+        worlds=dict(
+            type="list", elements="dict", required=False,
+            options=dict(
+                world=dict(type="str", required=True),
+                datapacks=dict(type="list", elements="str", required=False, default=[]),
+            ),
+        ),
+        datapacks_download_delay=dict(type="int", required=False, default=0),
+        datapacks_download_workers=dict(type="int", required=False, default=4),
+        verify=dict(type="str", required=False, default="index", choices=["index", "full"]),
+        partial_max_age=dict(type="int", required=False, default=86400),
+        cache_dir=dict(type="str", required=False),
+        cache_max_size=dict(type="int", required=False, default=2048),
+        cache_mode=dict(type="str", required=False, default="prefer-cache", choices=CACHE_MODES),
+        metadata_cache_ttl=dict(type="int", required=False, default=3600),
+        lock=dict(type="dict", required=False),
+        metrics_file=dict(type="path", required=False),
+        state=dict(type="str", required=False, default="present", choices=["present", "exact"]),
+        world=dict(type="str", required=False),
+        install_dir=dict(type="str", required=False),
+        datapacks_dir=dict(type="str", required=False),
+    )
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[["world", "datapacks_dir", "worlds"]],
+        required_by={"world": ["install_dir", "datapacks"], "datapacks_dir": "datapacks", "worlds": "install_dir"},
+        mutually_exclusive=[["worlds", "world"], ["worlds", "datapacks_dir"], ["worlds", "datapacks"]],
+        supports_check_mode=True,
     )
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
 
     minecraft_version = module.params["minecraft_version"]
     datapacks = module.params["datapacks"]
+    worlds = module.params["worlds"]
     datapacks_download_delay = module.params["datapacks_download_delay"]
+    datapacks_download_workers = module.params["datapacks_download_workers"]
+    verify = module.params["verify"]
+    partial_max_age = module.params["partial_max_age"]
+    cache_dir = module.params["cache_dir"]
+    cache_max_size = module.params["cache_max_size"]
+    cache_mode = module.params["cache_mode"]
+    metadata_cache_ttl = module.params["metadata_cache_ttl"]
+    lock = module.params["lock"]
+    metrics_file = module.params["metrics_file"]
+    state = module.params["state"]
     world = module.params["world"]
     install_dir = module.params["install_dir"]
+    datapacks_dir = module.params["datapacks_dir"]
 
+    if worlds is None:
+        dest_dir = datapacks_dir or os.path.join(install_dir, "workspace", world, "datapacks")
+        slugs_by_dir = {dest_dir: datapacks}
+    else:
+        # Datapacks shared between worlds are only resolved and downloaded once, worlds without any are left alone
+        world_dirs = {
+            world_datapacks["world"]: os.path.join(install_dir, "workspace", world_datapacks["world"], "datapacks")
+            for world_datapacks in worlds if world_datapacks["datapacks"]
+        }
+        slugs_by_dir = {
+            world_dirs[world_datapacks["world"]]: world_datapacks["datapacks"]
+            for world_datapacks in worlds if world_datapacks["datapacks"]
+        }
     logger.info(
-        f"'{len(datapacks)}' Fabric datapack(s) to be installed for world '{world}' and Minecraft version '{minecraft_version}'..."
+        f"'{len(set(slug for slugs in slugs_by_dir.values() for slug in slugs))}' Fabric datapack(s) to be installed "
+        f"into '{', '.join(slugs_by_dir)}' for Minecraft version '{minecraft_version}'..."
     )
 
-    client = Client()
-    datapacks_dir = os.path.join(install_dir, "workspace", world, "datapacks")
-    os.makedirs(datapacks_dir, exist_ok=True)
+    if datapacks_download_delay:
+        module.warn(
+            "datapacks_download_delay is deprecated and ignored, downloads are now paced by "
+            "Modrinth's rate limit headers, use datapacks_download_workers to limit concurrency"
+        )
+
+    installer = Installer(
+        datapacks_download_workers, verify, partial_max_age, cache_dir, cache_max_size, cache_mode,
+        metadata_cache_ttl, logger, module.warn, module.check_mode
+    )
+    if cache_mode == "offline" and not installer.metadata_cache:
+        module.fail_json(msg="cache_mode offline requires a usable cache_dir")
 
-    changed = False
-    for datapack in datapacks:
-        logger.info(f"Installing Fabric datapack '{datapack}' for world '{world}'...")
-        if download_datapack(client, datapack, minecraft_version, datapacks_dir):
-            changed = True
-        time.sleep(datapacks_download_delay)
+    results = installer.install_dirs("datapacks", slugs_by_dir, minecraft_version, lock, state=state)
 
-    result = {
-        "changed": changed,
-    }
+    if worlds is None:
+        result = results[dest_dir]
+    else:
+        world_results = {world: results[dest_dir] for world, dest_dir in world_dirs.items()}
+        result = {
+            "changed": any(world_result["changed"] for world_result in world_results.values()),
+            "worlds": world_results,
+        }
+        if module.check_mode:
+            result["diff"] = [world_result.pop("diff") for world_result in world_results.values()]
+    result.update(installer.report())
+    if metrics_file and not module.check_mode:
+        write_metrics(metrics_file, "fabric_datapacks", result["metrics"])
     module.exit_json(**result)
 
 
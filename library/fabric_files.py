@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_files
+short_description: Check mods or datapacks against a manifest of files pushed from the Ansible controller or an offline bundle manifest
+requirements:
+  - conflog
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_bundle import KIND_DIRS, load_manifest, select_entries
+from ansible.module_utils.fabricmc_cache import ArtifactCache
+from ansible.module_utils.fabricmc_install import reconcile_files
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-files] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_files')
+
+
+def main():
+
+    module_args = dict(
+        dest_dir=dict(type="str", required=True),
+        files=dict(
+            type="list", elements="dict", required=False,
+            options=dict(
+                filename=dict(type="str", required=True),
+                sha1=dict(type="str", required=True),
+                slug=dict(type="str", required=False),
+            ),
+        ),
+        manifest=dict(type="path", required=False),
+        kind=dict(type="str", required=False, choices=list(KIND_DIRS)),
+        slugs=dict(type="list", elements="str", required=False),
+        state=dict(type="str", required=False, default="present", choices=["present", "exact"]),
+        verify=dict(type="str", required=False, default="index", choices=["index", "full"]),
+        cache_dir=dict(type="str", required=False),
+        cache_max_size=dict(type="int", required=False, default=2048),
+        workers=dict(type="int", required=False, default=4),
+    )
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[["files", "manifest"]],
+        mutually_exclusive=[["files", "manifest"]],
+        required_by={"manifest": "kind"},
+        supports_check_mode=True,
+    )
+
+    dest_dir = module.params["dest_dir"]
+    files = module.params["files"]
+    manifest = module.params["manifest"]
+    kind = module.params["kind"]
+    slugs = module.params["slugs"]
+    state = module.params["state"]
+    verify = module.params["verify"]
+    cache_dir = module.params["cache_dir"]
+    cache_max_size = module.params["cache_max_size"]
+    workers = module.params["workers"]
+
+    if manifest:
+        # Every file of the kind, or only the slugs and the files without one, is expected in dest_dir. The files
+        # themselves stay on the controller, the missing ones are reported for it to push
+        files = select_entries(manifest, load_manifest(manifest), kind, slugs)
+    logger.info(f"Checking '{len(files)}' file(s) in '{dest_dir}'...")
+
+    cache = None
+    if cache_dir:
+        try:
+            cache = ArtifactCache(cache_dir, cache_max_size * 1024 * 1024, read_only=module.check_mode)
+        except OSError as error:
+            module.warn(f"Artifact cache directory '{cache_dir}' is not usable, continuing without it: {error}")
+
+    result = reconcile_files(dest_dir, files, logger, verify, cache, state, check_mode=module.check_mode, workers=workers)
+    if cache:
+        if not module.check_mode:
+            cache.evict()
+        result["cache"] = cache.report()
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_lock
+short_description: Resolve Fabric mods or datapacks into a lockfile
+requirements:
+  - conflog
+  - requests
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_http import RateLimiter, new_session
+from ansible.module_utils.fabricmc_lock import LOCK_VERSION, load_lock, lock_entry, write_lock
+from ansible.module_utils.fabricmc_modrinth import CACHE_MODES, MetadataCache, ModrinthClient, resolve_versions, select_file
+import os
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-lock] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_lock')
+
+KINDS = {
+    'mods': {'loaders': ['fabric'], 'extension': None},
+    'datapacks': {'loaders': None, 'extension': '.zip'},
+}
+
+
+def main():
+
+    module_args = dict(
+        path=dict(type="path", required=True),
+        kind=dict(type="str", required=True, choices=list(KINDS)),
+        projects=dict(type="list", elements="str", required=True),
+        minecraft_version=dict(type="str", required=True),
+        state=dict(type="str", required=False, default="present", choices=["present", "update"]),
+        upgrade=dict(type="list", elements="str", required=False, default=[]),
+        workers=dict(type="int", required=False, default=4),
+        cache_dir=dict(type="str", required=False),
+        cache_mode=dict(type="str", required=False, default="prefer-cache", choices=CACHE_MODES),
+        metadata_cache_ttl=dict(type="int", required=False, default=3600),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    path = module.params["path"]
+    kind = module.params["kind"]
+    projects = list(dict.fromkeys(module.params["projects"]))
+    minecraft_version = module.params["minecraft_version"]
+    state = module.params["state"]
+    upgrade = module.params["upgrade"]
+    workers = module.params["workers"]
+    cache_dir = module.params["cache_dir"]
+    cache_mode = module.params["cache_mode"]
+    metadata_cache_ttl = module.params["metadata_cache_ttl"]
+    loaders = KINDS[kind]['loaders']
+    extension = KINDS[kind]['extension']
+
+    lock = load_lock(path)
+    if lock is None:
+        logger.info(f"Creating '{kind}' lockfile '{path}' for Minecraft version '{minecraft_version}'...")
+        previous_projects = {}
+        to_resolve = projects
+    else:
+        previous_projects = lock.get('projects', {})
+        outdated = lock.get('minecraft_version') != minecraft_version or lock.get('loaders') != loaders
+        missing = [slug for slug in projects if slug not in previous_projects]
+        removed = [slug for slug in previous_projects if slug not in projects]
+        if state == "present":
+            if outdated or missing or removed or upgrade:
+                module.fail_json(
+                    msg=f"Lockfile '{path}' does not match the requested '{kind}', "
+                        "run with state update to re-resolve it",
+                    missing=missing,
+                    removed=removed,
+                )
+            module.exit_json(changed=False, lock=lock, added=[], removed=[], upgraded=[])
+        if outdated:
+            to_resolve = projects
+        else:
+            to_resolve = missing + [slug for slug in upgrade if slug in projects and slug not in missing]
+        logger.info(f"Updating '{len(to_resolve)}' project(s) in '{kind}' lockfile '{path}'...")
+
+    metadata_cache = None
+    if cache_dir:
+        metadata_cache = MetadataCache(os.path.join(cache_dir, "metadata"), metadata_cache_ttl, cache_mode)
+    client = ModrinthClient(new_session(workers), RateLimiter(), metadata_cache=metadata_cache)
+    versions = resolve_versions(client, to_resolve, loaders, [minecraft_version], [], workers, logger)
+
+    resolved_projects = {}
+    for slug, version in versions.items():
+        file_info = select_file(version, extension) if version else None
+        if not file_info:
+            module.fail_json(msg=f"No compatible version found for '{slug}' with Minecraft {minecraft_version}")
+        resolved_projects[slug] = lock_entry(version, file_info)
+
+    new_lock = {
+        'version': LOCK_VERSION,
+        'kind': kind,
+        'minecraft_version': minecraft_version,
+        'loaders': loaders,
+        'projects': {
+            slug: resolved_projects.get(slug, previous_projects.get(slug))
+            for slug in projects
+        },
+    }
+
+    result = {
+        "changed": new_lock != lock,
+        "lock": new_lock,
+        "added": [slug for slug in projects if slug not in previous_projects],
+        "removed": [slug for slug in previous_projects if slug not in projects],
+        "upgraded": [
+            slug for slug in resolved_projects
+            if slug in previous_projects and previous_projects[slug]['version_id'] != resolved_projects[slug]['version_id']
+        ],
+    }
+    if result["changed"] and not module.check_mode:
+        write_lock(path, new_lock)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
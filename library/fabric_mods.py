@@ -6,22 +6,14 @@ module: fabric_mods
 short_description: Install Fabric mods
 requirements:
   - conflog
-  - modrinth-api-wrapper
   - requests
 '''
 
 from conflog import Conflog
 from ansible.module_utils.basic import AnsibleModule
-import hashlib
-import os
-import requests
-import sys
-import time
-
-if sys.version_info[:2] == (3, 8):
-    from modrinth_api_wrapper_pakkunbot import Client
-else:
-    from modrinth_api_wrapper import Client
+from ansible.module_utils.fabricmc_install import Installer
+from ansible.module_utils.fabricmc_metrics import write_metrics
+from ansible.module_utils.fabricmc_modrinth import CACHE_MODES
 
 conf_dict={
     'handlers': 'stream',
@@ -33,122 +25,30 @@ cfl = Conflog(conf_dict=conf_dict)
 logger = cfl.get_logger('fabric_mods')
 
 
-def get_expected_hash(file_info):
-    """Return expected checksum tuple (algorithm, value) from Modrinth file metadata."""
-    hashes = getattr(file_info, 'hashes', None)
-    if not hashes:
-        return None, None
-
-    if isinstance(hashes, dict):
-        hash_map = hashes
-    else:
-        hash_map = {}
-        for algorithm in ('sha1', 'sha512', 'sha256'):
-            hash_value = getattr(hashes, algorithm, None)
-            if hash_value:
-                hash_map[algorithm] = hash_value
-
-    for algorithm in ('sha1', 'sha512', 'sha256'):
-        hash_value = hash_map.get(algorithm)
-        if hash_value:
-            return algorithm, hash_value
-
-    return None, None
-
-
-def calculate_file_hash(file_path, algorithm):
-    hasher = hashlib.new(algorithm)
-    with open(file_path, 'rb') as file_handle:
-        for chunk in iter(lambda: file_handle.read(8192), b''):
-            hasher.update(chunk)
-    return hasher.hexdigest()
-
-def download_mod(client, mod_slug, loader, game_version, dest_dir):
-    """Download a mod from Modrinth using modrinth-api-wrapper.
-    
-    Returns True if a mod was downloaded, False if it already existed.
-    """
-    logger.info(f"Fetching project versions for '{mod_slug}'...")
-    
-    # Get all versions for the project
-    versions = client.list_project_versions(mod_slug)
-    
-    # Filter versions by loader and game version
-    compatible_versions = [
-        v for v in versions
-        if loader in v.loaders and game_version in v.game_versions
-    ]
-    
-    if not compatible_versions:
-        raise Exception(f"No compatible version found for mod '{mod_slug}' with Minecraft {game_version} and loader {loader}")
-    
-    # Get the latest compatible version (first in the list) of the mod
-    version = compatible_versions[0]
-    
-    # Find the primary file of the mod
-    primary_file = None
-    for file in version.files:
-        if file.primary:
-            primary_file = file
-            break
-    
-    if not primary_file:
-        primary_file = version.files[0] if version.files else None
-    
-    if not primary_file:
-        raise Exception(f"No downloadable file found for mod '{mod_slug}'")
-    
-    download_url = primary_file.url
-    filename = primary_file.filename
-    dest_path = os.path.join(dest_dir, filename)
-    expected_hash_algorithm, expected_hash_value = get_expected_hash(primary_file)
-
-    # Skip download if the mod file already exists and checksum is valid
-    if os.path.exists(dest_path):
-        if expected_hash_algorithm and expected_hash_value:
-            existing_hash_value = calculate_file_hash(dest_path, expected_hash_algorithm)
-            if existing_hash_value == expected_hash_value:
-                logger.info(f"Mod '{filename}' already exists at '{dest_path}' with valid checksum, skipping download")
-                return False
-
-            logger.warning(f"Mod '{filename}' exists at '{dest_path}' but checksum mismatch, re-downloading")
-            os.remove(dest_path)
-        else:
-            logger.info(f"Mod '{filename}' already exists at '{dest_path}', skipping download")
-            return False
-
-    # Download the mod file
-    logger.info(f"Downloading '{filename}' from {download_url}...")
-    response = requests.get(download_url, stream=True)
-    response.raise_for_status()
-
-    download_hasher = hashlib.new(expected_hash_algorithm) if expected_hash_algorithm else None
-    with open(dest_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if not chunk:
-                continue
-            f.write(chunk)
-            if download_hasher:
-                download_hasher.update(chunk)
-
-    if download_hasher and expected_hash_value:
-        downloaded_hash_value = download_hasher.hexdigest()
-        if downloaded_hash_value != expected_hash_value:
-            os.remove(dest_path)
-            raise Exception(
-                f"Checksum mismatch for mod '{mod_slug}' file '{filename}': expected "
-                f"{expected_hash_algorithm}={expected_hash_value}, got {downloaded_hash_value}"
-            )
-
-    logger.info(f"Successfully downloaded '{filename}' to '{dest_path}'")
-    return True
-
 def main():
 
     module_args = dict(
         minecraft_version=dict(type="str", required=True),
         mods=dict(type="list", elements="str", required=True),
-        mods_download_delay=dict(type="int", required=True),
+        extra_files=dict(
+            type="list", elements="dict", required=False, default=[],
+            options=dict(
+                url=dict(type="str", required=True),
+                filename=dict(type="str", required=True),
+                sha1=dict(type="str", required=True),
+            ),
+        ),
+        mods_download_delay=dict(type="int", required=False, default=0),
+        mods_download_workers=dict(type="int", required=False, default=4),
+        verify=dict(type="str", required=False, default="index", choices=["index", "full"]),
+        partial_max_age=dict(type="int", required=False, default=86400),
+        cache_dir=dict(type="str", required=False),
+        cache_max_size=dict(type="int", required=False, default=2048),
+        cache_mode=dict(type="str", required=False, default="prefer-cache", choices=CACHE_MODES),
+        metadata_cache_ttl=dict(type="int", required=False, default=3600),
+        lock=dict(type="dict", required=False),
+        metrics_file=dict(type="path", required=False),
+        state=dict(type="str", required=False, default="present", choices=["present", "exact"]),
         install_dir=dict(type="str", required=True),
         mods_dir=dict(type="str", required=True),
     )
@@ -156,23 +56,39 @@ def main():
 
     minecraft_version = module.params["minecraft_version"]
     mods = module.params["mods"]
+    extra_files = module.params["extra_files"]
     mods_download_delay = module.params["mods_download_delay"]
+    mods_download_workers = module.params["mods_download_workers"]
+    verify = module.params["verify"]
+    partial_max_age = module.params["partial_max_age"]
+    cache_dir = module.params["cache_dir"]
+    cache_max_size = module.params["cache_max_size"]
+    cache_mode = module.params["cache_mode"]
+    metadata_cache_ttl = module.params["metadata_cache_ttl"]
+    lock = module.params["lock"]
+    metrics_file = module.params["metrics_file"]
+    state = module.params["state"]
     install_dir = module.params["install_dir"]
     mods_dir = module.params["mods_dir"]
     logger.info(f"'{len(mods)}' Fabric mod(s) to be installed for Minecraft version '{minecraft_version}'...")
 
-    client = Client()
+    if mods_download_delay:
+        module.warn(
+            "mods_download_delay is deprecated and ignored, downloads are now paced by "
+            "Modrinth's rate limit headers, use mods_download_workers to limit concurrency"
+        )
 
-    changed = False
-    for mod in mods:
-        logger.info(f"Installing Fabric mod '{mod}'...")
-        if download_mod(client, mod, "fabric", minecraft_version, mods_dir):
-            changed = True
-        time.sleep(mods_download_delay)
+    installer = Installer(
+        mods_download_workers, verify, partial_max_age, cache_dir, cache_max_size, cache_mode,
+        metadata_cache_ttl, logger, module.warn, module.check_mode
+    )
+    if cache_mode == "offline" and not installer.metadata_cache:
+        module.fail_json(msg="cache_mode offline requires a usable cache_dir")
 
-    result = {
-        "changed": changed,
-    }
+    result = installer.install("mods", mods, minecraft_version, mods_dir, lock, extra_files, state)
+    result.update(installer.report())
+    if metrics_file and not module.check_mode:
+        write_metrics(metrics_file, "fabric_mods", result["metrics"])
     module.exit_json(**result)
 
 if __name__ == "__main__":
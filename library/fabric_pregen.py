@@ -0,0 +1,163 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_pregen
+short_description: Pre-generate the chunks of FabricMC worlds with the Chunky mod driven over RCON
+description:
+  - Every world with a radius is booted headless with --world, Chunky generates the chunks within the radius of
+    its overworld spawn, and the server is stopped once it's done. The server must not be running.
+  - Progress is logged and written to <install_dir>/pregen/state.json, with the chunks done, chunks per second
+    and ETA. An interrupted run is continued from where it stopped by the next one, finished worlds are skipped
+    until their radius changes.
+  - A world which isn't done within timeout isn't a failure, its task is paused with a warning and the next run
+    continues it before the worlds after it.
+  - RCON must be enabled in server.properties, with rcon.password, and the Chunky mod must be installed.
+requirements:
+  - conflog
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_files import list_files
+from ansible.module_utils.fabricmc_pregen import can_resume, is_done, load_state, pregenerate, save_state
+from ansible.module_utils.fabricmc_rcon import RconClient, rcon_settings
+from ansible.module_utils.fabricmc_server import ServerProcess
+import os
+import shlex
+import signal
+import time
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-pregen] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_pregen')
+
+RCON_CONNECT_TIMEOUT = 60
+
+
+def interrupt(signum, frame):
+    # Raising unwinds to the clean stop, Chunky saves its task when the server stops
+    raise KeyboardInterrupt(f"Interrupted by signal {signum}")
+
+
+def pregenerate_world(command, workspace_dir, world, radius, resume, state, pregen_dir, rcon_port, rcon_password,
+                      boot_timeout, timeout, interval):
+    """Boot the server on the world, pre-generate its chunks and stop it, saving the progress in the state.
+
+    A world whose pre-generation timed out stays running in the state, for the next run to resume it.
+    """
+    logger.info(f"{'Resuming' if resume else 'Starting'} pre-generation of world '{world}' with radius {radius}...")
+    world_state = {"radius": radius, "status": "running"}
+    state["worlds"][world] = dict(state["worlds"].get(world, {}), **world_state) if resume else world_state
+    state["chunky_task"] = world
+    save_state(pregen_dir, state)
+
+    def on_progress(progress):
+        state["worlds"][world].update(progress, updated_at=int(time.time()))
+        save_state(pregen_dir, state)
+
+    server = ServerProcess(command + ["--world", world], workspace_dir, logger)
+    rcon = RconClient("127.0.0.1", rcon_port, rcon_password)
+    try:
+        boot_times = server.start(boot_timeout)
+        rcon.connect(retry_for=RCON_CONNECT_TIMEOUT)
+        try:
+            result = pregenerate(rcon, radius, resume, interval, logger, on_progress, timeout)
+        except BaseException:
+            # Pausing saves the task for the next run to continue
+            try:
+                rcon.command("chunky pause")
+            except Exception:
+                pass
+            raise
+        status = "done" if result["finished"] else "running"
+        state["worlds"][world].update(result, status=status, updated_at=int(time.time()))
+        save_state(pregen_dir, state)
+        rcon.close()
+        returncode = server.stop()
+    finally:
+        rcon.close()
+        server.stop()
+    if returncode != 0:
+        raise Exception(f"Server exited with code {returncode} when stopped:\n{server.output}")
+    return dict(result, world=world, radius=radius, resumed=resume, boot_seconds=boot_times["boot_seconds"])
+
+
+def main():
+
+    module_args = dict(
+        install_dir=dict(type="str", required=True),
+        worlds=dict(
+            type="list", elements="dict", required=True,
+            options=dict(
+                world=dict(type="str", required=True),
+                radius=dict(type="int", required=True, aliases=["pregen_radius"]),
+            ),
+        ),
+        java=dict(type="str", required=False, default="java"),
+        java_opts=dict(type="str", required=False, default=""),
+        boot_timeout=dict(type="int", required=False, default=600),
+        timeout=dict(type="int", required=False, default=0),
+        interval=dict(type="int", required=False, default=10),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    install_dir = module.params["install_dir"]
+    worlds = module.params["worlds"]
+    java = module.params["java"]
+    java_opts = module.params["java_opts"]
+    boot_timeout = module.params["boot_timeout"]
+    timeout = module.params["timeout"]
+    interval = module.params["interval"]
+
+    workspace_dir = os.path.join(install_dir, "workspace")
+    pregen_dir = os.path.join(install_dir, "pregen")
+    state = load_state(pregen_dir)
+    pending = [
+        world for world in worlds if world["radius"] > 0 and not is_done(state, world["world"], world["radius"])
+    ]
+    result = {"changed": bool(pending), "worlds": [world["world"] for world in pending]}
+    if not pending or module.check_mode:
+        module.exit_json(**result)
+
+    mods = list_files(os.path.join(workspace_dir, "mods"), ".jar")
+    if not any("chunky" in os.path.basename(path).lower() for path in mods):
+        module.fail_json(msg="Chunk pre-generation requires the chunky mod, add it to fabmc_fabric_mods", **result)
+    try:
+        rcon_port, rcon_password = rcon_settings(os.path.join(workspace_dir, "server.properties"))
+    except Exception as error:
+        module.fail_json(msg=str(error), **result)
+
+    launcher_path = os.path.join(install_dir, "bin", "minecraft_server_launcher.jar")
+    command = [java] + shlex.split(java_opts) + ["-jar", launcher_path, "nogui"]
+    signal.signal(signal.SIGTERM, interrupt)
+    results = []
+    for world in pending:
+        resume = can_resume(state, world["world"], world["radius"])
+        try:
+            results.append(pregenerate_world(
+                command, workspace_dir, world["world"], world["radius"], resume, state, pregen_dir, rcon_port,
+                rcon_password, boot_timeout, timeout, interval
+            ))
+        except BaseException as error:
+            module.fail_json(
+                msg=f"Pre-generation of world '{world['world']}' failed: {error}", pregen=results, **result
+            )
+        if not results[-1]["finished"]:
+            # Chunky keeps a single saved task, the worlds after this one would replace it
+            module.warn(
+                f"Pre-generation of world '{world['world']}' did not finish within {timeout}s, "
+                "it continues on the next run"
+            )
+            break
+    result["pregen"] = results
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
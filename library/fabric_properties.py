@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_properties
+short_description: Merge key-value pairs into a Java properties file, e.g. server.properties, with a single atomic write
+description:
+  - Existing lines, comments and keys which are not set are kept in place, missing keys are appended.
+  - The file is only rewritten when at least one value changed.
+requirements:
+  - conflog
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_properties import format_line, merge_properties, read_properties
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-properties] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_properties')
+
+
+def main():
+
+    module_args = dict(
+        path=dict(type="path", required=True),
+        properties=dict(type="dict", required=False, default={}),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    path = module.params["path"]
+    properties = module.params["properties"]
+
+    before = read_properties(path)
+    try:
+        changed_properties = merge_properties(path, properties, module.check_mode)
+    except OSError as error:
+        module.fail_json(msg=f"Unable to write properties file '{path}': {error}")
+    if changed_properties:
+        logger.info(f"Set {', '.join(changed_properties)} in '{path}'")
+
+    result = {"changed": bool(changed_properties), "path": path, "properties": changed_properties}
+    if module._diff:
+        result["diff"] = {
+            "before_header": path,
+            "after_header": path,
+            "before": "".join(f"{format_line(key, before[key])}\n" for key in changed_properties if key in before),
+            "after": "".join(f"{format_line(key, properties[key])}\n" for key in changed_properties),
+        }
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
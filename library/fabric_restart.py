@@ -0,0 +1,148 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_restart
+short_description: Stop and start the systemd service of a FabricMC server with an announcement and a save flush
+description:
+  - C(stopped) announces the restart to the players over RCON, waits for announce_delay seconds, runs
+    save-all flush, which only responds once the worlds are written, and stops the service. An inactive
+    service is left alone.
+  - C(started) starts the service and waits for the "Done (Xs)!" line in logs/latest.log. An active service
+    is left alone.
+  - C(restarted) does both. The restart is only announced and flushed when RCON is enabled in server.properties,
+    the result has the seconds the save, stop and start took, and the downtime from stopping to the Done line.
+requirements:
+  - conflog
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_log import LogTail, wait_for_pattern
+from ansible.module_utils.fabricmc_rcon import RconClient, rcon_settings
+from ansible.module_utils.fabricmc_server import DONE_PATTERN
+import os
+import time
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-restart] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_restart')
+
+
+def is_active(module, service):
+    rc, stdout, stderr = module.run_command(["systemctl", "is-active", service])
+    return stdout.strip() == "active"
+
+
+def systemctl(module, action, service):
+    """Run a systemctl action and return the seconds it took."""
+    started_at = time.monotonic()
+    module.run_command(["systemctl", action, service], check_rc=True)
+    return round(time.monotonic() - started_at, 3)
+
+
+def save_and_announce(module, workspace_dir, announce, announce_delay, save_timeout):
+    """Announce the restart and flush the worlds to disk over RCON, returns the seconds the save took."""
+    try:
+        rcon_port, rcon_password = rcon_settings(os.path.join(workspace_dir, "server.properties"))
+    except Exception as error:
+        module.warn(f"Restarting without announcement and save flush: {error}")
+        return None
+    with RconClient("127.0.0.1", rcon_port, rcon_password, timeout=save_timeout) as rcon:
+        if announce:
+            rcon.command(f"say {announce}")
+            logger.info(f"Announced restart, waiting {announce_delay}s...")
+            time.sleep(announce_delay)
+        started_at = time.monotonic()
+        response = rcon.command("save-all flush")
+        if "saved" not in response.lower():
+            raise Exception(f"save-all flush did not complete: {response}")
+        return round(time.monotonic() - started_at, 3)
+
+
+def stop(module, service, workspace_dir, announce, announce_delay, save_timeout):
+    if not is_active(module, service):
+        return {"changed": False}
+    if module.check_mode:
+        return {"changed": True}
+    save_seconds = save_and_announce(module, workspace_dir, announce, announce_delay, save_timeout)
+    logger.info(f"Stopping service '{service}'...")
+    # Players are disconnected as soon as the server stops, that's when the downtime starts
+    stopped_at = time.time()
+    stop_seconds = systemctl(module, "stop", service)
+    return {"changed": True, "save_seconds": save_seconds, "stop_seconds": stop_seconds, "stopped_at": stopped_at}
+
+
+def start(module, service, workspace_dir, timeout, stopped_at=None):
+    if is_active(module, service):
+        return {"changed": False}
+    if module.check_mode:
+        return {"changed": True}
+    # Only lines written from now on count, the server rotates latest.log when it starts
+    tail = LogTail.at_end(os.path.join(workspace_dir, "logs", "latest.log"))
+    started_at = time.monotonic()
+    logger.info(f"Starting service '{service}'...")
+    systemctl(module, "start", service)
+
+    def check():
+        rc, stdout, stderr = module.run_command(["systemctl", "is-active", service])
+        if stdout.strip() == "failed":
+            raise Exception(f"Service '{service}' failed while starting, see journalctl -u {service}")
+
+    match = wait_for_pattern(tail, DONE_PATTERN, timeout, check)
+    result = {
+        "changed": True,
+        "boot_seconds": round(time.monotonic() - started_at, 3),
+        "reported_seconds": float(match.group(1)),
+    }
+    if stopped_at:
+        result["downtime_seconds"] = round(time.time() - stopped_at, 3)
+    logger.info(f"Service '{service}' started in {result['boot_seconds']:.1f}s")
+    return result
+
+
+def main():
+
+    module_args = dict(
+        install_dir=dict(type="str", required=True),
+        service=dict(type="str", required=True),
+        state=dict(type="str", required=False, default="restarted", choices=["stopped", "started", "restarted"]),
+        announce=dict(type="str", required=False, default="Server restarting for an update"),
+        announce_delay=dict(type="int", required=False, default=10),
+        save_timeout=dict(type="int", required=False, default=120),
+        timeout=dict(type="int", required=False, default=600),
+        stopped_at=dict(type="float", required=False),
+    )
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    install_dir = module.params["install_dir"]
+    service = module.params["service"]
+    state = module.params["state"]
+    announce = module.params["announce"]
+    announce_delay = module.params["announce_delay"]
+    save_timeout = module.params["save_timeout"]
+    timeout = module.params["timeout"]
+    stopped_at = module.params["stopped_at"]
+
+    workspace_dir = os.path.join(install_dir, "workspace")
+    result = {"changed": False, "service": service}
+    try:
+        if state in ("stopped", "restarted"):
+            stopped = stop(module, service, workspace_dir, announce, announce_delay, save_timeout)
+            result.update(stopped)
+            stopped_at = stopped.get("stopped_at", stopped_at)
+        if state in ("started", "restarted"):
+            started = start(module, service, workspace_dir, timeout, stopped_at)
+            result.update(started, changed=result["changed"] or started["changed"])
+    except Exception as error:
+        module.fail_json(msg=f"Restart of service '{service}' failed: {error}", **result)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
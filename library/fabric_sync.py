@@ -0,0 +1,212 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r'''
+---
+module: fabric_sync
+short_description: Synchronise a whole FabricMC server installation in a single module execution
+requirements:
+  - conflog
+  - requests
+'''
+
+from conflog import Conflog
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.fabricmc_files import download_file, swap_symlink, write_file
+from ansible.module_utils.fabricmc_install import Installer
+from ansible.module_utils.fabricmc_metrics import write_metrics
+from ansible.module_utils.fabricmc_modrinth import CACHE_MODES
+from ansible.module_utils.fabricmc_properties import merge_properties
+import os
+
+conf_dict={
+    'handlers': 'stream',
+    'datefmt': "%Y%m%d%H%M%S",
+    'format': "[fabric-sync] [%(levelname)s] [%(asctime)s] %(message)s",
+    'level': "debug"
+}
+cfl = Conflog(conf_dict=conf_dict)
+logger = cfl.get_logger('fabric_sync')
+
+FABRIC_META_ENDPOINT = 'https://meta.fabricmc.net/v2'
+
+
+def sync_launcher(session, bin_dir, minecraft_version, fabric_loader_version, installer_version,
+                  artifact_source="remote", metrics=None, check_mode=False):
+    """Install the versioned server launcher jar when missing and atomically point the launcher symlink at it.
+
+    The jar is downloaded from Fabric meta, with the controller artifact source it is
+    expected to have been pushed already. In check mode, nothing is downloaded or
+    written.
+    """
+    filename = f"minecraft_server_launcher.{minecraft_version}-{fabric_loader_version}-{installer_version}.jar"
+    file_info = {
+        'url': f"{FABRIC_META_ENDPOINT}/versions/loader/{minecraft_version}/{fabric_loader_version}/{installer_version}/server/jar",
+        'filename': filename,
+    }
+    launcher_path = os.path.join(bin_dir, filename)
+    downloaded = False
+    if artifact_source == "remote" and check_mode:
+        downloaded = not os.path.isfile(launcher_path)
+    elif artifact_source == "remote":
+        with metrics.item(filename):
+            downloaded = download_file(session, file_info, bin_dir, 'Launcher', filename, logger, metrics=metrics)
+    elif not os.path.isfile(launcher_path) and not check_mode:
+        # In check mode the controller didn't push the jar file either
+        raise Exception(f"Launcher jar file '{filename}' was not found in '{bin_dir}'")
+    linked = swap_symlink(launcher_path, os.path.join(bin_dir, "minecraft_server_launcher.jar"), check_mode)
+    return {
+        "changed": downloaded or linked,
+        "filename": filename,
+        "downloaded": downloaded,
+        "linked": linked,
+    }
+
+
+def main():
+
+    file_options = dict(
+        url=dict(type="str", required=True),
+        filename=dict(type="str", required=True),
+        sha1=dict(type="str", required=True),
+    )
+    module_args = dict(
+        install_dir=dict(type="str", required=True),
+        minecraft_version=dict(type="str", required=True),
+        fabric_loader_version=dict(type="str", required=True),
+        installer_version=dict(type="str", required=True),
+        fabric_api=dict(type="dict", required=False, options=file_options),
+        mods=dict(type="list", elements="str", required=False, default=[]),
+        mods_lock=dict(type="dict", required=False),
+        datapacks=dict(
+            type="list", elements="dict", required=False, default=[],
+            options=dict(
+                world=dict(type="str", required=True),
+                datapacks=dict(type="list", elements="str", required=False, default=[]),
+            ),
+        ),
+        datapacks_lock=dict(type="dict", required=False),
+        server_properties=dict(type="dict", required=False, default={}),
+        eula_accepted=dict(type="bool", required=False, default=False),
+        java_opts=dict(type="str", required=False, default=""),
+        workers=dict(type="int", required=False, default=4),
+        verify=dict(type="str", required=False, default="index", choices=["index", "full"]),
+        partial_max_age=dict(type="int", required=False, default=86400),
+        cache_dir=dict(type="str", required=False),
+        cache_max_size=dict(type="int", required=False, default=2048),
+        cache_mode=dict(type="str", required=False, default="prefer-cache", choices=CACHE_MODES),
+        metadata_cache_ttl=dict(type="int", required=False, default=3600),
+        artifact_source=dict(type="str", required=False, default="remote", choices=["remote", "controller"]),
+        metrics_file=dict(type="path", required=False),
+    )
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_if=[["artifact_source", "remote", ["fabric_api"]]],
+        supports_check_mode=True,
+    )
+
+    install_dir = module.params["install_dir"]
+    minecraft_version = module.params["minecraft_version"]
+    fabric_loader_version = module.params["fabric_loader_version"]
+    installer_version = module.params["installer_version"]
+    fabric_api = module.params["fabric_api"]
+    mods = module.params["mods"]
+    mods_lock = module.params["mods_lock"]
+    datapacks = module.params["datapacks"]
+    datapacks_lock = module.params["datapacks_lock"]
+    server_properties = module.params["server_properties"]
+    eula_accepted = module.params["eula_accepted"]
+    java_opts = module.params["java_opts"]
+    workers = module.params["workers"]
+    verify = module.params["verify"]
+    partial_max_age = module.params["partial_max_age"]
+    cache_dir = module.params["cache_dir"]
+    cache_max_size = module.params["cache_max_size"]
+    cache_mode = module.params["cache_mode"]
+    metadata_cache_ttl = module.params["metadata_cache_ttl"]
+    artifact_source = module.params["artifact_source"]
+    metrics_file = module.params["metrics_file"]
+    logger.info(f"Synchronising FabricMC server at '{install_dir}' for Minecraft version '{minecraft_version}'...")
+
+    bin_dir = os.path.join(install_dir, "bin")
+    workspace_dir = os.path.join(install_dir, "workspace")
+    if not module.check_mode:
+        for dir_path in [install_dir, bin_dir, workspace_dir]:
+            os.makedirs(dir_path, mode=0o755, exist_ok=True)
+
+    installer = Installer(
+        workers, verify, partial_max_age, cache_dir, cache_max_size, cache_mode,
+        metadata_cache_ttl, logger, module.warn, module.check_mode
+    )
+    if cache_mode == "offline" and not installer.metadata_cache:
+        module.fail_json(msg="cache_mode offline requires a usable cache_dir")
+
+    launcher = sync_launcher(
+        installer.session, bin_dir, minecraft_version, fabric_loader_version, installer_version,
+        artifact_source, installer.metrics, module.check_mode
+    )
+
+    # With artifacts pushed from the controller, mods and datapacks are already in place
+    mods_dir = os.path.join(workspace_dir, "mods")
+    mods_result = {"changed": False}
+    if artifact_source == "remote":
+        mods_result = installer.install("mods", mods, minecraft_version, mods_dir, mods_lock, [fabric_api], "exact")
+
+    # Datapacks shared between worlds are only resolved and downloaded once
+    datapacks_dirs = {
+        world_datapacks["world"]: os.path.join(workspace_dir, world_datapacks["world"], "datapacks")
+        for world_datapacks in datapacks if world_datapacks["datapacks"]
+    }
+    slugs_by_dir = {
+        datapacks_dirs[world_datapacks["world"]]: world_datapacks["datapacks"]
+        for world_datapacks in datapacks if world_datapacks["datapacks"]
+    }
+    datapacks_results = {}
+    if artifact_source == "remote":
+        datapacks_results = installer.install_dirs(
+            "datapacks", slugs_by_dir, minecraft_version, datapacks_lock, state="exact"
+        )
+    datapacks_result = {
+        world: datapacks_results[dest_dir] for world, dest_dir in datapacks_dirs.items() if dest_dir in datapacks_results
+    }
+
+    # Minecraft server would add any missing properties with default values
+    # hence it's not necessary to specify all properties in server_properties.
+    changed_properties = merge_properties(
+        os.path.join(workspace_dir, "server.properties"), server_properties, module.check_mode
+    )
+    eula = bool(eula_accepted and merge_properties(
+        os.path.join(workspace_dir, "eula.txt"), {"eula": True}, module.check_mode
+    ))
+
+    start_script = write_file(
+        os.path.join(bin_dir, "start.sh"),
+        f"#!/bin/bash\njava {java_opts} -jar {bin_dir}/minecraft_server_launcher.jar nogui\n",
+        0o755,
+        module.check_mode,
+    )
+
+    result = {
+        "changed": (
+            launcher["changed"] or mods_result["changed"]
+            or any(world_result["changed"] for world_result in datapacks_result.values())
+            or bool(changed_properties) or eula or start_script
+        ),
+        "launcher": launcher,
+        "mods": mods_result,
+        "datapacks": datapacks_result,
+        "server_properties": changed_properties,
+        "eula": eula,
+        "start_script": start_script,
+    }
+    if module.check_mode:
+        result["diff"] = [
+            planned.pop("diff") for planned in [mods_result] + list(datapacks_result.values()) if "diff" in planned
+        ]
+    result.update(installer.report())
+    if metrics_file and not module.check_mode:
+        write_metrics(metrics_file, "fabric_sync", result["metrics"])
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
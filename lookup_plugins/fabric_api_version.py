@@ -0,0 +1,54 @@
+DOCUMENTATION = r'''
+---
+name: fabric_api_version
+short_description: Look up the download URL and sha1 of a Fabric API version
+description:
+  - Reads the entry of a single Fabric API version from the role's files/fabric_api_versions.tsv index,
+    instead of loading every known Fabric API version as a role variable.
+options:
+  _terms:
+    description: Fabric API version numbers, e.g. 0.119.2+1.21.4
+    required: true
+'''
+
+EXAMPLES = r'''
+- name: Show Fabric API download URL
+  ansible.builtin.debug:
+    msg: "{{ lookup('fabric_api_version', '0.119.2+1.21.4').url }}"
+'''
+
+RETURN = r'''
+_raw:
+  description: One dictionary with id, sha1 and url per requested version
+  type: list
+  elements: dict
+'''
+
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+import os
+
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'files', 'fabric_api_versions.tsv')
+
+
+def find_version(index_file, version_number):
+    """Scan the index for a version, stopping at the first matching line."""
+    prefix = f"{version_number}\t"
+    with open(index_file, 'r') as file:
+        for line in file:
+            if line.startswith(prefix):
+                _, version_id, sha1, url = line.rstrip('\n').split('\t')
+                return {'id': version_id, 'sha1': sha1, 'url': url}
+    return None
+
+
+class LookupModule(LookupBase):
+
+    def run(self, terms, variables=None, **kwargs):
+        entries = []
+        for term in terms:
+            entry = find_version(INDEX_FILE, term)
+            if entry is None:
+                raise AnsibleError(f"Unknown Fabric API version '{term}'")
+            entries.append(entry)
+        return entries
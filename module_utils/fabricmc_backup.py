@@ -0,0 +1,324 @@
+"""Incremental world backups: a content-addressed store of zstd compressed files and snapshot manifests.
+
+A backup directory holds objects/<xx>/<sha256>.zst, every distinct file content
+compressed once, and snapshots/<id>.json, the path, size, mtime and sha256 of every
+file of the worlds at the time of the snapshot. A file whose size and mtime are the
+ones of the previous snapshot is neither read nor stored again, so unchanged region
+files cost nothing, and files with identical content share one object.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+import traceback
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+    ZSTANDARD_IMPORT_ERROR = traceback.format_exc()
+else:
+    ZSTANDARD_IMPORT_ERROR = None
+
+from ansible.module_utils.fabricmc_rcon import RconClient, rcon_settings
+
+SNAPSHOT_VERSION = 1
+OBJECTS_DIR = 'objects'
+SNAPSHOTS_DIR = 'snapshots'
+PARTIAL_SUFFIX = '.part'
+CHUNK_SIZE = 1024 * 1024
+# Minecraft holds a lock on it while the world is loaded, it's never part of a snapshot
+SESSION_LOCK = 'session.lock'
+BACKUP_LOCK = '.lock'
+
+
+def find_worlds(workspace_dir):
+    """Return the names of the directories of workspace_dir holding a level.dat."""
+    if not os.path.isdir(workspace_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(workspace_dir)
+        if os.path.isfile(os.path.join(workspace_dir, name, 'level.dat'))
+    )
+
+
+def is_world_locked(world_dir):
+    """Return True when a running server holds the lock of the world's session.lock."""
+    try:
+        lock_file = open(os.path.join(world_dir, SESSION_LOCK), 'rb+')
+    except OSError:
+        return False
+    with lock_file:
+        try:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.lockf(lock_file, fcntl.LOCK_UN)
+        return False
+
+
+def set_idle_priority():
+    """Lower the CPU and I/O priority of the current process, returns False when ionice isn't available."""
+    os.setpriority(os.PRIO_PROCESS, 0, 19)
+    ionice = shutil.which('ionice')
+    if not ionice:
+        return False
+    subprocess.run([ionice, '-c', '3', '-p', str(os.getpid())], check=True, capture_output=True)
+    return True
+
+
+@contextlib.contextmanager
+def backup_lock(backup_dir):
+    """Hold the lock of backup_dir, a scheduled backup and one run by Ansible never write it at the same time."""
+    os.makedirs(backup_dir, mode=0o755, exist_ok=True)
+    with open(os.path.join(backup_dir, BACKUP_LOCK), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise Exception(f"Backup directory '{backup_dir}' is locked by another backup or restore")
+        yield
+
+
+def object_path(backup_dir, sha256):
+    return os.path.join(backup_dir, OBJECTS_DIR, sha256[:2], f"{sha256}.zst")
+
+
+def snapshot_ids(backup_dir):
+    """Return the ids of the snapshots in backup_dir, oldest first."""
+    snapshots_dir = os.path.join(backup_dir, SNAPSHOTS_DIR)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(filename[:-len('.json')] for filename in os.listdir(snapshots_dir) if filename.endswith('.json'))
+
+
+def load_snapshot(backup_dir, snapshot_id):
+    """Return the manifest of a snapshot, latest is the most recent one."""
+    if snapshot_id == 'latest':
+        ids = snapshot_ids(backup_dir)
+        if not ids:
+            raise Exception(f"No snapshot found in '{backup_dir}'")
+        snapshot_id = ids[-1]
+    try:
+        with open(os.path.join(backup_dir, SNAPSHOTS_DIR, f"{snapshot_id}.json"), 'r') as snapshot_file:
+            return json.load(snapshot_file)
+    except FileNotFoundError:
+        raise Exception(f"Snapshot '{snapshot_id}' was not found in '{backup_dir}'")
+
+
+def _walk_files(workspace_dir, world):
+    for dir_path, dir_names, filenames in os.walk(os.path.join(workspace_dir, world)):
+        dir_names.sort()
+        for filename in sorted(filenames):
+            if filename != SESSION_LOCK and not filename.endswith(PARTIAL_SUFFIX):
+                path = os.path.join(dir_path, filename)
+                yield os.path.relpath(path, workspace_dir), path
+
+
+def store_object(backup_dir, path, compressor):
+    """Compress the file at path into the store while hashing it, returns its sha256 and the bytes written.
+
+    The content is read once. When the store already has an object with the same
+    sha256 the compressed copy is dropped and 0 bytes are written.
+    """
+    tmp_dir = os.path.join(backup_dir, OBJECTS_DIR, 'tmp')
+    os.makedirs(tmp_dir, mode=0o755, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{os.getpid()}{PARTIAL_SUFFIX}")
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as src_file, open(tmp_path, 'wb') as tmp_file:
+        with compressor.stream_writer(tmp_file, closefd=False) as writer:
+            for chunk in iter(lambda: src_file.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                writer.write(chunk)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+        written = tmp_file.tell()
+    sha256 = hasher.hexdigest()
+    dest_path = object_path(backup_dir, sha256)
+    if os.path.exists(dest_path):
+        os.remove(tmp_path)
+        return sha256, 0
+    os.makedirs(os.path.dirname(dest_path), mode=0o755, exist_ok=True)
+    os.replace(tmp_path, dest_path)
+    return sha256, written
+
+
+def write_snapshot(workspace_dir, backup_dir, worlds, logger, level=3, clock=time.time):
+    """Store every file of the worlds and write the manifest of a new snapshot, returns its statistics.
+
+    The sha256 of a file is taken from the latest snapshot when its size and mtime
+    didn't change and its object is still in the store, only the other files are read.
+    """
+    ids = snapshot_ids(backup_dir)
+    previous = {}
+    if ids:
+        previous = {entry['path']: entry for entry in load_snapshot(backup_dir, ids[-1])['files']}
+    compressor = zstandard.ZstdCompressor(level=level)
+    started_at = clock()
+    files = []
+    stats = {"files": 0, "bytes": 0, "reused_files": 0, "stored_files": 0, "stored_bytes": 0}
+    for world in worlds:
+        for rel_path, path in _walk_files(workspace_dir, world):
+            stat = os.stat(path)
+            entry = {"path": rel_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            last = previous.get(rel_path)
+            if (
+                last and last['size'] == stat.st_size and last['mtime_ns'] == stat.st_mtime_ns
+                and os.path.exists(object_path(backup_dir, last['sha256']))
+            ):
+                entry['sha256'] = last['sha256']
+                stats['reused_files'] += 1
+            else:
+                entry['sha256'], written = store_object(backup_dir, path, compressor)
+                if written:
+                    stats['stored_files'] += 1
+                    stats['stored_bytes'] += written
+            files.append(entry)
+            stats['files'] += 1
+            stats['bytes'] += stat.st_size
+
+    snapshot_id = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(clock()))
+    suffix = 0
+    while snapshot_id + (f"-{suffix}" if suffix else '') in ids:
+        suffix += 1
+    snapshot_id += f"-{suffix}" if suffix else ''
+    snapshot = {"version": SNAPSHOT_VERSION, "id": snapshot_id, "created_at": int(clock()), "worlds": worlds,
+                "files": files}
+    snapshots_dir = os.path.join(backup_dir, SNAPSHOTS_DIR)
+    os.makedirs(snapshots_dir, mode=0o755, exist_ok=True)
+    snapshot_path = os.path.join(snapshots_dir, f"{snapshot_id}.json")
+    with open(snapshot_path + PARTIAL_SUFFIX, 'w') as snapshot_file:
+        json.dump(snapshot, snapshot_file)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(snapshot_path + PARTIAL_SUFFIX, snapshot_path)
+    stats.update(id=snapshot_id, worlds=worlds, seconds=round(clock() - started_at, 3))
+    logger.info(
+        f"Snapshot '{snapshot_id}' of {stats['files']} files, {stats['reused_files']} unchanged, "
+        f"{stats['stored_files']} new objects of {stats['stored_bytes']} bytes"
+    )
+    return stats
+
+
+def backup(workspace_dir, backup_dir, worlds, logger, rcon=None, level=3, clock=time.time):
+    """Write a snapshot of the worlds while the server doesn't save them.
+
+    With an rcon client of the running server, autosaves are turned off and the
+    worlds flushed to disk before the snapshot, autosaves are turned back on in any
+    case once it's written. Returns the snapshot statistics, with the seconds saving
+    was off.
+    """
+    if not rcon:
+        return write_snapshot(workspace_dir, backup_dir, worlds, logger, level, clock)
+    rcon.command('save-off')
+    save_off_at = clock()
+    try:
+        response = rcon.command('save-all flush')
+        if 'saved' not in response.lower():
+            raise Exception(f"save-all flush did not complete: {response}")
+        stats = write_snapshot(workspace_dir, backup_dir, worlds, logger, level, clock)
+    finally:
+        rcon.command('save-on')
+    return dict(stats, save_off_seconds=round(clock() - save_off_at, 3))
+
+
+def prune(backup_dir, keep, logger):
+    """Remove all but the keep most recent snapshots, then the objects no remaining snapshot refers to."""
+    ids = snapshot_ids(backup_dir)
+    removed = ids[:-keep] if keep > 0 else []
+    for snapshot_id in removed:
+        os.remove(os.path.join(backup_dir, SNAPSHOTS_DIR, f"{snapshot_id}.json"))
+        logger.info(f"Removed snapshot '{snapshot_id}'")
+    referenced = set()
+    for snapshot_id in snapshot_ids(backup_dir):
+        referenced.update(entry['sha256'] for entry in load_snapshot(backup_dir, snapshot_id)['files'])
+    removed_objects = 0
+    objects_dir = os.path.join(backup_dir, OBJECTS_DIR)
+    if os.path.isdir(objects_dir):
+        for prefix in os.listdir(objects_dir):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for filename in os.listdir(prefix_dir):
+                # Leftovers of an interrupted backup in tmp are never referenced either
+                if filename.split('.')[0] not in referenced:
+                    os.remove(os.path.join(prefix_dir, filename))
+                    removed_objects += 1
+    return {"removed_snapshots": removed, "removed_objects": removed_objects}
+
+
+def restore(backup_dir, snapshot_id, workspace_dir, logger, worlds=None):
+    """Replace the worlds of workspace_dir with the ones of a snapshot, returns the restored worlds.
+
+    Every world is first written to a directory next to it and checked against the
+    sha256 of the manifest, and only then swapped with the existing world. Worlds
+    loaded by a running server are refused.
+    """
+    snapshot = load_snapshot(backup_dir, snapshot_id)
+    worlds = worlds or snapshot['worlds']
+    missing = [world for world in worlds if world not in snapshot['worlds']]
+    if missing:
+        raise Exception(f"Snapshot '{snapshot['id']}' does not contain world(s) {', '.join(missing)}")
+    locked = [world for world in worlds if is_world_locked(os.path.join(workspace_dir, world))]
+    if locked:
+        raise Exception(f"World(s) {', '.join(locked)} are loaded by a running server, stop it before restoring")
+
+    decompressor = zstandard.ZstdDecompressor()
+    for world in worlds:
+        world_dir = os.path.join(workspace_dir, world)
+        restore_dir = os.path.join(workspace_dir, f".{world}.restore")
+        shutil.rmtree(restore_dir, ignore_errors=True)
+        prefix = world + os.sep
+        for entry in snapshot['files']:
+            if not entry['path'].startswith(prefix):
+                continue
+            dest_path = os.path.join(restore_dir, entry['path'][len(prefix):])
+            os.makedirs(os.path.dirname(dest_path), mode=0o755, exist_ok=True)
+            hasher = hashlib.sha256()
+            with open(object_path(backup_dir, entry['sha256']), 'rb') as object_file, open(dest_path, 'wb') as dest_file:
+                reader = decompressor.stream_reader(object_file)
+                for chunk in iter(lambda: reader.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                    dest_file.write(chunk)
+            if hasher.hexdigest() != entry['sha256']:
+                raise Exception(
+                    f"Checksum mismatch for '{entry['path']}' in snapshot '{snapshot['id']}': expected "
+                    f"sha256={entry['sha256']}, got {hasher.hexdigest()}"
+                )
+            # Keeping the mtime lets the next backup reuse the hash of the restored files
+            os.utime(dest_path, ns=(entry['mtime_ns'], entry['mtime_ns']))
+        replaced_dir = os.path.join(workspace_dir, f".{world}.replaced")
+        shutil.rmtree(replaced_dir, ignore_errors=True)
+        if os.path.exists(world_dir):
+            os.replace(world_dir, replaced_dir)
+        os.replace(restore_dir, world_dir)
+        shutil.rmtree(replaced_dir, ignore_errors=True)
+        logger.info(f"Restored world '{world}' from snapshot '{snapshot['id']}'")
+    return worlds
+
+
+def run_backup(install_dir, backup_dir, keep, logger, worlds=None, level=3, warn=None):
+    """Back up the worlds of the server installed in install_dir, over RCON when it's running, then prune.
+
+    All worlds with a level.dat are backed up when worlds is empty.
+    """
+    warn = warn or logger.warning
+    workspace_dir = os.path.join(install_dir, 'workspace')
+    worlds = worlds or find_worlds(workspace_dir)
+    if not worlds:
+        raise Exception(f"No world found in '{workspace_dir}'")
+    if not set_idle_priority():
+        warn("ionice was not found, the backup runs with the default I/O priority")
+    running = [world for world in worlds if is_world_locked(os.path.join(workspace_dir, world))]
+    with backup_lock(backup_dir):
+        if not running:
+            stats = backup(workspace_dir, backup_dir, worlds, logger, level=level)
+        else:
+            # Only the server can stop writing the worlds it has loaded
+            rcon_port, rcon_password = rcon_settings(os.path.join(workspace_dir, 'server.properties'))
+            with RconClient('127.0.0.1', rcon_port, rcon_password) as rcon:
+                stats = backup(workspace_dir, backup_dir, worlds, logger, rcon, level)
+        stats.update(prune(backup_dir, keep, logger))
+    return stats
@@ -0,0 +1,155 @@
+"""Offline bundles: a streaming tar.zst of the launcher, Fabric API, mods and datapacks with a manifest.
+
+The manifest is always the first member of the archive so it can be read without
+decompressing the rest, and it's deterministic so an unchanged resolved set
+produces the same manifest.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+import traceback
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+    ZSTANDARD_IMPORT_ERROR = traceback.format_exc()
+else:
+    ZSTANDARD_IMPORT_ERROR = None
+
+BUNDLE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+KIND_DIRS = {'launcher': 'bin', 'mods': 'mods', 'datapacks': 'datapacks'}
+CHUNK_SIZE = 1024 * 1024
+
+
+def bundle_entry(kind, filename, sha1, size, slug=None):
+    return {
+        'kind': kind,
+        'slug': slug,
+        'filename': filename,
+        'path': f"{KIND_DIRS[kind]}/{filename}",
+        'sha1': sha1,
+        'size': size,
+    }
+
+
+def new_manifest(minecraft_version, fabric_loader_version, installer_version, entries):
+    return {
+        'version': BUNDLE_VERSION,
+        'minecraft_version': minecraft_version,
+        'fabric_loader_version': fabric_loader_version,
+        'installer_version': installer_version,
+        'entries': sorted(entries, key=lambda entry: entry['path']),
+    }
+
+
+def _tar_info(name, size):
+    # Fixed ownership and mtime keep the archive identical for an identical manifest
+    tar_info = tarfile.TarInfo(name)
+    tar_info.size = size
+    tar_info.mode = 0o644
+    tar_info.mtime = 0
+    return tar_info
+
+
+def write_bundle(path, manifest, src_paths, level=3):
+    """Stream the manifest then every entry, read from src_paths keyed on entry path, into a tar.zst at path.
+
+    The archive is written to a .part file and only moved into place once complete.
+    """
+    tmp_path = f"{path}.part"
+    manifest_content = json.dumps(manifest, indent=2, sort_keys=True).encode()
+    compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+    with open(tmp_path, 'wb') as bundle_file:
+        with compressor.stream_writer(bundle_file, closefd=False) as writer:
+            with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                tar.addfile(_tar_info(MANIFEST_NAME, len(manifest_content)), io.BytesIO(manifest_content))
+                for entry in manifest['entries']:
+                    with open(src_paths[entry['path']], 'rb') as src_file:
+                        tar.addfile(_tar_info(entry['path'], entry['size']), src_file)
+        bundle_file.flush()
+        os.fsync(bundle_file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _open_stream(bundle_file):
+    return tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(bundle_file), mode='r|')
+
+
+def read_manifest(path):
+    """Return the manifest of the bundle at path, only the start of the archive is decompressed."""
+    with open(path, 'rb') as bundle_file, _open_stream(bundle_file) as tar:
+        member = tar.next()
+        if member is None or member.name != MANIFEST_NAME:
+            raise Exception(f"Bundle '{path}' does not start with a {MANIFEST_NAME} member")
+        return json.load(tar.extractfile(member))
+
+
+def load_manifest(path):
+    """Return a manifest pushed to a host on its own, without the archive it describes."""
+    with open(path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+
+def check_manifest(path, manifest, minecraft_version):
+    if manifest.get('version') != BUNDLE_VERSION:
+        raise Exception(f"Bundle '{path}' has unsupported version '{manifest.get('version')}', expected '{BUNDLE_VERSION}'")
+    if manifest['minecraft_version'] != minecraft_version:
+        raise Exception(
+            f"Bundle '{path}' was exported for Minecraft version '{manifest['minecraft_version']}', "
+            f"not '{minecraft_version}'"
+        )
+
+
+def select_entries(path, manifest, kind, slugs=None):
+    """Return the entries of a kind, restricted to slugs plus the entries without a slug, e.g. Fabric API."""
+    entries = [entry for entry in manifest['entries'] if entry['kind'] == kind]
+    if slugs is None:
+        return entries
+    by_slug = {entry['slug']: entry for entry in entries if entry['slug']}
+    missing = [slug for slug in slugs if slug not in by_slug]
+    if missing:
+        raise Exception(f"Bundle '{path}' does not contain {kind} {', '.join(missing)}")
+    return [by_slug[slug] for slug in slugs] + [entry for entry in entries if not entry['slug']]
+
+
+def extract_entries(path, entries, dest_dir, logger):
+    """Stream through the bundle at path and write the given entries into dest_dir.
+
+    Every other member is skipped without being written anywhere, and reading stops
+    as soon as the last wanted entry has been extracted. Each file goes through a .part
+    file and is only moved into place once its sha1 matches the manifest.
+    """
+    wanted = {entry['path']: entry for entry in entries}
+    extracted = []
+    with open(path, 'rb') as bundle_file, _open_stream(bundle_file) as tar:
+        for member in tar:
+            entry = wanted.pop(member.name, None)
+            if not entry:
+                continue
+            dest_path = os.path.join(dest_dir, entry['filename'])
+            part_path = f"{dest_path}.part"
+            hasher = hashlib.sha1()
+            src_file = tar.extractfile(member)
+            with open(part_path, 'wb') as part_file:
+                for chunk in iter(lambda: src_file.read(CHUNK_SIZE), b''):
+                    part_file.write(chunk)
+                    hasher.update(chunk)
+            if hasher.hexdigest() != entry['sha1']:
+                os.remove(part_path)
+                raise Exception(
+                    f"Checksum mismatch for '{entry['path']}' in bundle '{path}': expected "
+                    f"sha1={entry['sha1']}, got {hasher.hexdigest()}"
+                )
+            os.replace(part_path, dest_path)
+            logger.info(f"Extracted '{entry['path']}' from bundle '{path}' to '{dest_path}'")
+            extracted.append(entry['filename'])
+            if not wanted:
+                break
+    if wanted:
+        raise Exception(f"Bundle '{path}' is missing member(s) {', '.join(sorted(wanted))}")
+    return extracted
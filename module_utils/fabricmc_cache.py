@@ -0,0 +1,122 @@
+"""Host-wide content-addressed cache of the artifacts installed by the FabricMC modules."""
+
+import fcntl
+import os
+import shutil
+import threading
+import time
+
+# ioctl request number of FICLONE, which reflinks a whole file on btrfs, xfs and friends
+FICLONE = 0x40049409
+
+
+def clone_file(src_path, dest_path):
+    """Create dest_path with the content of src_path, sharing storage where the filesystem allows.
+
+    Tries a hardlink first, then a reflink, and falls back to a plain copy,
+    e.g. when both paths are on different filesystems. Returns the method used.
+    """
+    try:
+        os.link(src_path, dest_path)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+            fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+        return 'reflink'
+    except OSError:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+    shutil.copyfile(src_path, dest_path)
+    return 'copy'
+
+
+def place_file(src_path, dest_path):
+    """Atomically replace dest_path with a clone of src_path."""
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        method = clone_file(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return method
+
+
+class ArtifactCache:
+    """Content-addressed store of verified artifacts, shared by every installation on a host.
+
+    Objects live under <cache_dir>/objects/<algorithm>/<digest[:2]>/<digest[2:]>
+    and are only ever added after their checksum has been verified. The access
+    time of an object marks its last use, it's set explicitly so the cache works
+    on noatime mounts and doesn't touch the mtime the hash index relies on. A
+    read-only cache is only looked into, e.g. in check mode.
+    """
+
+    def __init__(self, cache_dir, max_size, read_only=False):
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'hit_bytes': 0,
+            'miss_bytes': 0,
+            'evicted_bytes': 0,
+        }
+        if not read_only:
+            os.makedirs(self.objects_dir, exist_ok=True)
+
+    def object_path(self, algorithm, digest):
+        return os.path.join(self.objects_dir, algorithm, digest[:2], digest[2:])
+
+    def has(self, algorithm, digest):
+        return os.path.isfile(self.object_path(algorithm, digest))
+
+    def _touch(self, path):
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+
+    def install(self, algorithm, digest, dest_path):
+        """Install a cached object at dest_path, return False when the object is not cached."""
+        object_path = self.object_path(algorithm, digest)
+        if not os.path.isfile(object_path):
+            return False
+        place_file(object_path, dest_path)
+        self._touch(object_path)
+        with self.lock:
+            self.stats['hits'] += 1
+            self.stats['hit_bytes'] += os.path.getsize(object_path)
+        return True
+
+    def add(self, src_path, algorithm, digest):
+        """Add a verified file to the cache after it had to be downloaded."""
+        object_path = self.object_path(algorithm, digest)
+        with self.lock:
+            self.stats['misses'] += 1
+            self.stats['miss_bytes'] += os.path.getsize(src_path)
+        if os.path.isfile(object_path):
+            return
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        place_file(src_path, object_path)
+        self._touch(object_path)
+
+    def evict(self):
+        """Remove the least recently used objects until the cache fits in max_size bytes."""
+        objects = []
+        for dir_path, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                stat = os.stat(path)
+                objects.append((stat.st_atime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in objects)
+        for _, size, path in sorted(objects):
+            if total_size <= self.max_size:
+                break
+            os.remove(path)
+            total_size -= size
+            self.stats['evicted_bytes'] += size
+        self.stats['size'] = total_size
+
+    def report(self):
+        return dict(self.stats)
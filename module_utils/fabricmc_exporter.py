@@ -0,0 +1,259 @@
+"""Server performance metrics from logs/latest.log and RCON in the Prometheus text format.
+
+The log is parsed incrementally, its inode and offset are saved with the counters
+so that a restarted exporter neither reads a line twice nor resets its counters.
+"""
+
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ansible.module_utils.fabricmc_log import LogTail
+from ansible.module_utils.fabricmc_rcon import RconClient, rcon_settings
+
+STATE_VERSION = 1
+# Messages follow the vanilla "[12:34:56] [Server thread/INFO]: " or the Fabric
+# "[12:34:56] [Server thread/INFO] (Minecraft) " prefix, chat messages start with "<player>" and never match
+MESSAGE_PATTERN = re.compile(r'^\[[^\]]*\] \[[^\]]*\](?:: | \([^)]*\) )(.*)$')
+CANT_KEEP_UP_PATTERN = re.compile(r"Can't keep up! Is the server overloaded\? Running (\d+)ms or (\d+) ticks behind")
+DONE_PATTERN = re.compile(r'^Done \((\d+(?:\.\d+)?)s\)!')
+STARTING_PATTERN = re.compile(r'^Starting minecraft server version')
+JOINED_PATTERN = re.compile(r'^(\w{1,16}) joined the game$')
+LEFT_PATTERN = re.compile(r'^(\w{1,16}) left the game$')
+LIST_PATTERN = re.compile(r'There are (\d+) of a max of (\d+) players online')
+TICK_RATE_PATTERN = re.compile(r'Target tick rate: (\d+(?:\.\d+)?)')
+MSPT_PATTERN = re.compile(r'Average time per tick: (\d+(?:\.\d+)?)ms')
+PERCENTILE_PATTERN = re.compile(r'P(\d+): (\d+(?:\.\d+)?)ms')
+
+COUNTERS = {
+    'cant_keep_up_total': "Can't keep up! warnings logged by the server",
+    'behind_milliseconds_total': "Milliseconds the server reported running behind in Can't keep up! warnings",
+    'behind_ticks_total': "Ticks the server reported running behind in Can't keep up! warnings",
+    'starts_total': 'Server starts logged',
+    'player_joins_total': 'Players who joined the game',
+    'player_leaves_total': 'Players who left the game',
+}
+
+
+class LogMetrics:
+    """Counters and gauges updated by the lines of the server log."""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.startup_seconds = None
+        self.players = set()
+
+    def feed(self, line):
+        match = MESSAGE_PATTERN.match(line)
+        if not match:
+            return
+        message = match.group(1)
+        match = CANT_KEEP_UP_PATTERN.search(message)
+        if match:
+            self.counters['cant_keep_up_total'] += 1
+            self.counters['behind_milliseconds_total'] += int(match.group(1))
+            self.counters['behind_ticks_total'] += int(match.group(2))
+        elif STARTING_PATTERN.match(message):
+            # Players of a previous run never logged out when the server crashed
+            self.players.clear()
+        elif DONE_PATTERN.match(message):
+            self.counters['starts_total'] += 1
+            self.startup_seconds = float(DONE_PATTERN.match(message).group(1))
+        elif JOINED_PATTERN.match(message):
+            self.counters['player_joins_total'] += 1
+            self.players.add(JOINED_PATTERN.match(message).group(1))
+        elif LEFT_PATTERN.match(message):
+            self.counters['player_leaves_total'] += 1
+            self.players.discard(LEFT_PATTERN.match(message).group(1))
+
+    def to_dict(self):
+        return {"counters": self.counters, "startup_seconds": self.startup_seconds, "players": sorted(self.players)}
+
+    @classmethod
+    def from_dict(cls, data):
+        log_metrics = cls()
+        log_metrics.counters.update(data.get('counters', {}))
+        log_metrics.startup_seconds = data.get('startup_seconds')
+        log_metrics.players = set(data.get('players', []))
+        return log_metrics
+
+
+def parse_list(response):
+    """Return the online and max players of the list command's response, None when it doesn't match."""
+    match = LIST_PATTERN.search(response)
+    if not match:
+        return None
+    return {"players_online": int(match.group(1)), "players_max": int(match.group(2))}
+
+
+def parse_tick_query(response):
+    """Return the MSPT, its percentiles and the TPS of the tick query command's response, None when it's unknown.
+
+    The server can't tick faster than its target tick rate, the TPS is the lower of
+    the target and the ticks the average MSPT allows per second.
+    """
+    mspt_match = MSPT_PATTERN.search(response)
+    if not mspt_match:
+        return None
+    rate_match = TICK_RATE_PATTERN.search(response)
+    target = float(rate_match.group(1)) if rate_match else 20.0
+    mspt = float(mspt_match.group(1))
+    return {
+        "mspt": mspt,
+        "mspt_percentiles": {percentile: float(value) for percentile, value in PERCENTILE_PATTERN.findall(response)},
+        "tps": round(min(target, 1000 / mspt), 2) if mspt else target,
+        "target_tps": target,
+    }
+
+
+def sample_rcon(rcon):
+    """Return the players and tick metrics sampled with the list and tick query commands.
+
+    tick query only exists since Minecraft 1.20.3, the sample has no tick metrics
+    on older servers.
+    """
+    sample = {"up": 1}
+    sample.update(parse_list(rcon.command('list')) or {})
+    sample.update(parse_tick_query(rcon.command('tick query')) or {})
+    return sample
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(server, log_metrics, rcon_sample=None):
+    """Return the metrics in the Prometheus text format, every sample labelled with the server name.
+
+    rcon_sample is None when RCON isn't enabled, only its up key is set when the
+    server didn't answer.
+    """
+    labels = f'server="{server}"'
+    lines = []
+
+    def metric(name, metric_type, help_text, value, label_name=None):
+        lines.append(f"# HELP fabricmc_{name} {help_text}")
+        lines.append(f"# TYPE fabricmc_{name} {metric_type}")
+        if label_name:
+            for label_value, sample_value in sorted(value.items()):
+                sample_labels = f'{labels},{label_name}="{label_value}"'
+                lines.append(f"fabricmc_{name}{{{sample_labels}}} {_format_value(sample_value)}")
+        else:
+            lines.append(f"fabricmc_{name}{{{labels}}} {_format_value(value)}")
+
+    for name, help_text in COUNTERS.items():
+        metric(name, 'counter', help_text, log_metrics.counters[name])
+    if log_metrics.startup_seconds is not None:
+        metric('startup_seconds', 'gauge', 'Seconds the server reported taking to start', log_metrics.startup_seconds)
+    metric('log_players_online', 'gauge', 'Players online according to the joins and leaves logged',
+           len(log_metrics.players))
+    if rcon_sample is not None:
+        metric('rcon_up', 'gauge', 'Whether the server answered over RCON', rcon_sample['up'])
+        if 'players_online' in rcon_sample:
+            metric('players_online', 'gauge', 'Players online according to the list command',
+                   rcon_sample['players_online'])
+            metric('players_max', 'gauge', 'Maximum players of the server', rcon_sample['players_max'])
+        if 'mspt' in rcon_sample:
+            metric('mspt', 'gauge', 'Average milliseconds per tick', rcon_sample['mspt'])
+            if rcon_sample['mspt_percentiles']:
+                metric('mspt_percentile', 'gauge', 'Percentiles of the milliseconds per tick',
+                       rcon_sample['mspt_percentiles'], 'percentile')
+            metric('tps', 'gauge', 'Ticks per second', rcon_sample['tps'])
+            metric('target_tps', 'gauge', 'Target ticks per second', rcon_sample['target_tps'])
+    return '\n'.join(lines) + '\n'
+
+
+def load_state(state_path, log_path):
+    """Return the tail and log metrics saved in state_path, a new tail at the start of the log without one."""
+    try:
+        with open(state_path, 'r') as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return LogTail(log_path), LogMetrics()
+    return LogTail(log_path, state.get('inode'), state.get('offset', 0)), LogMetrics.from_dict(state)
+
+
+def write_atomically(path, content):
+    """Write content to a file moved into place, a textfile collector never reads a partial file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, path)
+
+
+def save_state(state_path, tail, log_metrics):
+    state = dict(log_metrics.to_dict(), version=STATE_VERSION, inode=tail.inode, offset=tail.offset)
+    write_atomically(state_path, json.dumps(state))
+
+
+class Exporter:
+    """Collects the metrics of the server installed in install_dir every time collect() is called."""
+
+    def __init__(self, install_dir, server, state_path, logger, rcon_enabled=True):
+        self.workspace_dir = os.path.join(install_dir, 'workspace')
+        self.server = server
+        self.state_path = state_path
+        self.logger = logger
+        self.rcon_enabled = rcon_enabled
+        self.tail, self.log_metrics = load_state(state_path, os.path.join(self.workspace_dir, 'logs', 'latest.log'))
+        self.rcon = None
+        self.metrics = render(server, self.log_metrics)
+
+    def _sample_rcon(self):
+        try:
+            port, password = rcon_settings(os.path.join(self.workspace_dir, 'server.properties'))
+        except Exception:
+            return None
+        try:
+            if not self.rcon:
+                self.rcon = RconClient('127.0.0.1', port, password, timeout=5)
+                self.rcon.connect()
+            return sample_rcon(self.rcon)
+        except Exception as error:
+            # The server is stopped or restarting, connect again on the next collection
+            self.logger.debug(f"RCON sample failed: {error}")
+            if self.rcon:
+                self.rcon.close()
+                self.rcon = None
+            return {"up": 0}
+
+    def collect(self):
+        for line in self.tail.read_lines():
+            self.log_metrics.feed(line)
+        save_state(self.state_path, self.tail, self.log_metrics)
+        rcon_sample = self._sample_rcon() if self.rcon_enabled else None
+        self.metrics = render(self.server, self.log_metrics, rcon_sample)
+        return self.metrics
+
+    def close(self):
+        self.tail.close()
+        if self.rcon:
+            self.rcon.close()
+
+
+def serve(exporter, listen):
+    """Serve the last collected metrics on /metrics of host:port in a background thread."""
+    host, _, port = listen.rpartition(':')
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = exporter.metrics.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host or '127.0.0.1', int(port)), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
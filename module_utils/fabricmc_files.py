@@ -0,0 +1,411 @@
+"""File checksum and download helpers shared by the FabricMC modules."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from ansible.module_utils.fabricmc_http import run_parallel, send_request
+
+HASH_INDEX_FILENAME = '.fabricmc-hash-index.json'
+PARTIAL_SUFFIX = '.part'
+HASH_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def get_expected_hash(file_info):
+    """Return expected checksum tuple (algorithm, value) from Modrinth file metadata."""
+    hashes = file_info.get('hashes') if isinstance(file_info, dict) else getattr(file_info, 'hashes', None)
+    if not hashes:
+        return None, None
+
+    if isinstance(hashes, dict):
+        hash_map = hashes
+    else:
+        hash_map = {}
+        for algorithm in ('sha1', 'sha512', 'sha256'):
+            hash_value = getattr(hashes, algorithm, None)
+            if hash_value:
+                hash_map[algorithm] = hash_value
+
+    for algorithm in ('sha1', 'sha512', 'sha256'):
+        hash_value = hash_map.get(algorithm)
+        if hash_value:
+            return algorithm, hash_value
+
+    return None, None
+
+
+def calculate_file_hashes(file_path, algorithms):
+    """Return the digest of a file for every algorithm, computed in a single read pass.
+
+    The file is read in large chunks into one reused buffer. hashlib releases the
+    GIL while hashing chunks this size, so threads hash several files in parallel.
+    """
+    hashers = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as file_handle:
+        for size in iter(lambda: file_handle.readinto(buffer), 0):
+            for hasher in hashers.values():
+                hasher.update(view[:size])
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+
+
+def calculate_file_hash(file_path, algorithm):
+    return calculate_file_hashes(file_path, [algorithm])[algorithm]
+
+
+class HashIndex:
+    """Sidecar index of file digests kept next to the files it describes.
+
+    Entries are keyed on filename and hold the size, mtime_ns and inode the digests
+    were calculated for. A digest is only reused while all three still match, any
+    change causes the file to be hashed again. With full set, every digest is
+    recalculated once per run and the index is only refreshed.
+    """
+
+    def __init__(self, dir_path, full=False, metrics=None):
+        self.path = os.path.join(dir_path, HASH_INDEX_FILENAME)
+        self.full = full
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.verified = set()
+        self.dirty = False
+        try:
+            with open(self.path, 'r') as index_file:
+                self.entries = json.load(index_file).get('files', {})
+        except (OSError, ValueError):
+            self.dirty = True
+
+    def _stat(self, file_path):
+        stat = os.stat(file_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino}
+
+    def _is_valid(self, entry, stat):
+        return bool(entry) and all(entry.get(key) == value for key, value in stat.items())
+
+    def _entry(self, file_path, stat):
+        filename = os.path.basename(file_path)
+        entry = self.entries.get(filename)
+        if not self._is_valid(entry, stat):
+            entry = dict(stat, digests={})
+            self.entries[filename] = entry
+            self.dirty = True
+        return entry
+
+    def lookup(self, file_path, algorithm):
+        """Return the indexed digest of a file while its entry is still valid, None otherwise, never hashing it."""
+        stat = self._stat(file_path)
+        with self.lock:
+            entry = self.entries.get(os.path.basename(file_path))
+            return entry['digests'].get(algorithm) if self._is_valid(entry, stat) else None
+
+    def digests(self, file_path, algorithms):
+        """Return the digests of a file, hashing it once for all the algorithms the index has no valid entry for."""
+        stat = self._stat(file_path)
+        with self.lock:
+            indexed = self._entry(file_path, stat)['digests']
+            digests = {
+                algorithm: indexed[algorithm] for algorithm in algorithms
+                if indexed.get(algorithm) and (not self.full or (file_path, algorithm) in self.verified)
+            }
+        missing = [algorithm for algorithm in algorithms if algorithm not in digests]
+        if not missing:
+            return digests
+        started_at = time.monotonic()
+        calculated = calculate_file_hashes(file_path, missing)
+        if self.metrics:
+            self.metrics.add('hash_seconds', time.monotonic() - started_at)
+            self.metrics.add('bytes_hashed', stat['size'])
+        for algorithm, digest in calculated.items():
+            self.record(file_path, algorithm, digest, stat)
+        digests.update(calculated)
+        return digests
+
+    def digest(self, file_path, algorithm):
+        """Return the digest of a file, hashing it only when the index has no valid entry for it."""
+        return self.digests(file_path, [algorithm])[algorithm]
+
+    def record(self, file_path, algorithm, digest, stat=None):
+        """Store a digest which has been verified for the current content of a file."""
+        stat = stat or self._stat(file_path)
+        with self.lock:
+            entry = self._entry(file_path, stat)
+            self.verified.add((file_path, algorithm))
+            if entry['digests'].get(algorithm) != digest:
+                entry['digests'][algorithm] = digest
+                self.dirty = True
+
+    def forget(self, file_path):
+        with self.lock:
+            if self.entries.pop(os.path.basename(file_path), None):
+                self.dirty = True
+
+    def save(self):
+        """Write the index atomically, dropping entries of files which no longer exist."""
+        dir_path = os.path.dirname(self.path)
+        with self.lock:
+            for filename in list(self.entries):
+                if not os.path.isfile(os.path.join(dir_path, filename)):
+                    del self.entries[filename]
+                    self.dirty = True
+            if not self.dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as index_file:
+                json.dump({'version': 1, 'files': self.entries}, index_file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+def hash_files(hash_index, file_paths, algorithms, workers):
+    """Verify files in parallel on a pool of workers, returns their digests in file_paths order.
+
+    Files the hash index holds valid digests for aren't read again.
+    """
+    return run_parallel(lambda file_path: hash_index.digests(file_path, algorithms), file_paths, workers)
+
+
+def list_files(dest_dir, extension):
+    """Return the paths of the files in dest_dir with the given extension."""
+    if not os.path.isdir(dest_dir):
+        return []
+    return [
+        os.path.join(dest_dir, filename)
+        for filename in sorted(os.listdir(dest_dir))
+        if filename.lower().endswith(extension) and os.path.isfile(os.path.join(dest_dir, filename))
+    ]
+
+
+def remove_stale_partials(dest_dir, max_age, logger):
+    """Remove partial downloads which have not been resumed for more than max_age seconds."""
+    if not os.path.isdir(dest_dir):
+        return
+    now = time.time()
+    for part_path in list_files(dest_dir, PARTIAL_SUFFIX):
+        if now - os.path.getmtime(part_path) > max_age:
+            logger.info(f"Removing stale partial download '{part_path}'")
+            os.remove(part_path)
+
+
+def unexpected_files(dest_dir, expected_filenames):
+    """Return the filenames in dest_dir which are not one of the expected filenames.
+
+    Hidden files, like the hash index, and partial downloads are left out.
+    """
+    if not os.path.isdir(dest_dir):
+        return []
+    return [
+        filename for filename in sorted(os.listdir(dest_dir))
+        if not (filename in expected_filenames or filename.startswith('.') or filename.endswith(PARTIAL_SUFFIX)
+                or not os.path.isfile(os.path.join(dest_dir, filename)))
+    ]
+
+
+def remove_unexpected_files(dest_dir, expected_filenames, logger, hash_index=None):
+    """Remove every file in dest_dir which is not one of the expected filenames, see unexpected_files().
+
+    Returns the removed filenames.
+    """
+    removed = []
+    for filename in unexpected_files(dest_dir, expected_filenames):
+        file_path = os.path.join(dest_dir, filename)
+        logger.info(f"Removing unexpected file '{file_path}'")
+        os.remove(file_path)
+        if hash_index:
+            hash_index.forget(file_path)
+        removed.append(filename)
+    return removed
+
+
+def swap_symlink(target, link_path, check_mode=False):
+    """Atomically point link_path at target, returns False when it already does."""
+    if os.path.islink(link_path) and os.readlink(link_path) == target:
+        return False
+    if check_mode:
+        return True
+    tmp_path = f"{link_path}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.symlink(target, tmp_path)
+    os.replace(tmp_path, link_path)
+    return True
+
+
+def write_file(path, content, mode, check_mode=False):
+    """Atomically write content to path with the given mode, returns False when it's already in place."""
+    if os.path.isfile(path) and (os.stat(path).st_mode & 0o7777) == mode:
+        with open(path, 'r') as existing_file:
+            if existing_file.read() == content:
+                return False
+    if check_mode:
+        return True
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as tmp_file:
+        tmp_file.write(content)
+    os.chmod(tmp_path, mode)
+    os.replace(tmp_path, path)
+    return True
+
+
+def resume_offset(part_path, hasher):
+    """Return the size of an existing partial download, feeding its content to the hasher."""
+    if not os.path.isfile(part_path):
+        return 0
+    offset = 0
+    with open(part_path, 'rb') as file_handle:
+        for chunk in iter(lambda: file_handle.read(HASH_CHUNK_SIZE), b''):
+            offset += len(chunk)
+            if hasher:
+                hasher.update(chunk)
+    return offset
+
+
+def open_download(session, url, offset, metrics=None):
+    headers = {'Range': f"bytes={offset}-"} if offset else None
+    return send_request(session, 'GET', url, metrics=metrics, stream=True, headers=headers)
+
+
+def is_resumed(response, offset):
+    """Return True if the server answered a Range request with the requested remainder."""
+    content_range = response.headers.get('Content-Range', '')
+    return response.status_code == 206 and content_range.startswith(f"bytes {offset}-")
+
+
+def fsync_dir(dir_path):
+    try:
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def has_valid_file(file_info, dest_path, hash_index=None):
+    """Return True if dest_path exists with the checksum of the Modrinth file, or exists at all when it has none."""
+    if not os.path.exists(dest_path):
+        return False
+    expected_hash_algorithm, expected_hash_value = get_expected_hash(file_info)
+    if not (expected_hash_algorithm and expected_hash_value):
+        return True
+    if hash_index:
+        return hash_index.digest(dest_path, expected_hash_algorithm) == expected_hash_value
+    return calculate_file_hash(dest_path, expected_hash_algorithm) == expected_hash_value
+
+
+def fetch_part(session, file_info, part_path, offset, download_hasher, logger, metrics=None):
+    """Write the file to part_path from byte offset on, restarting from scratch when the server can't resume.
+
+    Returns the hasher fed with the whole content of the .part file.
+    """
+    download_url = file_info['url']
+    filename = file_info['filename']
+    if offset and offset == file_info.get('size'):
+        logger.info(f"Partial download '{part_path}' is already complete")
+        return download_hasher
+
+    logger.info(f"Downloading '{filename}' from {download_url}{f' resuming at byte {offset}' if offset else ''}...")
+    started_at = time.monotonic()
+    response = open_download(session, download_url, offset, metrics)
+    if offset and not is_resumed(response, offset):
+        logger.warning(f"Server did not resume '{filename}' at byte {offset}, restarting download")
+        response.close()
+        offset = 0
+        download_hasher = hashlib.new(download_hasher.name) if download_hasher else None
+        response = open_download(session, download_url, offset, metrics)
+    if metrics:
+        metrics.set('http_status', response.status_code)
+    response.raise_for_status()
+
+    downloaded = 0
+    with response, open(part_path, 'ab' if offset else 'wb') as f:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            if not chunk:
+                continue
+            f.write(chunk)
+            downloaded += len(chunk)
+            if download_hasher:
+                download_hasher.update(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    if metrics:
+        metrics.add('bytes_downloaded', downloaded)
+        metrics.add('download_seconds', time.monotonic() - started_at)
+    return download_hasher
+
+
+def download_file(session, file_info, dest_dir, kind, slug, logger, hash_index=None, cache=None, metrics=None):
+    """Download a Modrinth file into dest_dir unless a file with a valid checksum already exists.
+
+    The file is taken from the artifact cache when one is given and holds it.
+    Otherwise it is written to a .part file first, which is resumed with a Range
+    request when a previous download was interrupted, and is only moved into
+    place and added to the cache once its checksum has been verified. A resumed
+    download whose checksum doesn't match is downloaded once more from scratch. With
+    metrics, the HTTP status, bytes and time of the download and the cache
+    outcome are recorded.
+
+    Returns True if the file was installed, False if it already existed.
+    """
+    filename = file_info['filename']
+    dest_path = os.path.join(dest_dir, filename)
+    expected_hash_algorithm, expected_hash_value = get_expected_hash(file_info)
+
+    # Skip download if the file already exists and checksum is valid
+    if os.path.exists(dest_path):
+        if has_valid_file(file_info, dest_path, hash_index):
+            checksum = " with valid checksum" if expected_hash_value else ""
+            logger.info(f"{kind} '{filename}' already exists at '{dest_path}'{checksum}, skipping download")
+            return False
+
+        logger.warning(f"{kind} '{filename}' exists at '{dest_path}' but checksum mismatch, re-downloading")
+        if hash_index:
+            hash_index.forget(dest_path)
+
+    if cache and expected_hash_value and cache.install(expected_hash_algorithm, expected_hash_value, dest_path):
+        logger.info(f"Installed '{filename}' from the artifact cache to '{dest_path}'")
+        if metrics:
+            metrics.set('cache', 'hit')
+        if hash_index:
+            hash_index.record(dest_path, expected_hash_algorithm, expected_hash_value)
+        return True
+
+    part_path = f"{dest_path}{PARTIAL_SUFFIX}"
+    download_hasher = hashlib.new(expected_hash_algorithm) if expected_hash_algorithm else None
+    offset = resume_offset(part_path, download_hasher)
+    download_hasher = fetch_part(session, file_info, part_path, offset, download_hasher, logger, metrics)
+
+    if download_hasher and expected_hash_value:
+        downloaded_hash_value = download_hasher.hexdigest()
+        if downloaded_hash_value != expected_hash_value and offset:
+            # The leftover .part itself may be corrupt, the file is downloaded once more from scratch
+            logger.warning(f"Checksum mismatch for '{filename}' resumed at byte {offset}, restarting download")
+            download_hasher = fetch_part(session, file_info, part_path, 0, hashlib.new(expected_hash_algorithm),
+                                         logger, metrics)
+            downloaded_hash_value = download_hasher.hexdigest()
+        if downloaded_hash_value != expected_hash_value:
+            os.remove(part_path)
+            raise Exception(
+                f"Checksum mismatch for {kind.lower()} '{slug}' file '{filename}': expected "
+                f"{expected_hash_algorithm}={expected_hash_value}, got {downloaded_hash_value}"
+            )
+
+    # Only ever expose complete and verified files under their final name
+    os.replace(part_path, dest_path)
+    fsync_dir(dest_dir)
+    if hash_index and download_hasher:
+        hash_index.record(dest_path, expected_hash_algorithm, download_hasher.hexdigest())
+    if cache and download_hasher and expected_hash_value:
+        cache.add(dest_path, expected_hash_algorithm, expected_hash_value)
+        if metrics:
+            metrics.set('cache', 'miss')
+
+    logger.info(f"Successfully downloaded '{filename}' to '{dest_path}'")
+    return True
@@ -0,0 +1,150 @@
+"""HTTP session, rate limiting and worker pool helpers shared by the FabricMC modules."""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'littlegodzillalaboratory/ansible-role-fabricmc'
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RATE_LIMIT = 300
+DEFAULT_RATE_WINDOW = 60
+MAX_RETRIES = 5
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Token bucket limiter kept in sync with Modrinth's X-Ratelimit-* response headers.
+
+    The bucket starts with Modrinth's documented quota and refills continuously.
+    Every response narrows the bucket down to what the server says is remaining,
+    and an exhausted quota or a 429 blocks all workers until the reset time.
+    A non-blocking limiter never waits, it raises instead, e.g. in check mode.
+    """
+
+    def __init__(self, limit=DEFAULT_RATE_LIMIT, window=DEFAULT_RATE_WINDOW, blocking=True):
+        self.lock = threading.Lock()
+        self.blocking = blocking
+        self.window = window
+        self.capacity = limit
+        self.rate = limit / window
+        self.tokens = float(limit)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Block until a request may be sent, return the number of seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            if not self.blocking:
+                raise Exception(f"Modrinth rate limit exhausted, the next request would have to wait {delay:.1f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, headers):
+        """Synchronise the bucket with the rate limit headers of a response."""
+        limit = _int_header(headers, 'X-Ratelimit-Limit')
+        remaining = _int_header(headers, 'X-Ratelimit-Remaining')
+        reset = _int_header(headers, 'X-Ratelimit-Reset')
+        if limit is None and remaining is None:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit:
+                self.capacity = limit
+                self.rate = limit / self.window
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+                if remaining <= 0 and reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def backoff(self, seconds):
+        """Stop every worker from sending requests for the given number of seconds."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = 0.0
+            self.updated_at = now
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+def new_session(workers):
+    """Create a pooled HTTP session which can be shared by all download workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, workers))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def retry_delay(response, attempt):
+    """Return how long to wait before retrying a rate limited response."""
+    for header in ('Retry-After', 'X-Ratelimit-Reset'):
+        delay = _int_header(response.headers, header)
+        if delay is not None:
+            return max(delay, 1)
+    return 2 ** attempt
+
+
+def send_request(session, method, url, limiter=None, metrics=None, **kwargs):
+    """Send an HTTP request, waiting for the rate limiter and backing off on HTTP 429.
+
+    With metrics, the number of requests and the time spent waiting are recorded.
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    for attempt in range(MAX_RETRIES + 1):
+        waited = limiter.acquire() if limiter else 0
+        response = session.request(method, url, **kwargs)
+        if metrics:
+            metrics.add('requests', 1)
+            metrics.add('sleep_seconds', waited)
+        if limiter:
+            limiter.update(response.headers)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        delay = retry_delay(response, attempt)
+        response.close()
+        if metrics:
+            metrics.add('rate_limited', 1)
+        if limiter:
+            limiter.backoff(delay)
+        else:
+            time.sleep(delay)
+            if metrics:
+                metrics.add('sleep_seconds', delay)
+    return response
+
+
+def run_parallel(func, items, workers):
+    """Apply func to every item using a bounded worker pool, return results in item order."""
+    items = list(items)
+    if not items:
+        return []
+    workers = max(1, min(workers, len(items)))
+    if workers == 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
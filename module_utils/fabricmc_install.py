@@ -0,0 +1,365 @@
+"""Install flow shared by the FabricMC modules: resolve Modrinth projects, download their files and reconcile the directory."""
+
+import os
+
+from ansible.module_utils.fabricmc_bundle import extract_entries
+from ansible.module_utils.fabricmc_cache import ArtifactCache, place_file
+from ansible.module_utils.fabricmc_files import (
+    HashIndex, download_file, get_expected_hash, has_valid_file, hash_files, list_files, remove_stale_partials,
+    remove_unexpected_files, unexpected_files
+)
+from ansible.module_utils.fabricmc_http import RateLimiter, new_session, run_parallel
+from ansible.module_utils.fabricmc_lock import locked_versions
+from ansible.module_utils.fabricmc_metrics import Metrics
+from ansible.module_utils.fabricmc_modrinth import MetadataCache, ModrinthClient, resolve_versions, select_file
+
+KINDS = {
+    'mods': {'name': 'mod', 'label': 'Mod', 'loaders': ['fabric'], 'extension': '.jar', 'file_extension': None},
+    'datapacks': {'name': 'datapack', 'label': 'Datapack', 'loaders': None, 'extension': '.zip', 'file_extension': '.zip'},
+}
+
+
+class Installer:
+    """Downloads Modrinth projects into directories, sharing one session, rate limiter, cache and metrics between them.
+
+    In check mode nothing is downloaded or written and the rate limiter never waits,
+    the install methods only report what they would change, see plan_files().
+    """
+
+    def __init__(self, workers, verify, partial_max_age, cache_dir, cache_max_size, cache_mode,
+                 metadata_cache_ttl, logger, warn, check_mode=False):
+        self.workers = workers
+        self.verify = verify
+        self.partial_max_age = partial_max_age
+        self.logger = logger
+        self.check_mode = check_mode
+        self.metrics = Metrics()
+        self.cache = None
+        self.metadata_cache = None
+        if cache_dir:
+            try:
+                self.cache = ArtifactCache(cache_dir, cache_max_size * 1024 * 1024, read_only=check_mode)
+                self.metadata_cache = MetadataCache(
+                    os.path.join(cache_dir, "metadata"), metadata_cache_ttl, cache_mode, read_only=check_mode
+                )
+            except OSError as error:
+                warn(f"Artifact cache directory '{cache_dir}' is not usable, continuing without it: {error}")
+        self.session = new_session(workers)
+        self.client = ModrinthClient(
+            self.session, RateLimiter(blocking=not check_mode), metadata_cache=self.metadata_cache,
+            metrics=self.metrics
+        )
+
+    def install(self, kind, slugs, minecraft_version, dest_dir, lock=None, extra_files=(), state="present"):
+        """Install the latest compatible, or locked, version of every slug plus the extra files into dest_dir.
+
+        With state exact, every other file in dest_dir is removed. Returns the
+        changed flag with the added, kept and removed filenames, and the slug,
+        filename and sha1 of every installed file.
+        """
+        return self.install_dirs(kind, {dest_dir: slugs}, minecraft_version, lock, extra_files, state)[dest_dir]
+
+    def install_dirs(self, kind, slugs_by_dir, minecraft_version, lock=None, extra_files=(), state="present"):
+        """Install into several directories at once, e.g. the datapacks of every world.
+
+        Every unique slug is resolved once and its file is downloaded at most once,
+        the other directories needing it get a hardlink of a verified copy, or a
+        copy across filesystems. Returns the install result of every directory, or
+        in check mode what would change in it, see plan_dirs().
+        """
+        settings = KINDS[kind]
+        hash_indexes = {}
+        for dest_dir in slugs_by_dir:
+            if not self.check_mode:
+                os.makedirs(dest_dir, exist_ok=True)
+                remove_stale_partials(dest_dir, self.partial_max_age, self.logger)
+            hash_indexes[dest_dir] = HashIndex(dest_dir, full=self.verify == "full", metrics=self.metrics)
+        slugs = list(dict.fromkeys(slug for dir_slugs in slugs_by_dir.values() for slug in dir_slugs))
+
+        def installed_hash(installed_file):
+            # Check mode never hashes, files the index doesn't know are resolved by listing versions
+            dest_dir, path = installed_file
+            if self.check_mode:
+                return hash_indexes[dest_dir].lookup(path, 'sha1')
+            return hash_indexes[dest_dir].digest(path, 'sha1')
+
+        with self.metrics.phase('resolve'):
+            if lock:
+                self.logger.info(f"Installing Fabric {kind} pinned by the lockfile...")
+                versions = locked_versions(lock, slugs, minecraft_version)
+            else:
+                # Installed files are verified in parallel, their digests find their latest versions in batches
+                installed_files = [
+                    (dest_dir, path) for dest_dir in slugs_by_dir for path in list_files(dest_dir, settings['extension'])
+                ]
+                installed_hashes = [
+                    digest for digest in dict.fromkeys(run_parallel(installed_hash, installed_files, self.workers))
+                    if digest
+                ]
+                versions = resolve_versions(
+                    self.client, slugs, settings['loaders'], [minecraft_version], installed_hashes,
+                    self.workers, self.logger
+                )
+        if self.check_mode:
+            return self.plan_dirs(kind, slugs_by_dir, minecraft_version, versions, extra_files, state, hash_indexes)
+
+        def install_file(file_info, label, slug, dest_dirs):
+            """Install the file into every directory of dest_dirs missing it, returns those directories."""
+            filename = file_info['filename']
+            missing = [
+                dest_dir for dest_dir in dest_dirs
+                if not has_valid_file(file_info, os.path.join(dest_dir, filename), hash_indexes[dest_dir])
+            ]
+            if not missing:
+                self.logger.info(f"{label} '{filename}' already exists in '{', '.join(dest_dirs)}', skipping download")
+                return missing
+            present = [dest_dir for dest_dir in dest_dirs if dest_dir not in missing]
+            src_dir = present[0] if present else missing[0]
+            if not present:
+                download_file(
+                    self.session, file_info, src_dir, label, slug, self.logger, hash_indexes[src_dir], self.cache,
+                    self.metrics
+                )
+            for dest_dir in missing:
+                if dest_dir == src_dir:
+                    continue
+                dest_path = os.path.join(dest_dir, filename)
+                method = place_file(os.path.join(src_dir, filename), dest_path)
+                self.logger.info(f"Installed '{filename}' from '{src_dir}' to '{dest_path}' with a {method}")
+                algorithm, digest = get_expected_hash(file_info)
+                if algorithm:
+                    hash_indexes[dest_dir].record(dest_path, algorithm, digest)
+            return missing
+
+        def install_project(slug):
+            dest_dirs = [dest_dir for dest_dir, dir_slugs in slugs_by_dir.items() if slug in dir_slugs]
+            self.logger.info(f"Installing Fabric {settings['name']} '{slug}' into '{', '.join(dest_dirs)}'...")
+            file_info = project_file(kind, slug, versions[slug], minecraft_version)
+            with self.metrics.item(slug):
+                return slug, file_info, install_file(file_info, settings['label'], slug, dest_dirs)
+
+        def install_extra_file(extra_file):
+            self.logger.info(f"Installing file '{extra_file['filename']}' into '{', '.join(slugs_by_dir)}'...")
+            file_info = extra_file_info(extra_file)
+            with self.metrics.item(extra_file['filename']):
+                return None, file_info, install_file(file_info, 'File', extra_file['filename'], list(slugs_by_dir))
+
+        with self.metrics.phase('install'):
+            installed_projects = run_parallel(install_project, slugs, self.workers)
+            installed_extra_files = run_parallel(install_extra_file, extra_files, self.workers)
+        projects = {slug: (file_info, dirs) for slug, file_info, dirs in installed_projects}
+        extras = [(file_info, dirs) for _, file_info, dirs in installed_extra_files]
+
+        results = {}
+        for dest_dir, dir_slugs in slugs_by_dir.items():
+            installed = [(slug,) + projects[slug] for slug in dict.fromkeys(dir_slugs)]
+            installed += [(None, file_info, dirs) for file_info, dirs in extras]
+            removed = []
+            if state == "exact":
+                expected = {file_info['filename'] for _, file_info, _ in installed}
+                removed = remove_unexpected_files(dest_dir, expected, self.logger, hash_indexes[dest_dir])
+            hash_indexes[dest_dir].save()
+            results[dest_dir] = {
+                "changed": any(dest_dir in dirs for _, _, dirs in installed) or bool(removed),
+                "added": [file_info['filename'] for _, file_info, dirs in installed if dest_dir in dirs],
+                "kept": [file_info['filename'] for _, file_info, dirs in installed if dest_dir not in dirs],
+                "removed": removed,
+                "files": [
+                    {"slug": slug, "filename": file_info['filename'], "sha1": file_info['hashes'].get('sha1')}
+                    for slug, file_info, _ in installed
+                ],
+            }
+        return results
+
+    def plan_dirs(self, kind, slugs_by_dir, minecraft_version, versions, extra_files, state, hash_indexes):
+        """Report what install_dirs would change in every directory for the resolved versions, see plan_files().
+
+        A file missing from several directories only counts once towards the download
+        size, and not at all when another directory already has it.
+        """
+        files = {
+            slug: project_file(kind, slug, versions[slug], minecraft_version)
+            for slug in dict.fromkeys(slug for dir_slugs in slugs_by_dir.values() for slug in dir_slugs)
+        }
+        extras = [extra_file_info(extra_file) for extra_file in extra_files]
+
+        def dir_files(dest_dir):
+            file_infos = [(slug, files[slug]) for slug in dict.fromkeys(slugs_by_dir[dest_dir])]
+            file_infos += [(None, file_info) for file_info in extras]
+            return [
+                {
+                    'slug': slug,
+                    'filename': file_info['filename'],
+                    'sha1': file_info['hashes'].get('sha1'),
+                    'size': file_info.get('size'),
+                }
+                for slug, file_info in file_infos
+            ]
+
+        available = {
+            file['sha1'] for dest_dir in slugs_by_dir for file in dir_files(dest_dir)
+            if file_action(os.path.join(dest_dir, file['filename']), file, hash_indexes[dest_dir]) == 'keep'
+        }
+        results = {}
+        with self.metrics.phase('plan'):
+            for dest_dir in slugs_by_dir:
+                planned = dir_files(dest_dir)
+                results[dest_dir] = plan_files(dest_dir, planned, hash_indexes[dest_dir], self.cache, state, available)
+                del results[dest_dir]["missing"]
+                results[dest_dir]["files"] = [
+                    {"slug": file['slug'], "filename": file['filename'], "sha1": file['sha1']} for file in planned
+                ]
+        return results
+
+    def report(self):
+        """Evict the artifact cache down to its maximum size and return the cache and metrics reports for the module result."""
+        report = {"metrics": self.metrics.report()}
+        if self.cache:
+            if not self.check_mode:
+                self.cache.evict()
+            report["cache"] = self.cache.report()
+        if self.metadata_cache:
+            report["metadata_cache"] = self.metadata_cache.report()
+        return report
+
+
+def project_file(kind, slug, version, minecraft_version):
+    """Return the file to install from the resolved version of a project, raising when there is none."""
+    settings = KINDS[kind]
+    if not version:
+        loaders = f" and loader {', '.join(settings['loaders'])}" if settings['loaders'] else ""
+        raise Exception(
+            f"No compatible version found for {settings['name']} '{slug}' with Minecraft {minecraft_version}{loaders}"
+        )
+    file_info = select_file(version, settings['file_extension'])
+    if not file_info:
+        raise Exception(f"No downloadable file found for {settings['name']} '{slug}'")
+    return file_info
+
+
+def extra_file_info(extra_file):
+    return {
+        'url': extra_file['url'],
+        'filename': extra_file['filename'],
+        'hashes': {'sha1': extra_file['sha1']},
+    }
+
+
+def file_action(dest_path, file, hash_index):
+    """Return whether a file would be added, replaced or kept at dest_path, without hashing it.
+
+    A file of the expected size is kept unless the hash index holds a valid entry
+    for it with another sha1, files of unknown size are only compared on the index.
+    """
+    if not os.path.isfile(dest_path):
+        return 'add'
+    if file.get('size') is not None and os.path.getsize(dest_path) != file['size']:
+        return 'replace'
+    digest = hash_index.lookup(dest_path, 'sha1')
+    if digest and digest != file['sha1']:
+        return 'replace'
+    return 'keep'
+
+
+def _listing(filenames):
+    return ''.join(f"{filename}\n" for filename in filenames)
+
+
+def plan_files(dest_dir, files, hash_index, cache=None, state="present", available=None):
+    """Report what reconcile_files would change in dest_dir, without writing, fetching or hashing anything.
+
+    Returns the filenames which would be added, replaced, kept and removed, the
+    missing ones which would have to be fetched, i.e. not in the artifact cache and
+    whose sha1 is not in available, the sha1 of files already fetched for another
+    directory which is updated, and their download size. The diff lists the files
+    of dest_dir before and after.
+    """
+    available = set() if available is None else available
+    added, replaced, kept, missing = [], [], [], []
+    download_size = 0
+    for file in files:
+        action = file_action(os.path.join(dest_dir, file['filename']), file, hash_index)
+        if action == 'keep':
+            kept.append(file['filename'])
+            continue
+        (added if action == 'add' else replaced).append(file['filename'])
+        if file['sha1'] in available or (cache and cache.has('sha1', file['sha1'])):
+            continue
+        available.add(file['sha1'])
+        missing.append(file['filename'])
+        download_size += file.get('size') or 0
+    expected = {file['filename'] for file in files}
+    removed = unexpected_files(dest_dir, expected) if state == "exact" else []
+    before = unexpected_files(dest_dir, ())
+
+    return {
+        "changed": bool(added) or bool(replaced) or bool(removed),
+        "added": added,
+        "replaced": replaced,
+        "kept": kept,
+        "missing": missing,
+        "removed": removed,
+        "download_size": download_size,
+        "diff": {
+            "before_header": dest_dir,
+            "after_header": dest_dir,
+            "before": _listing(before),
+            "after": _listing(sorted((set(before) - set(removed)) | expected)),
+        },
+    }
+
+
+def reconcile_files(dest_dir, files, logger, verify="index", cache=None, state="present", bundle=None,
+                    check_mode=False, workers=1):
+    """Check dest_dir against a manifest of filenames and sha1 checksums, without downloading anything.
+
+    Files already in place with the right checksum are kept, others are installed
+    from the artifact cache when it holds them, extracted from the bundle when one
+    is given, and reported missing otherwise for the caller to transfer. With state
+    exact, every other file is removed. In check mode, the changes are only
+    reported, see plan_files(). Files already in dest_dir are verified by a pool of
+    workers before anything is installed.
+    """
+    if check_mode:
+        return plan_files(dest_dir, files, HashIndex(dest_dir), cache, state)
+    os.makedirs(dest_dir, exist_ok=True)
+    hash_index = HashIndex(dest_dir, full=verify == "full")
+    existing_paths = [
+        os.path.join(dest_dir, file['filename']) for file in files
+        if os.path.isfile(os.path.join(dest_dir, file['filename']))
+    ]
+    hash_files(hash_index, existing_paths, ['sha1'], workers)
+    added, kept, missing = [], [], []
+    for file in files:
+        dest_path = os.path.join(dest_dir, file['filename'])
+        if os.path.isfile(dest_path) and hash_index.digest(dest_path, 'sha1') == file['sha1']:
+            kept.append(file['filename'])
+        elif cache and cache.install('sha1', file['sha1'], dest_path):
+            logger.info(f"Installed '{file['filename']}' from the artifact cache to '{dest_path}'")
+            hash_index.record(dest_path, 'sha1', file['sha1'])
+            added.append(file['filename'])
+        else:
+            if os.path.exists(dest_path):
+                hash_index.forget(dest_path)
+            missing.append(file)
+    if bundle and missing:
+        extract_entries(bundle, missing, dest_dir, logger)
+        for file in missing:
+            dest_path = os.path.join(dest_dir, file['filename'])
+            hash_index.record(dest_path, 'sha1', file['sha1'])
+            if cache:
+                cache.add(dest_path, 'sha1', file['sha1'])
+            added.append(file['filename'])
+        missing = []
+    removed = []
+    if state == "exact":
+        removed = remove_unexpected_files(dest_dir, {file['filename'] for file in files}, logger, hash_index)
+    hash_index.save()
+
+    return {
+        "changed": bool(added) or bool(removed),
+        "added": added,
+        "kept": kept,
+        "missing": [file['filename'] for file in missing],
+        "removed": removed,
+    }
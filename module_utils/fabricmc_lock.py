@@ -0,0 +1,67 @@
+"""Lockfile helpers pinning the exact mod and datapack files installed by the FabricMC modules."""
+
+import json
+import os
+
+LOCK_VERSION = 1
+
+
+def load_lock(path):
+    """Return the lock stored at path, or None when there is no lockfile yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as lock_file:
+        return json.load(lock_file)
+
+
+def write_lock(path, lock):
+    """Write the lock deterministically and atomically, so lockfiles diff cleanly under version control."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as lock_file:
+        json.dump(lock, lock_file, indent=2, sort_keys=True)
+        lock_file.write('\n')
+    os.replace(tmp_path, path)
+
+
+def lock_entry(version, file_info):
+    """Return the lock entry pinning a resolved version and its selected file."""
+    return {
+        'project_id': version['project_id'],
+        'version_id': version['id'],
+        'version_number': version.get('version_number'),
+        'url': file_info['url'],
+        'filename': file_info['filename'],
+        'size': file_info.get('size'),
+        'hashes': file_info['hashes'],
+    }
+
+
+def locked_versions(lock, slugs, minecraft_version):
+    """Return the pinned version of every slug, in the shape resolve_versions returns them.
+
+    Fails when the lock was resolved for another Minecraft version or doesn't cover
+    every slug, rather than silently falling back to resolving against Modrinth.
+    """
+    if lock.get('minecraft_version') != minecraft_version:
+        raise Exception(
+            f"Lockfile was resolved for Minecraft {lock.get('minecraft_version')}, not {minecraft_version}, "
+            "update the lockfile first"
+        )
+    versions = {}
+    for slug in slugs:
+        entry = lock['projects'].get(slug)
+        if not entry:
+            raise Exception(f"'{slug}' is missing from the lockfile, update the lockfile first")
+        versions[slug] = {
+            'id': entry['version_id'],
+            'project_id': entry['project_id'],
+            'version_number': entry.get('version_number'),
+            'files': [{
+                'url': entry['url'],
+                'filename': entry['filename'],
+                'size': entry.get('size'),
+                'hashes': entry['hashes'],
+                'primary': True,
+            }],
+        }
+    return versions
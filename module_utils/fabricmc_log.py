@@ -0,0 +1,89 @@
+"""Incremental reading of the FabricMC server logs, e.g. logs/latest.log, across their rotation."""
+
+import os
+import time
+
+
+class LogTail:
+    """Read the lines appended to a log file since the last read, following its rotation.
+
+    The position is the inode and offset of the first unread byte, a file is never
+    read twice. The file stays open between reads, once another file replaced it at
+    path, the rest of the rotated file is read through the open descriptor before
+    the new one is read from its start. A file shorter than the offset was
+    truncated and is read again from its start. An incomplete last line is left for
+    the next read.
+    """
+
+    def __init__(self, path, inode=None, offset=0):
+        self.path = path
+        self.inode = inode
+        self.offset = offset
+        self.file = None
+
+    @classmethod
+    def at_end(cls, path):
+        """Return a tail which only reads the lines appended from now on."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return cls(path)
+        return cls(path, stat.st_ino, stat.st_size)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _open(self):
+        try:
+            self.file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(self.file.fileno())
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode, self.offset = stat.st_ino, 0
+        return True
+
+    def _read(self):
+        if os.fstat(self.file.fileno()).st_size < self.offset:
+            self.offset = 0
+        self.file.seek(self.offset)
+        data = self.file.read()
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        return data[:end].decode('utf-8', errors='replace').splitlines()
+
+    def read_lines(self):
+        if not self.file and not self._open():
+            return []
+        lines = self._read()
+        try:
+            rotated = os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            # Until the new file is created, only the rotated one can still grow
+            rotated = False
+        if rotated:
+            self.close()
+            if self._open():
+                lines += self._read()
+        return lines
+
+
+def wait_for_pattern(tail, pattern, timeout, check=None, interval=1, clock=time.monotonic, sleep=time.sleep):
+    """Read the tail until a line matches pattern and return the match.
+
+    check is called between reads and may raise, e.g. when the process writing the
+    log died. Raises when no line matches within timeout seconds.
+    """
+    deadline = clock() + timeout
+    while True:
+        for line in tail.read_lines():
+            match = pattern.search(line)
+            if match:
+                return match
+        if clock() >= deadline:
+            raise Exception(f"No line of '{tail.path}' matched '{pattern.pattern}' within {timeout}s")
+        if check:
+            check()
+        sleep(interval)
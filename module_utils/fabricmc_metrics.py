@@ -0,0 +1,100 @@
+"""Per item timing and throughput metrics of the FabricMC modules, returned in their results."""
+
+from contextlib import contextmanager
+import json
+import threading
+import time
+
+
+class Metrics:
+    """Collects the timings, byte counts and statuses recorded while installing items.
+
+    Values are recorded against the item the current thread is working on, see
+    item(), and summed when recorded several times, e.g. for retried requests.
+    Values recorded outside of any item, like batched Modrinth requests, only
+    count towards the totals.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started_at = time.monotonic()
+        self.items = {}
+        self.unattributed = {}
+        self.phases = {}
+
+    @contextmanager
+    def item(self, name):
+        """Attribute everything recorded by the current thread within the block to the named item."""
+        previous = getattr(self.local, 'item', None)
+        self.local.item = name
+        try:
+            yield
+        finally:
+            self.local.item = previous
+
+    def _values(self):
+        name = getattr(self.local, 'item', None)
+        if name is None:
+            return self.unattributed
+        return self.items.setdefault(name, {})
+
+    def add(self, key, value):
+        with self.lock:
+            values = self._values()
+            values[key] = values.get(key, 0) + value
+
+    def set(self, key, value):
+        with self.lock:
+            self._values()[key] = value
+
+    @contextmanager
+    def timer(self, key):
+        """Add the duration of the block, in seconds, to key."""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(key, time.monotonic() - started_at)
+
+    @contextmanager
+    def phase(self, name):
+        """Record the wall clock duration of a phase of the whole install, e.g. resolving versions."""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0) + time.monotonic() - started_at
+
+    def report(self):
+        """Return the metrics of every item and their totals, with throughputs in bytes per second."""
+        with self.lock:
+            items = {name: dict(values) for name, values in self.items.items()}
+            totals = {}
+            for values in list(items.values()) + [self.unattributed]:
+                for key, value in values.items():
+                    if isinstance(value, (int, float)) and key != 'http_status':
+                        totals[key] = totals.get(key, 0) + value
+            caches = [values.get('cache') for values in items.values()]
+            totals['cache_hits'] = caches.count('hit')
+            totals['cache_misses'] = caches.count('miss')
+            totals['items'] = len(items)
+            totals['phases'] = {name: round(seconds, 6) for name, seconds in self.phases.items()}
+            totals['elapsed_seconds'] = time.monotonic() - self.started_at
+        for values in list(items.values()) + [totals]:
+            if values.get('download_seconds'):
+                values['throughput_bytes_per_second'] = values.get('bytes_downloaded', 0) / values['download_seconds']
+            for key, value in values.items():
+                if isinstance(value, float):
+                    values[key] = round(value, 6)
+        return {'items': items, 'totals': totals}
+
+
+def write_metrics(path, module, report):
+    """Append the metrics report to path as JSON lines, one per item followed by one with the totals."""
+    timestamp = time.time()
+    with open(path, 'a') as metrics_file:
+        for name, values in report['items'].items():
+            metrics_file.write(json.dumps(dict(values, time=timestamp, module=module, type='item', item=name)) + '\n')
+        metrics_file.write(json.dumps(dict(report['totals'], time=timestamp, module=module, type='totals')) + '\n')
@@ -0,0 +1,248 @@
+"""Minimal Modrinth API client sharing the rate limited session of the FabricMC modules."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+from ansible.module_utils.fabricmc_http import run_parallel, send_request
+from ansible.module_utils.fabricmc_metrics import Metrics
+
+API_ENDPOINT = 'https://api.modrinth.com/v2'
+PROJECTS_BATCH_SIZE = 100
+HASHES_BATCH_SIZE = 500
+VERSIONS_BATCH_SIZE = 100
+CACHE_MODES = ['prefer-cache', 'refresh', 'offline']
+
+
+def batches(items, size):
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+class MetadataCache:
+    """On-disk cache of Modrinth API responses.
+
+    In prefer-cache mode, responses younger than ttl seconds are used as they are,
+    older ones are revalidated with If-None-Match / If-Modified-Since requests and
+    are still used when Modrinth can't be reached. In refresh mode every response
+    is fetched again, and in offline mode no request is sent at all. A read-only
+    cache never stores responses, e.g. in check mode.
+    """
+
+    def __init__(self, cache_dir, ttl, mode='prefer-cache', read_only=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.mode = mode
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        self.stats = {
+            'fresh': 0,
+            'revalidated': 0,
+            'fetched': 0,
+            'stale': 0,
+        }
+        if not read_only:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, method, url, params, body):
+        request_json = json.dumps([method, url, params, body], sort_keys=True)
+        return hashlib.sha256(request_json.encode()).hexdigest()
+
+    def load(self, key):
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), 'r') as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, entry):
+        if self.read_only:
+            return
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(tmp_path, path)
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def report(self):
+        return dict(self.stats)
+
+
+class ModrinthClient:
+    """Modrinth API client returning the decoded JSON responses.
+
+    Reference: https://docs.modrinth.com/api/
+    """
+
+    def __init__(self, session, limiter, endpoint=API_ENDPOINT, metadata_cache=None, metrics=None):
+        self.session = session
+        self.limiter = limiter
+        self.endpoint = endpoint
+        self.metadata_cache = metadata_cache
+        self.metrics = metrics or Metrics()
+
+    def send(self, method, url, **kwargs):
+        response = send_request(self.session, method, url, limiter=self.limiter, metrics=self.metrics, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def request(self, method, path, revalidate=False, **kwargs):
+        """Send a request through the metadata cache, revalidate skips the ttl and always sends a conditional request."""
+        url = f"{self.endpoint}{path}"
+        cache = self.metadata_cache
+        if not cache:
+            return self.send(method, url, **kwargs).json()
+
+        key = cache.key(method, url, kwargs.get('params'), kwargs.get('json'))
+        entry = cache.load(key)
+        if entry and (cache.mode == 'offline' or (cache.mode == 'prefer-cache' and not revalidate and cache.is_fresh(entry))):
+            cache.count('fresh')
+            return entry['body']
+        if cache.mode == 'offline':
+            raise Exception(f"No cached Modrinth response for {method} {url} in offline cache mode")
+
+        headers = {}
+        if entry and cache.mode == 'prefer-cache':
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            response = self.send(method, url, headers=headers, **kwargs)
+        except requests.RequestException as error:
+            status_code = error.response.status_code if error.response is not None else None
+            if not entry or (status_code and status_code < 500 and status_code != 429):
+                raise
+            cache.count('stale')
+            return entry['body']
+
+        if response.status_code == 304 and entry:
+            cache.count('revalidated')
+            entry['fetched_at'] = time.time()
+        else:
+            cache.count('fetched')
+            entry = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'body': response.json(),
+            }
+        cache.store(key, entry)
+        return entry['body']
+
+    def get_project(self, project_id, revalidate=False):
+        return self.request('GET', f"/project/{project_id}", revalidate=revalidate)
+
+    def get_version(self, version_id):
+        return self.request('GET', f"/version/{version_id}")
+
+    def get_versions(self, ids):
+        return self.request('GET', '/versions', params={'ids': json.dumps(ids)})
+
+    def get_projects(self, ids):
+        return self.request('GET', '/projects', params={'ids': json.dumps(ids)})
+
+    def list_project_versions(self, project_id, loaders=None, game_versions=None):
+        params = {}
+        if loaders:
+            params['loaders'] = json.dumps(loaders)
+        if game_versions:
+            params['game_versions'] = json.dumps(game_versions)
+        return self.request('GET', f"/project/{project_id}/version", params=params)
+
+    def get_latest_versions_from_hashes(self, hashes, algorithm, loaders=None, game_versions=None):
+        body = {'hashes': hashes, 'algorithm': algorithm}
+        if loaders:
+            body['loaders'] = loaders
+        if game_versions:
+            body['game_versions'] = game_versions
+        return self.request('POST', '/version_files/update', json=body)
+
+
+def select_file(version, extension=None):
+    """Return the primary file of a version, or its first file, optionally limited to an extension."""
+    files = [
+        file for file in version['files']
+        if not extension or file['filename'].lower().endswith(extension)
+    ]
+    for file in files:
+        if file['primary']:
+            return file
+    return files[0] if files else None
+
+
+def is_compatible(project, loaders, game_versions):
+    """Return False when the project metadata rules out every requested loader or game version."""
+    if loaders and project.get('loaders') and not set(loaders) & set(project['loaders']):
+        return False
+    if game_versions and project.get('game_versions') and not set(game_versions) & set(project['game_versions']):
+        return False
+    return True
+
+
+def resolve_versions(client, slugs, loaders, game_versions, installed_hashes, workers, logger):
+    """Resolve the latest compatible version of every project slug with as few requests as possible.
+
+    Projects are looked up in batches, the latest versions of already installed files
+    are resolved with batched lookups of their sha1 digests, and only the remaining projects are listed
+    one by one, with the loader and game version filters applied by the API.
+
+    Returns a dict of slug to version, None when a slug has no compatible version.
+    """
+    resolved = {slug: None for slug in slugs}
+
+    projects = {}
+    for batch in batches(list(resolved), PROJECTS_BATCH_SIZE):
+        logger.info(f"Fetching '{len(batch)}' project(s)...")
+        for project in client.get_projects(batch):
+            projects[project['id'].lower()] = project
+            projects[project['slug'].lower()] = project
+
+    slugs_by_project_id = {}
+    for slug in resolved:
+        project = projects.get(slug.lower())
+        if project:
+            slugs_by_project_id.setdefault(project['id'], []).append(slug)
+        else:
+            logger.warning(f"Project '{slug}' not found")
+
+    hashes = list(installed_hashes) if slugs_by_project_id else []
+    for batch in batches(hashes, HASHES_BATCH_SIZE):
+        logger.info(f"Fetching latest versions for '{len(batch)}' installed file(s)...")
+        versions = client.get_latest_versions_from_hashes(batch, 'sha1', loaders, game_versions)
+        for version in versions.values():
+            for slug in slugs_by_project_id.get(version['project_id'], []):
+                resolved[slug] = version
+                with client.metrics.item(slug):
+                    client.metrics.set('resolved_by', 'hash')
+
+    unresolved = [
+        project_id for project_id, project_slugs in slugs_by_project_id.items()
+        if resolved[project_slugs[0]] is None and is_compatible(projects[project_id.lower()], loaders, game_versions)
+    ]
+
+    def list_versions(project_id):
+        slug = slugs_by_project_id[project_id][0]
+        logger.info(f"Fetching project versions for '{slug}'...")
+        with client.metrics.item(slug), client.metrics.timer('resolve_seconds'):
+            client.metrics.set('resolved_by', 'versions')
+            versions = client.list_project_versions(project_id, loaders, game_versions)
+        return versions[0] if versions else None
+
+    for project_id, version in zip(unresolved, run_parallel(list_versions, unresolved, workers)):
+        for slug in slugs_by_project_id[project_id]:
+            resolved[slug] = version
+
+    return resolved
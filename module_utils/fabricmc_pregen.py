@@ -0,0 +1,124 @@
+"""Chunk pre-generation of FabricMC worlds driven over RCON through the Chunky mod's commands."""
+
+import json
+import os
+import re
+import time
+
+from ansible.module_utils.fabricmc_files import write_file
+
+PROGRESS_PATTERN = re.compile(r'Processed: (\d+) chunks \((\d+(?:\.\d+)?)%\)')
+STATE_FILENAME = 'state.json'
+
+
+def load_state(pregen_dir):
+    """Return the pre-generation state of every world and the world owning Chunky's saved task."""
+    try:
+        with open(os.path.join(pregen_dir, STATE_FILENAME), 'r') as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        return {"worlds": {}, "chunky_task": None}
+
+
+def save_state(pregen_dir, state):
+    os.makedirs(pregen_dir, mode=0o755, exist_ok=True)
+    write_file(os.path.join(pregen_dir, STATE_FILENAME), json.dumps(state, indent=2) + "\n", 0o644)
+
+
+def is_done(state, world, radius):
+    world_state = state["worlds"].get(world, {})
+    return world_state.get("status") == "done" and world_state.get("radius") == radius
+
+
+def can_resume(state, world, radius):
+    """Return True when Chunky's saved task is the interrupted run of the world with the same radius.
+
+    Every world is the overworld of its own level, they all share Chunky's config
+    and its single saved task for it.
+    """
+    world_state = state["worlds"].get(world, {})
+    return (
+        state.get("chunky_task") == world and world_state.get("status") == "running"
+        and world_state.get("radius") == radius
+    )
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def pregenerate(rcon, radius, resume, interval, logger, on_progress=None, timeout=0, clock=time.monotonic,
+                sleep=time.sleep):
+    """Generate every chunk within radius blocks of the overworld spawn and wait until Chunky is done.
+
+    An interrupted task is continued when resume is True, otherwise a new one is
+    started. Progress is polled every interval seconds and passed to on_progress
+    with the processed chunks, percentage, chunks per second and ETA. When the task
+    isn't done within timeout seconds, 0 waits forever, it's paused for the next run
+    to continue and the result has finished False.
+    """
+    started = False
+    if resume:
+        response = rcon.command('chunky continue')
+        started = 'continu' in response.lower() and 'no task' not in response.lower()
+        if not started:
+            logger.warning(f"Chunky could not continue the interrupted task, starting a new one: {response}")
+    if not started:
+        rcon.command('chunky world minecraft:overworld')
+        rcon.command('chunky spawn')
+        rcon.command(f'chunky radius {radius}')
+        response = rcon.command('chunky start')
+        # A saved task of another run has to be replaced
+        if 'confirm' in response.lower():
+            response = rcon.command('chunky confirm')
+        if 'started' not in response.lower():
+            raise Exception(f"Chunky did not start pre-generating: {response}")
+
+    started_at = clock()
+    previous = None
+    progress = {"chunks": 0, "percent": 0.0, "chunks_per_second": None, "eta_seconds": None}
+    while True:
+        sleep(interval)
+        now = clock()
+        response = rcon.command('chunky progress')
+        match = PROGRESS_PATTERN.search(response)
+        if not match:
+            if 'no task' in response.lower():
+                # Chunky drops its task once it's done
+                break
+            raise Exception(f"Unexpected Chunky progress: {response}")
+        chunks, percent = int(match.group(1)), float(match.group(2))
+        if previous and now > previous[0]:
+            chunks_per_second = (chunks - previous[1]) / (now - previous[0])
+            total = chunks * 100 / percent if percent else None
+            eta_seconds = (total - chunks) / chunks_per_second if total and chunks_per_second > 0 else None
+            progress.update(
+                chunks_per_second=round(chunks_per_second, 1),
+                eta_seconds=round(eta_seconds) if eta_seconds is not None else None,
+            )
+        progress.update(chunks=chunks, percent=percent)
+        previous = (now, chunks)
+        logger.info(
+            f"{chunks} chunks ({percent:.2f}%), {progress['chunks_per_second'] or 0:.1f} chunks/s, "
+            f"ETA {format_eta(progress['eta_seconds'])}"
+        )
+        if on_progress:
+            on_progress(dict(progress))
+        if percent >= 100:
+            break
+        if timeout and now - started_at >= timeout:
+            # Pausing saves the task, Chunky continues it when the next run resumes
+            rcon.command('chunky pause')
+            logger.warning(f"Pre-generation did not finish within {timeout}s, it continues on the next run")
+            return dict(progress, seconds=round(now - started_at, 1), finished=False)
+
+    seconds = clock() - started_at
+    if progress["percent"] and progress["percent"] < 100:
+        # The last poll happened before the end, estimate the total from its percentage
+        progress["chunks"] = round(progress["chunks"] * 100 / progress["percent"])
+    progress.update(percent=100.0, eta_seconds=0)
+    return dict(progress, seconds=round(seconds, 1), finished=True)
@@ -0,0 +1,122 @@
+"""Helpers for Java properties files, e.g. server.properties and eula.txt, managed by the FabricMC modules.
+
+Minecraft writes these files with java.util.Properties, which escapes separators and
+writes other characters as \\uXXXX, e.g. a=b:c is written a\\=b\\:c. Keys and values are
+compared unescaped and written back escaped the same way.
+"""
+
+import os
+
+ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', 'f': '\f'}
+SPECIAL_CHARS = {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\f': '\\f',
+                 '=': '\\=', ':': '\\:', '#': '\\#', '!': '\\!'}
+
+
+def format_value(value):
+    """Return a property value the way Minecraft writes it, e.g. booleans in lowercase."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def unescape(text):
+    """Return text with the escapes of java.util.Properties resolved, e.g. \\: and \\u00E9."""
+    chars = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        index += 1
+        if char != '\\' or index == len(text):
+            chars.append(char)
+            continue
+        char = text[index]
+        index += 1
+        if char == 'u':
+            chars.append(chr(int(text[index:index + 4], 16)))
+            index += 4
+        else:
+            chars.append(ESCAPES.get(char, char))
+    return ''.join(chars)
+
+
+def escape(text, key=False):
+    """Return text escaped the way java.util.Properties stores it, every space in a key, a leading one in a value."""
+    chars = []
+    for index, char in enumerate(text):
+        if char == ' ' and (key or index == 0):
+            chars.append('\\ ')
+        elif char in SPECIAL_CHARS:
+            chars.append(SPECIAL_CHARS[char])
+        elif ord(char) < 0x20 or ord(char) > 0x7e:
+            chars.append(f"\\u{ord(char):04X}")
+        else:
+            chars.append(char)
+    return ''.join(chars)
+
+
+def format_line(key, value):
+    """Return the line setting key to value, both escaped."""
+    return f"{escape(key, key=True)}={escape(format_value(value))}"
+
+
+def parse_line(line):
+    """Return the unescaped key and value of a line, None for comments and blank lines."""
+    line = line.lstrip(' \t\f')
+    if not line or line[0] in '#!':
+        return None
+    index = 0
+    while index < len(line) and line[index] not in '=: \t\f':
+        index += 2 if line[index] == '\\' else 1
+    key = line[:index]
+    rest = line[index:].lstrip(' \t\f')
+    if rest[:1] in ('=', ':'):
+        rest = rest[1:].lstrip(' \t\f')
+    return unescape(key), unescape(rest)
+
+
+def _read_lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as properties_file:
+        return properties_file.read().splitlines()
+
+
+def read_properties(path):
+    """Return the unescaped key-value pairs of the file at path, empty when it doesn't exist, comments are skipped."""
+    return dict(entry for entry in map(parse_line, _read_lines(path)) if entry)
+
+
+def merge_properties(path, properties, check_mode=False):
+    """Set every key of properties in the file at path with a single atomic write.
+
+    Existing lines, comments and unrelated keys are kept in place, missing keys are
+    appended. Returns the keys whose value changed, the file is only written when
+    there is at least one and never in check mode.
+    """
+    lines = _read_lines(path)
+
+    wanted = {key: format_value(value) for key, value in properties.items()}
+    changed = []
+    seen = set()
+    for index, line in enumerate(lines):
+        entry = parse_line(line)
+        if not entry or entry[0] not in wanted:
+            continue
+        key, value = entry
+        seen.add(key)
+        if value != wanted[key]:
+            lines[index] = format_line(key, wanted[key])
+            if key not in changed:
+                changed.append(key)
+    for key, value in wanted.items():
+        if key not in seen:
+            lines.append(format_line(key, value))
+            changed.append(key)
+
+    if changed and not check_mode:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as properties_file:
+            properties_file.write('\n'.join(lines) + '\n')
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    return changed
@@ -0,0 +1,106 @@
+"""Minimal client of the Source RCON protocol spoken by Minecraft servers with enable-rcon=true."""
+
+import socket
+import struct
+import time
+
+from ansible.module_utils.fabricmc_properties import read_properties
+
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH = 3
+AUTH_FAILED_ID = -1
+DEFAULT_PORT = 25575
+
+
+class RconClient:
+    """Send console commands to a Minecraft server over RCON.
+
+    Minecraft splits long responses into several packets without marking the last
+    one, every command is followed by a packet of an unknown type whose "Unknown
+    request" response ends the previous response.
+    """
+
+    def __init__(self, host, port, password, timeout=10):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.socket = None
+        self.next_id = 0
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self, retry_for=0):
+        """Connect and authenticate, retrying refused connections for retry_for seconds."""
+        deadline = time.monotonic() + retry_for
+        while True:
+            try:
+                self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                break
+            except ConnectionRefusedError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(1)
+        request_id = self._send(SERVERDATA_AUTH, self.password)
+        while True:
+            response_id, packet_type, _ = self._receive()
+            if packet_type == SERVERDATA_EXECCOMMAND:
+                break
+        if response_id == AUTH_FAILED_ID or response_id != request_id:
+            self.close()
+            raise Exception(f"RCON authentication to {self.host}:{self.port} failed, check rcon.password")
+
+    def close(self):
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    def command(self, command):
+        """Run a console command and return its response."""
+        request_id = self._send(SERVERDATA_EXECCOMMAND, command)
+        end_id = self._send(SERVERDATA_RESPONSE_VALUE, '')
+        body = []
+        while True:
+            response_id, _, payload = self._receive()
+            if response_id == end_id:
+                return ''.join(body)
+            if response_id == request_id:
+                body.append(payload)
+
+    def _send(self, packet_type, payload):
+        self.next_id += 1
+        data = struct.pack('<ii', self.next_id, packet_type) + payload.encode('utf-8') + b'\x00\x00'
+        self.socket.sendall(struct.pack('<i', len(data)) + data)
+        return self.next_id
+
+    def _receive_exactly(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise Exception(f"RCON connection to {self.host}:{self.port} closed by the server")
+            data += chunk
+        return data
+
+    def _receive(self):
+        size, = struct.unpack('<i', self._receive_exactly(4))
+        data = self._receive_exactly(size)
+        response_id, packet_type = struct.unpack('<ii', data[:8])
+        return response_id, packet_type, data[8:-2].decode('utf-8', errors='replace')
+
+
+def rcon_settings(properties_path):
+    """Return the port and password of RCON from server.properties, raising when RCON isn't enabled."""
+    properties = read_properties(properties_path)
+    if properties.get('enable-rcon') != 'true' or not properties.get('rcon.password'):
+        raise Exception(
+            f"RCON is not enabled in '{properties_path}', set enable-rcon to true and rcon.password "
+            "in fabmc_server_properties"
+        )
+    return int(properties.get('rcon.port') or DEFAULT_PORT), properties['rcon.password']
@@ -0,0 +1,109 @@
+"""Helpers running a FabricMC server process, e.g. for the AppCDS training run or chunk pre-generation."""
+
+import queue
+import re
+import subprocess
+import threading
+import time
+
+DONE_PATTERN = re.compile(r'Done \((\d+(?:\.\d+)?)s\)!')
+STOP_TIMEOUT = 120
+OUTPUT_TAIL = 20
+
+
+def _read_lines(stream, lines):
+    for line in iter(stream.readline, ''):
+        lines.put(line)
+    lines.put(None)
+
+
+class ServerProcess:
+    """A server started with its console on a pipe, its output is read by a background thread."""
+
+    def __init__(self, command, cwd, logger):
+        self.command = command
+        self.cwd = cwd
+        self.logger = logger
+        self.process = None
+        self.tail = []
+
+    @property
+    def output(self):
+        return ''.join(self.tail)
+
+    def start(self, timeout):
+        """Start the server and wait for its "Done (Xs)!" line.
+
+        Returns the wall clock seconds from starting the process to the Done line and
+        the startup seconds the server reported itself. Raises when the server exits
+        before it's done or isn't done within timeout seconds, the process is left
+        to stop() or kill().
+        """
+        started_at = time.monotonic()
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True
+        )
+        lines = queue.Queue()
+        threading.Thread(target=_read_lines, args=(self.process.stdout, lines), daemon=True).start()
+        while True:
+            try:
+                line = lines.get(timeout=max(0, started_at + timeout - time.monotonic()))
+            except queue.Empty:
+                raise Exception(f"Server did not start within {timeout}s")
+            if line is None:
+                self.process.wait()
+                raise Exception(f"Server exited with code {self.process.returncode} before it started:\n{self.output}")
+            self.tail = (self.tail + [line])[-OUTPUT_TAIL:]
+            match = DONE_PATTERN.search(line)
+            if match:
+                boot_seconds = time.monotonic() - started_at
+                break
+        # Keep draining the output so that a chatty server never blocks on a full pipe
+        threading.Thread(target=self._drain, args=(lines,), daemon=True).start()
+        return {"boot_seconds": round(boot_seconds, 3), "reported_seconds": float(match.group(1))}
+
+    def _drain(self, lines):
+        while True:
+            line = lines.get()
+            if line is None:
+                return
+            self.tail = (self.tail + [line])[-OUTPUT_TAIL:]
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Stop the server through its console, it's killed when it doesn't exit within timeout seconds.
+
+        Returns the exit code of the server.
+        """
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.stdin.write("stop\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=timeout)
+            except (BrokenPipeError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+        return self.process.returncode if self.process else None
+
+    def kill(self):
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+def boot_server(command, cwd, timeout, logger):
+    """Start the server, wait for its "Done (Xs)!" line, then stop it through the console.
+
+    Returns the boot times of ServerProcess.start(). Raises when the server exits
+    before it's done, isn't done within timeout seconds or fails to stop.
+    """
+    server = ServerProcess(command, cwd, logger)
+    try:
+        boot_times = server.start(timeout)
+        logger.info(f"Server started in {boot_times['boot_seconds']:.1f}s, stopping it...")
+        returncode = server.stop()
+    finally:
+        server.kill()
+    if returncode != 0:
+        raise Exception(f"Server exited with code {returncode} when stopped:\n{server.output}")
+    return boot_times
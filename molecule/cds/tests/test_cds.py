@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+def test_cds_archive_symlink(host):
+
+    archive_symlink = host.file('/opt/fabricmc/cds/fabricmc.jsa')
+    assert archive_symlink.exists
+    assert archive_symlink.is_symlink
+    assert archive_symlink.linked_to.startswith('/opt/fabricmc/cds/fabricmc-')
+
+def test_server_launcher_start_script_uses_cds_archive(host):
+
+    server_start_script = host.file('/opt/fabricmc/bin/start.sh')
+    assert server_start_script.contains(
+        'java -Xmx2048M -Xms1024M -XX:SharedArchiveFile=/opt/fabricmc/cds/fabricmc.jsa -jar /opt/fabricmc/bin/minecraft_server_launcher.jar nogui'
+    )
+
+def test_cds_boot_time_comparison(host):
+
+    boot_times = json.loads(host.file('/opt/fabricmc/cds/boot-times.json').content_string)
+    without_archive = boot_times['without_archive']['boot_seconds']
+    with_archive = boot_times['with_archive']['boot_seconds']
+    print(f"Boot time without AppCDS archive {without_archive:.1f}s, with archive {with_archive:.1f}s")
+    assert without_archive > 0
+    assert with_archive > 0
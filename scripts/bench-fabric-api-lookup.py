@@ -0,0 +1,85 @@
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import yaml
+
+ROLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark play start with the Fabric API versions vars file versus lookup')
+    parser.add_argument('--hosts', type=int, nargs='+', default=[50, 500], help='Inventory sizes to benchmark')
+    parser.add_argument('--version', default='0.119.2+1.21.4', help='Fabric API version to resolve')
+    parser.add_argument('--forks', type=int, default=50, help='Ansible forks')
+    return parser.parse_args()
+
+def load_versions():
+    versions = {}
+    with open(os.path.join(ROLE_DIR, 'files', 'fabric_api_versions.tsv'), 'r') as file:
+        for line in file:
+            version_number, _, sha1, url = line.rstrip('\n').split('\t')
+            versions[version_number] = {'sha1': sha1, 'url': url}
+    return versions
+
+def write_yaml(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        yaml.safe_dump(data, file, explicit_start=True, sort_keys=False)
+
+def debug_task(msg):
+    return {'name': 'Resolve Fabric API download', 'ansible.builtin.debug': {'msg': msg}}
+
+def create_workspace(work_dir, version):
+    """Create a role per scenario, 'vars' loads every version as role vars like before, 'lookup' reads one entry."""
+    write_yaml(os.path.join(work_dir, 'roles', 'vars', 'vars', 'main.yml'), {'fabric_api_versions': load_versions()})
+    write_yaml(os.path.join(work_dir, 'roles', 'vars', 'tasks', 'main.yml'), [
+        debug_task("{{ fabric_api_versions[fabmc_fabric_api_version]['url'] }}"),
+    ])
+    write_yaml(os.path.join(work_dir, 'roles', 'lookup', 'tasks', 'main.yml'), [
+        debug_task("{{ lookup('fabric_api_version', fabmc_fabric_api_version).url }}"),
+    ])
+    for dir_name in ['files', 'lookup_plugins']:
+        shutil.copytree(os.path.join(ROLE_DIR, dir_name), os.path.join(work_dir, 'roles', 'lookup', dir_name),
+                        ignore=shutil.ignore_patterns('__pycache__'))
+    for scenario in ['vars', 'lookup']:
+        write_yaml(os.path.join(work_dir, f'{scenario}.yml'), [{
+            'hosts': 'all',
+            'gather_facts': False,
+            'vars': {'fabmc_fabric_api_version': version},
+            'roles': [scenario],
+        }])
+
+def write_inventory(work_dir, host_count):
+    path = os.path.join(work_dir, f'inventory-{host_count}.yml')
+    write_yaml(path, {'all': {
+        'hosts': {f'host-{index:04d}': None for index in range(host_count)},
+        'vars': {'ansible_connection': 'local', 'ansible_python_interpreter': 'auto_silent'},
+    }})
+    return path
+
+def run_playbook(work_dir, inventory, scenario, forks):
+    """Run a playbook, return its wall time and the peak RSS of the controller process."""
+    env = dict(os.environ, ANSIBLE_ROLES_PATH=os.path.join(work_dir, 'roles'))
+    start = time.monotonic()
+    process = subprocess.Popen(
+        ['ansible-playbook', '-i', inventory, '-f', str(forks), os.path.join(work_dir, f'{scenario}.yml')],
+        cwd=work_dir, env=env, stdout=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(process.pid, 0)
+    elapsed = time.monotonic() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise Exception(f"Playbook '{scenario}' failed against '{inventory}'")
+    return elapsed, rusage.ru_maxrss // 1024
+
+args = parse_args()
+work_dir = tempfile.mkdtemp()
+create_workspace(work_dir, args.version)
+
+print(f"{'hosts':>5} {'scenario':<8} {'wall time':>10} {'peak RSS':>10}")
+for host_count in args.hosts:
+    inventory = write_inventory(work_dir, host_count)
+    for scenario in ['vars', 'lookup']:
+        elapsed, max_rss = run_playbook(work_dir, inventory, scenario, args.forks)
+        print(f"{host_count:>5} {scenario:<8} {elapsed:>9.2f}s {max_rss:>7} MB")
+shutil.rmtree(work_dir)
@@ -0,0 +1,110 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# gen-vars-file.py isn't importable by name, load it from its path
+spec = importlib.util.spec_from_file_location(
+    'gen_vars_file', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gen-vars-file.py'))
+gen_vars_file = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gen_vars_file)
+
+from ansible.module_utils.fabricmc_http import new_session
+from ansible.module_utils.fabricmc_modrinth import ModrinthClient
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark gen-vars-file.py against a local Modrinth stub')
+    parser.add_argument('--versions', type=int, default=1050, help='Number of Fabric API versions served by the stub')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds the stub waits before every response')
+    parser.add_argument('--workers', type=int, default=4, help='Number of parallel Modrinth requests')
+    return parser.parse_args()
+
+def stub_version(index):
+    version_id = f'v{index:07d}'
+    return {
+        'id': version_id,
+        'version_number': f'0.{index}.0',
+        'files': [{
+            'hashes': {'sha1': f'{index:040x}'},
+            'url': f'https://cdn.modrinth.com/data/P7dR8mSH/versions/{version_id}/fabric-api-0.{index}.0.jar'
+        }]
+    }
+
+def start_stub(version_count, latency):
+    versions = {version['id']: version for version in map(stub_version, range(version_count))}
+    stats = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            with lock:
+                stats['requests'] += 1
+            url = urlparse(self.path)
+            if url.path == '/v2/project/fabric-api':
+                body = {'slug': 'fabric-api', 'versions': list(versions)}
+            elif url.path == '/v2/versions':
+                body = [versions[version_id] for version_id in json.loads(parse_qs(url.query)['ids'][0])]
+            elif url.path.startswith('/v2/version/'):
+                body = versions[url.path.rsplit('/', 1)[1]]
+            else:
+                self.send_error(404)
+                return
+            content = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def retrieve_one_by_one(modrinth_client):
+    """The previous generator, one get_version request per version id."""
+    versions = {}
+    for version_id in modrinth_client.get_project('fabric-api')['versions']:
+        version = modrinth_client.get_version(version_id)
+        versions[version['version_number']] = {
+            'sha1': version['files'][0]['hashes']['sha1'],
+            'url': version['files'][0]['url']
+        }
+    return versions
+
+def measure(name, stats, func):
+    requests_before = stats['requests']
+    start = time.monotonic()
+    result = func()
+    print(f"{name:<28} {stats['requests'] - requests_before:>8} {time.monotonic() - start:>9.2f}s")
+    return result
+
+args = parse_args()
+logging.getLogger('urllib3').setLevel(logging.WARNING)
+server, stats = start_stub(args.versions, args.latency)
+endpoint = f'http://127.0.0.1:{server.server_port}/v2'
+modrinth_client = ModrinthClient(new_session(args.workers), None, endpoint=endpoint)
+index_file = os.path.join(tempfile.mkdtemp(), 'fabric_api_versions.tsv')
+
+print(f"{'scenario':<28} {'requests':>8} {'wall time':>10}")
+measure('one-by-one full rebuild', stats, lambda: retrieve_one_by_one(modrinth_client))
+data = measure('bulk full rebuild', stats,
+               lambda: gen_vars_file.retrieve_fabric_api_versions_data(modrinth_client, {}, args.workers))
+gen_vars_file.write_index(data, index_file)
+existing_versions = gen_vars_file.load_index(index_file)
+refreshed = measure('no-change refresh', stats,
+                    lambda: gen_vars_file.retrieve_fabric_api_versions_data(modrinth_client, existing_versions, args.workers))
+assert refreshed == existing_versions
+server.shutdown()
@@ -0,0 +1,81 @@
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import ansible.module_utils
+
+# Make the role's module_utils importable the same way Ansible does for the modules
+ansible.module_utils.__path__.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'module_utils'))
+
+from ansible.module_utils.fabricmc_files import HashIndex, hash_files
+
+MB = 1024 * 1024
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark verifying a synthetic mods and datapacks tree with 1 to N workers')
+    parser.add_argument('--size', type=int, default=2048, help='Total size of the synthetic tree in MB')
+    parser.add_argument('--jars', type=int, default=300, help='Number of mod jar files, sharing a quarter of the size')
+    parser.add_argument('--datapacks', type=int, default=4, help='Number of large datapack files, sharing the rest')
+    parser.add_argument('--algorithms', nargs='+', default=['sha1', 'sha512'], help='Digests computed for every file')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker pool sizes to benchmark')
+    parser.add_argument('--dir', help='Existing directory to generate the tree into and keep, defaults to a temporary one')
+    return parser.parse_args()
+
+def write_random_file(path, size):
+    with open(path, 'wb') as file:
+        for offset in range(0, size, MB):
+            file.write(os.urandom(min(MB, size - offset)))
+
+def generate_tree(dir_path, size, jars, datapacks):
+    """Write the jars and datapacks unless a previous run already did, return their paths."""
+    jar_size = size // 4 // jars
+    datapack_size = (size - jar_size * jars) // datapacks
+    file_sizes = [(f'mod-{index:03d}.jar', jar_size) for index in range(jars)]
+    file_sizes += [(f'datapack-{index}.zip', datapack_size) for index in range(datapacks)]
+    file_paths = []
+    for filename, file_size in file_sizes:
+        file_path = os.path.join(dir_path, filename)
+        if not os.path.isfile(file_path) or os.path.getsize(file_path) != file_size:
+            write_random_file(file_path, file_size)
+        file_paths.append(file_path)
+    return file_paths
+
+def verify_one_by_one(file_paths, algorithms):
+    """The previous verification, one file and one algorithm at a time with an 8 KiB buffer."""
+    for file_path in file_paths:
+        for algorithm in algorithms:
+            hasher = hashlib.new(algorithm)
+            with open(file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(8192), b''):
+                    hasher.update(chunk)
+
+def measure(name, workers, size, func, baseline=None):
+    start = time.monotonic()
+    func()
+    elapsed = time.monotonic() - start
+    speed_up = f'{baseline / elapsed:>7.2f}x' if baseline else f"{'':>8}"
+    print(f"{name:<28} {workers:>7} {elapsed:>9.2f}s {size / MB / elapsed:>9.1f} {speed_up}")
+    return elapsed
+
+args = parse_args()
+dir_path = args.dir or tempfile.mkdtemp()
+os.makedirs(dir_path, exist_ok=True)
+try:
+    file_paths = generate_tree(dir_path, args.size * MB, args.jars, args.datapacks)
+    size = sum(os.path.getsize(file_path) for file_path in file_paths)
+    # The tree was just written or read, it's in the page cache and verification is CPU bound
+    print(f"{len(file_paths)} files, {size / MB:.0f} MB, {', '.join(args.algorithms)}, {os.cpu_count()} CPUs")
+    print(f"{'scenario':<28} {'workers':>7} {'wall time':>10} {'MB/s':>9} {'speed-up':>8}")
+    measure('8 KiB one pass per digest', 1, size, lambda: verify_one_by_one(file_paths, args.algorithms))
+    baseline = None
+    for workers in args.workers:
+        # A fresh index without entries hashes every file again
+        elapsed = measure('single pass worker pool', workers, size,
+                          lambda: hash_files(HashIndex(dir_path), file_paths, args.algorithms, workers), baseline)
+        baseline = baseline or elapsed
+finally:
+    if not args.dir:
+        shutil.rmtree(dir_path)
@@ -0,0 +1,346 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import ansible.module_utils
+
+ROLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Make the role's module_utils importable the same way Ansible does for the modules
+ansible.module_utils.__path__.append(os.path.join(ROLE_DIR, 'module_utils'))
+
+from ansible.module_utils import basic
+from ansible.module_utils import fabricmc_install
+from ansible.module_utils.fabricmc_modrinth import ModrinthClient
+
+MINECRAFT_VERSION = '1.21.4'
+KINDS = {'mods': '.jar', 'datapacks': '.zip'}
+CHUNK_SIZE = 16 * 1024
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark fabric_mods and fabric_datapacks cold and warm installs against a local Modrinth stub')
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 500], help='Numbers of mods and datapacks to install')
+    parser.add_argument('--modules', nargs='+', default=['fabric_mods', 'fabric_datapacks'], help='Modules to benchmark')
+    parser.add_argument('--file-size', type=int, default=64, help='Size in KB of every generated jar and zip file')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds the stub waits before every response')
+    parser.add_argument('--bandwidth', type=int, default=0, help='KB/s the stub sends files at per connection, 0 is unlimited')
+    parser.add_argument('--throttle-every', type=int, default=0,
+                        help='Answer every Nth API request with a 429 and Retry-After: 1, 0 never does')
+    parser.add_argument('--rate-limit', type=int, default=300, help='Requests per minute advertised in X-Ratelimit-* headers')
+    parser.add_argument('--workers', type=int, default=4, help='Download workers of the modules')
+    parser.add_argument('--report', default='bench-install.json', help='Path of the JSON report to write')
+    parser.add_argument('--baseline', help='JSON report of a previous run to compare with, exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Relative wall time and peak RSS increase over the baseline accepted as noise')
+    return parser.parse_args()
+
+def payload(name, size):
+    """Return deterministic content for a generated file, so that digests are stable across runs."""
+    block = hashlib.sha512(name.encode()).digest()
+    return (block * (size // len(block) + 1))[:size]
+
+class Stub:
+    """Modrinth API shaped stub serving one version per project and its generated file, plus the Fabric API jar."""
+
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'bytes': 0}
+        self.payloads = {}
+        self.versions_by_sha1 = {}
+
+    def start(self):
+        """Serve from a forked process, so that the payloads it holds don't count in the peak RSS of the runs."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.endpoint = f'http://127.0.0.1:{server.server_port}'
+        self.pid = os.fork()
+        if self.pid == 0:
+            server.serve_forever()
+            os._exit(0)
+        server.socket.close()
+
+    def stop(self):
+        os.kill(self.pid, signal.SIGTERM)
+        os.waitpid(self.pid, 0)
+
+    def file(self, filename):
+        with self.lock:
+            if filename not in self.payloads:
+                self.payloads[filename] = payload(filename, self.args.file_size * 1024)
+            return self.payloads[filename]
+
+    def version(self, slug):
+        filename = f'{slug}-1.0.0{KINDS["mods" if slug.startswith("mod-") else "datapacks"]}'
+        content = self.file(filename)
+        version = {
+            'id': f'V{slug}',
+            'project_id': f'P{slug}',
+            'version_number': '1.0.0',
+            'loaders': ['fabric', 'datapack'],
+            'game_versions': [MINECRAFT_VERSION],
+            'files': [{
+                'url': f'{self.endpoint}/data/{filename}',
+                'filename': filename,
+                'primary': True,
+                'size': len(content),
+                'hashes': {
+                    'sha1': hashlib.sha1(content).hexdigest(),
+                    'sha512': hashlib.sha512(content).hexdigest(),
+                },
+            }],
+        }
+        with self.lock:
+            self.versions_by_sha1[version['files'][0]['hashes']['sha1']] = version
+        return version
+
+    def snapshot(self):
+        with urllib.request.urlopen(f'{self.endpoint}/_stats') as response:
+            return json.load(response)
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def count(self, name, value=1):
+                with stub.lock:
+                    stub.stats[name] += value
+                    return stub.stats[name]
+
+            def send_json(self, body):
+                requests = self.count('requests')
+                if stub.args.throttle_every and requests % stub.args.throttle_every == 0:
+                    self.count('rate_limited')
+                    self.send_response(429)
+                    self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                content = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('X-Ratelimit-Limit', str(stub.args.rate_limit))
+                self.send_header('X-Ratelimit-Remaining', str(stub.args.rate_limit))
+                self.send_header('X-Ratelimit-Reset', '60')
+                self.end_headers()
+                self.wfile.write(content)
+                self.count('bytes', len(content))
+
+            def send_file(self, content):
+                self.count('requests')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                for offset in range(0, len(content), CHUNK_SIZE):
+                    chunk = content[offset:offset + CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    if stub.args.bandwidth:
+                        time.sleep(len(chunk) / (stub.args.bandwidth * 1024))
+                self.count('bytes', len(content))
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/_stats':
+                    with stub.lock:
+                        content = json.dumps(stub.stats).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                    return
+                time.sleep(stub.args.latency)
+                if url.path == '/v2/projects':
+                    slugs = json.loads(parse_qs(url.query)['ids'][0])
+                    self.send_json([
+                        {'id': f'P{slug}', 'slug': slug, 'loaders': ['fabric', 'datapack'],
+                         'game_versions': [MINECRAFT_VERSION]}
+                        for slug in slugs
+                    ])
+                elif url.path.startswith('/v2/project/') and url.path.endswith('/version'):
+                    self.send_json([stub.version(url.path.split('/')[3][1:])])
+                elif url.path.startswith('/data/'):
+                    self.send_file(stub.file(url.path.rsplit('/', 1)[1]))
+                else:
+                    self.count('requests')
+                    self.send_error(404)
+
+            def do_POST(self):
+                time.sleep(stub.args.latency)
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if urlparse(self.path).path == '/v2/version_files/update':
+                    with stub.lock:
+                        versions = {sha1: stub.versions_by_sha1[sha1] for sha1 in body['hashes'] if sha1 in stub.versions_by_sha1}
+                    self.send_json(versions)
+                else:
+                    self.count('requests')
+                    self.send_error(404)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def module_args(module, items, stub, install_dir, cache_dir, workers):
+    common = {
+        'minecraft_version': MINECRAFT_VERSION,
+        'cache_dir': cache_dir,
+        'install_dir': install_dir,
+        'state': 'exact',
+    }
+    if module == 'fabric_mods':
+        fabric_api = 'fabric-api-0.119.2+1.21.4.jar'
+        return dict(common, mods=[f'mod-{index:04d}' for index in range(items)], mods_download_workers=workers,
+                    mods_dir=os.path.join(install_dir, 'workspace', 'mods'), extra_files=[{
+                        'url': f'{stub.endpoint}/data/{fabric_api}',
+                        'filename': fabric_api,
+                        'sha1': hashlib.sha1(payload(fabric_api, stub.args.file_size * 1024)).hexdigest(),
+                    }])
+    return dict(common, datapacks_download_workers=workers,
+                worlds=[{'world': 'world', 'datapacks': [f'datapack-{index:04d}' for index in range(items)]}])
+
+def run_module(module, args, endpoint):
+    """Run the module's main() with args in this process and return its result."""
+    spec = importlib.util.spec_from_file_location(module, os.path.join(ROLE_DIR, 'library', f'{module}.py'))
+    library_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(library_module)
+    fabricmc_install.ModrinthClient = functools.partial(ModrinthClient, endpoint=f'{endpoint}/v2')
+    basic._ANSIBLE_ARGS = json.dumps({'ANSIBLE_MODULE_ARGS': args}).encode()
+    basic._ANSIBLE_PROFILE = 'legacy'
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            library_module.main()
+        except SystemExit:
+            pass
+    return json.loads(output.getvalue())
+
+def run_forked(func):
+    """Run func in a forked child, so that every run starts from the same state and has its own peak RSS.
+
+    Returns func's result with the child's peak RSS in KB.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 2)
+        try:
+            result = {'result': func()}
+        except BaseException as error:
+            result = {'error': repr(error)}
+        result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with os.fdopen(write_fd, 'w') as pipe:
+            json.dump(result, pipe)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'r') as pipe:
+        output = pipe.read()
+    os.waitpid(pid, 0)
+    return json.loads(output)
+
+def measure(stub, module, items, scenario, args, workers):
+    before = stub.snapshot()
+    start = time.monotonic()
+    run = run_forked(lambda: run_module(module, args, stub.endpoint))
+    wall_seconds = time.monotonic() - start
+    after = stub.snapshot()
+    result = run.get('result', {})
+    if 'error' in run or result.get('failed'):
+        raise Exception(f"{module} {scenario} run with {items} items failed: {run.get('error') or result.get('msg')}")
+    row = {
+        'module': module,
+        'items': items,
+        'scenario': scenario,
+        'workers': workers,
+        'changed': result['changed'],
+        'wall_seconds': round(wall_seconds, 3),
+        'requests': after['requests'] - before['requests'],
+        'rate_limited': after['rate_limited'] - before['rate_limited'],
+        'bytes': after['bytes'] - before['bytes'],
+        'peak_rss_kb': run['peak_rss_kb'],
+    }
+    print(f"{module:<18} {items:>5} {scenario:<5} {row['wall_seconds']:>9.2f}s {row['requests']:>8} "
+          f"{row['rate_limited']:>5} {row['bytes'] / 1024 / 1024:>9.1f} {row['peak_rss_kb'] / 1024:>8.1f}")
+    return row
+
+def regressions(results, baseline, tolerance):
+    """Compare results with the baseline ones, request counts and bytes must not grow at all."""
+    key = lambda row: (row['module'], row['items'], row['scenario'])
+    baseline_rows = {key(row): row for row in baseline['results']}
+    found = []
+    for row in results:
+        baseline_row = baseline_rows.get(key(row))
+        if not baseline_row:
+            continue
+        for name in ('requests', 'bytes'):
+            if row[name] > baseline_row[name]:
+                found.append(f"{' '.join(map(str, key(row)))}: {name} {baseline_row[name]} -> {row[name]}")
+        for name in ('wall_seconds', 'peak_rss_kb'):
+            if row[name] > baseline_row[name] * (1 + tolerance):
+                found.append(f"{' '.join(map(str, key(row)))}: {name} {baseline_row[name]} -> {row[name]}")
+    return found
+
+args = parse_args()
+stub = Stub(args)
+stub.start()
+work_dir = tempfile.mkdtemp()
+results = []
+try:
+    print(f"{'module':<18} {'items':>5} {'run':<5} {'wall time':>10} {'requests':>8} {'429s':>5} {'MB sent':>9} {'RSS MB':>8}")
+    for module in args.modules:
+        for items in args.items:
+            install_dir = os.path.join(work_dir, f'{module}-{items}')
+            cache_dir = os.path.join(install_dir, 'cache')
+            run_args = module_args(module, items, stub, install_dir, cache_dir, args.workers)
+            # Cold installs into empty directories, warm runs again over the installed files and caches
+            for scenario in ('cold', 'warm'):
+                results.append(measure(stub, module, items, scenario, run_args, args.workers))
+            shutil.rmtree(install_dir)
+finally:
+    stub.stop()
+    shutil.rmtree(work_dir)
+
+report = {
+    'environment': {
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'file_size_kb': args.file_size,
+        'latency': args.latency,
+        'bandwidth_kbps': args.bandwidth,
+        'throttle_every': args.throttle_every,
+        'rate_limit': args.rate_limit,
+    },
+    'results': results,
+}
+with open(args.report, 'w') as report_file:
+    json.dump(report, report_file, indent=2)
+print(f"Report written to {args.report}")
+
+if args.baseline:
+    with open(args.baseline, 'r') as baseline_file:
+        found = regressions(results, json.load(baseline_file), args.tolerance)
+    for regression in found:
+        print(f"Regression {regression}")
+    sys.exit(1 if found else 0)
@@ -1,36 +1,90 @@
 from conflog import Conflog
-from modrinth_api_wrapper import Client
-import yaml
+import ansible.module_utils
+import argparse
+import os
+
+# Make the role's module_utils importable the same way Ansible does for the modules
+ansible.module_utils.__path__.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'module_utils'))
+
+from ansible.module_utils.fabricmc_http import RateLimiter, new_session, run_parallel
+from ansible.module_utils.fabricmc_modrinth import CACHE_MODES, VERSIONS_BATCH_SIZE, MetadataCache, ModrinthClient, batches
 
 cfl = Conflog(conf_files=['./config/conflog.yaml'])
 logger = cfl.get_logger('gen-vars-file')
 
-def retrieve_fabric_api_versions_data():
+INDEX_FILE = 'files/fabric_api_versions.tsv'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate the Fabric API versions index from Modrinth')
+    parser.add_argument('--cache-dir', default='stage/cache/metadata', help='Modrinth metadata cache directory')
+    parser.add_argument('--cache-ttl', type=int, default=86400, help='Seconds before cached version responses are revalidated')
+    parser.add_argument('--cache-mode', default='prefer-cache', choices=CACHE_MODES, help='Modrinth metadata cache mode')
+    parser.add_argument('--workers', type=int, default=4, help='Number of parallel Modrinth requests')
+    parser.add_argument('--full', action='store_true', help='Rebuild the index instead of only fetching new versions')
+    return parser.parse_args()
+
+def load_index(file_path):
+    versions = {}
+    if not os.path.exists(file_path):
+        return versions
+    with open(file_path, 'r') as file:
+        for line in file:
+            version_number, version_id, sha1, url = line.rstrip('\n').split('\t')
+            versions[version_number] = {'id': version_id, 'sha1': sha1, 'url': url}
+    return versions
+
+def retrieve_fabric_api_versions_data(modrinth_client, existing_versions=None, workers=4):
     logger.info('Retrieving Fabric API versions data...')
 
-    data = {
-        'fabric_api_versions': {}
+    # Entries are matched by version id, entries without one are fetched again
+    known_versions = {
+        entry['id']: (version_number, entry)
+        for version_number, entry in (existing_versions or {}).items()
+        if entry.get('id')
     }
+    # The project lists new versions as soon as they're published, it's always revalidated while the
+    # /versions batches of published versions don't change and are served from the cache
+    version_ids = modrinth_client.get_project("fabric-api", revalidate=True)['versions']
+    missing_ids = [version_id for version_id in version_ids if version_id not in known_versions]
+    logger.info(f"Fetching '{len(missing_ids)}' new Fabric API version(s) out of '{len(version_ids)}'...")
 
-    modrinth_client = Client()
-
-    for version_id in modrinth_client.get_project(project_id="fabric-api").versions:
-        version = modrinth_client.get_version(version_id=version_id)
+    for versions in run_parallel(modrinth_client.get_versions, list(batches(missing_ids, VERSIONS_BATCH_SIZE)), workers):
+        for version in versions:
+            known_versions[version['id']] = (version['version_number'], {
+                'id': version['id'],
+                'sha1': version['files'][0]['hashes']['sha1'],
+                'url': version['files'][0]['url']
+            })
 
-        data['fabric_api_versions'][version.version_number] = {
-            'sha1': version.files[0].hashes.sha1,
-            'url': version.files[0].url
-        }
+    # Versions deleted from Modrinth are dropped along the way
+    versions = {}
+    for version_id in version_ids:
+        if version_id in known_versions:
+            version_number, entry = known_versions[version_id]
+            versions[version_number] = entry
 
     logger.info('Fabric API versions data retrieved successfully')
-    return data
+    return versions
 
-def write_vars_file(data, file_path):
-    logger.info(f'Writing vars file at {file_path} ...')
-    vars_data_in_yaml = yaml.safe_dump(data, explicit_start=True)
-    with open(file_path, 'w') as file:
-        file.write(vars_data_in_yaml)
-        logger.info('Vars file written successfully')
+def write_index(versions, file_path):
+    """Write one tab separated 'version id sha1 url' line per version, sorted by version."""
+    logger.info(f'Writing index file at {file_path} ...')
+    tmp_file_path = f'{file_path}.tmp'
+    with open(tmp_file_path, 'w') as file:
+        for version_number in sorted(versions):
+            entry = versions[version_number]
+            file.write(f"{version_number}\t{entry['id']}\t{entry['sha1']}\t{entry['url']}\n")
+    os.replace(tmp_file_path, file_path)
+    logger.info('Index file written successfully')
 
-fabric_api_data = retrieve_fabric_api_versions_data()
-write_vars_file(fabric_api_data, 'vars/main.yml')
\ No newline at end of file
+if __name__ == '__main__':
+    args = parse_args()
+    metadata_cache = MetadataCache(args.cache_dir, args.cache_ttl, args.cache_mode)
+    modrinth_client = ModrinthClient(new_session(args.workers), RateLimiter(), metadata_cache=metadata_cache)
+    existing_versions = {} if args.full else load_index(INDEX_FILE)
+    fabric_api_versions = retrieve_fabric_api_versions_data(modrinth_client, existing_versions, args.workers)
+    if fabric_api_versions != existing_versions:
+        write_index(fabric_api_versions, INDEX_FILE)
+    else:
+        logger.info('Index file is already up to date')
+    logger.info(f'Modrinth metadata cache: {metadata_cache.report()}')
@@ -0,0 +1,119 @@
+"""PyTest Fixtures."""
+from __future__ import absolute_import
+
+import json
+import os
+import socketserver
+import struct
+import threading
+
+import ansible.module_utils
+import pytest
+import requests
+
+ROLE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Ansible ships a role's module_utils as ansible.module_utils.* at runtime,
+# mirror that so the modules' helpers can be imported in-process.
+ansible.module_utils.__path__.append(os.path.join(ROLE_DIR, 'module_utils'))
+
+
+class FakeLogger:
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeSession:
+    """Stand-in for requests.Session which records requests and answers them with a handler."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        status_code, body, headers = self.handler(method, url, kwargs)
+        response = requests.Response()
+        response.status_code = status_code
+        response.url = url
+        response.headers.update(headers or {})
+        response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        response._content_consumed = True
+        return response
+
+
+class FakeRconServer:
+    """RCON endpoint on localhost answering commands with a handler, long responses are split like Minecraft does."""
+
+    def __init__(self, handler, password='secret', max_payload=4096):
+        self.handler = handler
+        self.password = password
+        self.commands = []
+        fake = self
+
+        class Handler(socketserver.BaseRequestHandler):
+
+            def receive_exactly(self, size):
+                data = b''
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        return None
+                    data += chunk
+                return data
+
+            def receive(self):
+                header = self.receive_exactly(4)
+                if header is None:
+                    return None
+                data = self.receive_exactly(struct.unpack('<i', header)[0])
+                request_id, packet_type = struct.unpack('<ii', data[:8])
+                return request_id, packet_type, data[8:-2].decode()
+
+            def send(self, request_id, packet_type, payload):
+                data = struct.pack('<ii', request_id, packet_type) + payload.encode() + b'\x00\x00'
+                self.request.sendall(struct.pack('<i', len(data)) + data)
+
+            def handle(self):
+                while True:
+                    packet = self.receive()
+                    if packet is None:
+                        return
+                    request_id, packet_type, payload = packet
+                    if packet_type == 3:
+                        self.send(request_id if payload == fake.password else -1, 2, '')
+                    elif packet_type == 2:
+                        fake.commands.append(payload)
+                        response = fake.handler(payload)
+                        for offset in range(0, max(len(response), 1), max_payload):
+                            self.send(request_id, 0, response[offset:offset + max_payload])
+                    else:
+                        self.send(request_id, 0, f"Unknown request {packet_type:x}")
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def rcon_server():
+    servers = []
+
+    def start(handler, **kwargs):
+        servers.append(FakeRconServer(handler, **kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def logger():
+    return FakeLogger()
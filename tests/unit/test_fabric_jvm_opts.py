@@ -0,0 +1,61 @@
+import importlib.util
+import os
+
+import pytest
+from ansible.errors import AnsibleFilterError
+
+from conftest import ROLE_DIR
+
+# Filter plugins aren't part of a package, load the role's one from its path
+spec = importlib.util.spec_from_file_location(
+    'fabric_jvm_opts', os.path.join(ROLE_DIR, 'filter_plugins', 'fabric_jvm_opts.py'))
+fabric_jvm_opts = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fabric_jvm_opts)
+
+
+def opts(*args, **kwargs):
+    return fabric_jvm_opts.jvm_opts(*args, **kwargs).split(' ')
+
+
+def test_custom_profile_returns_java_opts():
+    assert fabric_jvm_opts.jvm_opts('custom', java_opts='-Xmx2048M -Xms1024M') == '-Xmx2048M -Xms1024M'
+
+
+def test_g1_aikar_profile_leaves_headroom_and_pins_heap():
+    jvm_opts = opts('g1-aikar', 8192, 4)
+
+    assert jvm_opts[:3] == ['-Xms5888M', '-Xmx5888M', '-XX:+AlwaysPreTouch']
+    assert '-XX:G1HeapRegionSize=8M' in jvm_opts
+    assert '-XX:ParallelGCThreads=4' in jvm_opts
+    assert '-XX:ConcGCThreads=1' in jvm_opts
+    assert '-XX:+UseTransparentHugePages' not in jvm_opts
+
+
+def test_auto_profile_picks_zgc_for_large_hosts_and_splits_them_between_instances():
+    assert '-XX:+UseZGC' in opts('auto', 65536, 32)
+    assert '-XX:+UseG1GC' in opts('auto', 16384, 8)
+
+    jvm_opts = opts('auto', 65536, 32, instances=2, extra_opts='-Dfoo=bar', large_pages=False)
+
+    assert jvm_opts[:2] == ['-Xms24832M', '-Xmx24832M']
+    assert '-XX:ParallelGCThreads=16' in jvm_opts
+    assert '-XX:+UseTransparentHugePages' not in jvm_opts
+    assert jvm_opts[-1] == '-Dfoo=bar'
+
+
+def test_zgc_profile_only_enables_generational_mode_up_to_java_22():
+    jvm_opts = opts('zgc', 65536, 32, java_version=21)
+
+    assert jvm_opts[3:5] == ['-XX:+UseZGC', '-XX:+ZGenerational']
+    assert '-XX:+ZGenerational' in opts('zgc', 65536, 32, java_version='22')
+    assert '-XX:+ZGenerational' not in opts('zgc', 65536, 32, java_version=24)
+    assert '-XX:+ZGenerational' not in opts('zgc', 65536, 32)
+
+
+def test_computed_profiles_fail_without_facts_or_memory():
+    with pytest.raises(AnsibleFilterError, match='hardware facts'):
+        fabric_jvm_opts.jvm_opts('auto', None, None)
+    with pytest.raises(AnsibleFilterError, match='less than 512 MB'):
+        fabric_jvm_opts.jvm_opts('g1-aikar', 2048, 2, instances=2)
+    with pytest.raises(AnsibleFilterError, match='Unknown JVM profile'):
+        fabric_jvm_opts.jvm_opts('shenandoah', 8192, 4)
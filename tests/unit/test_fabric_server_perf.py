@@ -0,0 +1,47 @@
+import importlib.util
+import os
+
+import pytest
+from ansible.errors import AnsibleFilterError
+
+from conftest import ROLE_DIR
+
+# Filter plugins aren't part of a package, load the role's one from its path
+spec = importlib.util.spec_from_file_location(
+    'fabric_server_perf', os.path.join(ROLE_DIR, 'filter_plugins', 'fabric_server_perf.py'))
+fabric_server_perf = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fabric_server_perf)
+
+
+def test_none_profile_sets_nothing():
+    assert fabric_server_perf.perf_properties('none') == {}
+
+
+def test_profiles_scale_distances_with_vcpus_up_to_their_cap():
+    small = fabric_server_perf.perf_properties('low-latency', 2)
+    large = fabric_server_perf.perf_properties('low-latency', 64)
+
+    assert (small['view-distance'], small['simulation-distance']) == (7, 4)
+    assert (large['view-distance'], large['simulation-distance']) == (12, 6)
+    assert small['sync-chunk-writes'] is False
+    assert small['network-compression-threshold'] == 512
+
+
+def test_high_density_profile_splits_vcpus_between_instances():
+    properties = fabric_server_perf.perf_properties('high-density', 8, instances=4)
+
+    assert properties == {
+        'view-distance': 4,
+        'simulation-distance': 3,
+        'network-compression-threshold': 256,
+        'sync-chunk-writes': False,
+        'max-tick-time': 120000,
+        'entity-broadcast-range-percentage': 60,
+    }
+
+
+def test_profiles_fail_without_facts():
+    with pytest.raises(AnsibleFilterError, match='hardware facts'):
+        fabric_server_perf.perf_properties('balanced', None)
+    with pytest.raises(AnsibleFilterError, match='Unknown server performance profile'):
+        fabric_server_perf.perf_properties('fast', 4)
@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ansible.module_utils.fabricmc_backup import (
+    backup, find_worlds, load_snapshot, prune, restore, snapshot_ids, write_snapshot
+)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1767225600.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def make_world(workspace_dir, world, regions=4):
+    """Write a synthetic world with a level.dat, random region files and one duplicated file."""
+    world_dir = workspace_dir / world
+    (world_dir / 'region').mkdir(parents=True)
+    (world_dir / 'level.dat').write_bytes(b'level ' + world.encode())
+    for index in range(regions):
+        (world_dir / 'region' / f'r.{index}.0.mca').write_bytes(os.urandom(8192) + bytes(65536))
+    (world_dir / 'region' / 'r.0.1.mca').write_bytes((world_dir / 'region' / 'r.0.0.mca').read_bytes())
+    (world_dir / 'session.lock').write_bytes(b'\xe2\x98\x83')
+    return world_dir
+
+
+def read_tree(dir_path):
+    return {
+        os.path.relpath(os.path.join(root, filename), dir_path): open(os.path.join(root, filename), 'rb').read()
+        for root, _, filenames in os.walk(dir_path) for filename in filenames if filename != 'session.lock'
+    }
+
+
+def test_snapshot_stores_only_new_content(tmp_path, logger):
+    workspace_dir, backup_dir = tmp_path / 'workspace', str(tmp_path / 'backups')
+    world_dir = make_world(workspace_dir, 'world')
+    clock = FakeClock()
+
+    first = write_snapshot(str(workspace_dir), backup_dir, ['world'], logger, clock=clock)
+    second = write_snapshot(str(workspace_dir), backup_dir, ['world'], logger, clock=clock)
+    (world_dir / 'region' / 'r.2.0.mca').write_bytes(os.urandom(8192))
+    third = write_snapshot(str(workspace_dir), backup_dir, ['world'], logger, clock=clock)
+
+    assert (first['files'], first['stored_files']) == (6, 5)
+    assert (second['reused_files'], second['stored_files'], second['stored_bytes']) == (6, 0, 0)
+    assert (third['reused_files'], third['stored_files']) == (5, 1)
+    assert snapshot_ids(backup_dir) == [first['id'], second['id'], third['id']]
+    assert 'world/session.lock' not in [entry['path'] for entry in load_snapshot(backup_dir, 'latest')['files']]
+
+
+def test_restore_replaces_world_with_snapshot_content(tmp_path, logger):
+    workspace_dir, backup_dir = tmp_path / 'workspace', str(tmp_path / 'backups')
+    world_dir = make_world(workspace_dir, 'world')
+    make_world(workspace_dir, 'other')
+    expected = read_tree(world_dir)
+    snapshot = write_snapshot(str(workspace_dir), backup_dir, find_worlds(str(workspace_dir)), logger)
+    (world_dir / 'region' / 'r.1.0.mca').write_bytes(b'corrupted')
+    (world_dir / 'region' / 'r.9.9.mca').write_bytes(b'new')
+    (workspace_dir / 'other' / 'level.dat').write_bytes(b'changed')
+
+    assert restore(backup_dir, snapshot['id'], str(workspace_dir), logger, ['world']) == ['world']
+
+    assert read_tree(world_dir) == expected
+    assert (workspace_dir / 'other' / 'level.dat').read_bytes() == b'changed'
+    assert sorted(os.listdir(workspace_dir)) == ['other', 'world']
+    # Restored files keep their mtime, the next snapshot doesn't read them again
+    assert write_snapshot(str(workspace_dir), backup_dir, ['world'], logger)['stored_files'] == 0
+
+
+def test_restore_refuses_world_loaded_by_running_server(tmp_path, logger):
+    workspace_dir, backup_dir = tmp_path / 'workspace', str(tmp_path / 'backups')
+    world_dir = make_world(workspace_dir, 'world')
+    write_snapshot(str(workspace_dir), backup_dir, ['world'], logger)
+    holder = subprocess.Popen(
+        [sys.executable, '-c', 'import fcntl, sys; f = open(sys.argv[1], "rb+"); fcntl.lockf(f, fcntl.LOCK_EX); '
+         'print("locked", flush=True); sys.stdin.read()', str(world_dir / 'session.lock')],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline() == 'locked\n'
+        with pytest.raises(Exception, match='loaded by a running server'):
+            restore(backup_dir, 'latest', str(workspace_dir), logger)
+    finally:
+        holder.communicate('')
+
+
+def test_prune_keeps_recent_snapshots_and_their_objects(tmp_path, logger):
+    workspace_dir, backup_dir = tmp_path / 'workspace', str(tmp_path / 'backups')
+    world_dir = make_world(workspace_dir, 'world', regions=1)
+    clock = FakeClock()
+    ids = []
+    for content in (b'one', b'two', b'three'):
+        (world_dir / 'level.dat').write_bytes(content)
+        ids.append(write_snapshot(str(workspace_dir), backup_dir, ['world'], logger, clock=clock)['id'])
+
+    result = prune(backup_dir, 2, logger)
+
+    assert result == {'removed_snapshots': ids[:1], 'removed_objects': 1}
+    assert snapshot_ids(backup_dir) == ids[1:]
+    restore(backup_dir, ids[1], str(workspace_dir), logger)
+    assert (world_dir / 'level.dat').read_bytes() == b'two'
+
+
+def test_backup_turns_saving_off_around_snapshot(tmp_path, logger, rcon_server):
+    from ansible.module_utils.fabricmc_rcon import RconClient
+
+    workspace_dir, backup_dir = tmp_path / 'workspace', str(tmp_path / 'backups')
+    make_world(workspace_dir, 'world', regions=1)
+    server = rcon_server(lambda command: 'Saved the game' if command == 'save-all flush' else '')
+
+    with RconClient('127.0.0.1', server.port, 'secret') as rcon:
+        stats = backup(str(workspace_dir), backup_dir, ['world'], logger, rcon)
+
+    assert server.commands == ['save-off', 'save-all flush', 'save-on']
+    assert stats['files'] == 3
+    assert 'save_off_seconds' in stats
+
+    server = rcon_server(lambda command: 'An error occurred' if command == 'save-all flush' else '')
+    with RconClient('127.0.0.1', server.port, 'secret') as rcon:
+        with pytest.raises(Exception, match='save-all flush did not complete'):
+            backup(str(workspace_dir), backup_dir, ['world'], logger, rcon)
+    assert server.commands == ['save-off', 'save-all flush', 'save-on']
@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+import pytest
+
+from ansible.module_utils.fabricmc_bundle import (
+    bundle_entry, extract_entries, load_manifest, new_manifest, read_manifest, select_entries, write_bundle
+)
+from ansible.module_utils.fabricmc_install import reconcile_files
+
+FILES = {
+    ('launcher', None, 'minecraft_server_launcher.1.21.4-0.16.10-1.0.1.jar'): b'launcher',
+    ('mods', 'lithium', 'lithium.jar'): b'lithium',
+    ('mods', 'sodium', 'sodium.jar'): b'sodium',
+    ('mods', None, 'fabric-api-0.119.4+1.21.4.jar'): b'fabric-api',
+    ('datapacks', 'terralith', 'terralith.zip'): b'terralith',
+}
+
+
+def export(tmp_path):
+    entries, src_paths = [], {}
+    for (kind, slug, filename), content in FILES.items():
+        entry = bundle_entry(kind, filename, hashlib.sha1(content).hexdigest(), len(content), slug)
+        src_path = tmp_path / filename
+        src_path.write_bytes(content)
+        entries.append(entry)
+        src_paths[entry['path']] = str(src_path)
+    manifest = new_manifest('1.21.4', '0.16.10', '1.0.1', entries)
+    path = str(tmp_path / 'bundle.tar.zst')
+    write_bundle(path, manifest, src_paths)
+    return path, manifest
+
+
+def test_write_bundle_starts_with_manifest(tmp_path):
+    path, manifest = export(tmp_path)
+
+    assert read_manifest(path) == manifest
+    assert [entry['path'] for entry in manifest['entries']][:2] == [
+        'bin/minecraft_server_launcher.1.21.4-0.16.10-1.0.1.jar', 'datapacks/terralith.zip'
+    ]
+
+
+def test_select_entries_adds_files_without_slug_and_fails_on_missing_slug(tmp_path):
+    path, manifest = export(tmp_path)
+
+    assert [entry['filename'] for entry in select_entries(path, manifest, 'mods', ['sodium'])] == [
+        'sodium.jar', 'fabric-api-0.119.4+1.21.4.jar'
+    ]
+    with pytest.raises(Exception, match='does not contain mods ferrite-core'):
+        select_entries(path, manifest, 'mods', ['sodium', 'ferrite-core'])
+
+
+def test_reconcile_files_extracts_only_differing_entries(logger, tmp_path):
+    path, manifest = export(tmp_path)
+    dest_dir = tmp_path / 'mods'
+    dest_dir.mkdir()
+    (dest_dir / 'lithium.jar').write_bytes(b'lithium')
+    (dest_dir / 'sodium.jar').write_bytes(b'outdated sodium')
+
+    result = reconcile_files(str(dest_dir), select_entries(path, manifest, 'mods'), logger, bundle=path)
+
+    assert result['kept'] == ['lithium.jar']
+    assert sorted(result['added']) == ['fabric-api-0.119.4+1.21.4.jar', 'sodium.jar']
+    assert result['missing'] == []
+    assert (dest_dir / 'sodium.jar').read_bytes() == b'sodium'
+
+
+def test_reconcile_files_against_pushed_manifest_reports_missing_entries(logger, tmp_path):
+    path, manifest = export(tmp_path)
+    manifest_path = tmp_path / 'fabricmc-bundle.json'
+    manifest_path.write_text(json.dumps(manifest))
+    dest_dir = tmp_path / 'mods'
+    dest_dir.mkdir()
+    (dest_dir / 'sodium.jar').write_bytes(b'sodium')
+    (dest_dir / 'lithium.jar').write_bytes(b'outdated lithium')
+
+    entries = select_entries(str(manifest_path), load_manifest(str(manifest_path)), 'mods', ['lithium', 'sodium'])
+    result = reconcile_files(str(dest_dir), entries, logger, state='exact')
+
+    # Without the archive on the host, the controller pushes the missing files
+    assert result['kept'] == ['sodium.jar']
+    assert result['missing'] == ['lithium.jar', 'fabric-api-0.119.4+1.21.4.jar']
+
+
+def test_extract_entries_rejects_checksum_mismatch(logger, tmp_path):
+    path, manifest = export(tmp_path)
+    entry = dict(select_entries(path, manifest, 'datapacks')[0], sha1='0' * 40)
+    (tmp_path / 'datapacks').mkdir()
+
+    with pytest.raises(Exception, match='Checksum mismatch'):
+        extract_entries(path, [entry], str(tmp_path / 'datapacks'), logger)
+    assert list((tmp_path / 'datapacks').iterdir()) == []
@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+from ansible.module_utils.fabricmc_cache import ArtifactCache
+from ansible.module_utils.fabricmc_files import download_file
+
+from conftest import FakeSession
+
+PAYLOAD = b'sodium' * 1000
+
+
+def file_info():
+    return {
+        'url': 'https://cdn.modrinth.com/data/sodium.jar',
+        'filename': 'sodium.jar',
+        'primary': True,
+        'size': len(PAYLOAD),
+        'hashes': {'sha1': hashlib.sha1(PAYLOAD).hexdigest()},
+    }
+
+
+def test_download_file_fills_and_reuses_cache(logger, tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), 1024 * 1024)
+    session = FakeSession(lambda method, url, kwargs: (200, PAYLOAD, {}))
+    for instance in ('fabricmc-1', 'fabricmc-2'):
+        (tmp_path / instance).mkdir()
+
+        assert download_file(session, file_info(), str(tmp_path / instance), 'Mod', 'sodium', logger, cache=cache)
+
+    assert len(session.requests) == 1
+    assert (tmp_path / 'fabricmc-2' / 'sodium.jar').read_bytes() == PAYLOAD
+    assert cache.report() == {
+        'hits': 1,
+        'misses': 1,
+        'hit_bytes': len(PAYLOAD),
+        'miss_bytes': len(PAYLOAD),
+        'evicted_bytes': 0,
+    }
+
+
+def test_evict_removes_least_recently_used_objects(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), 10)
+    for index, content in enumerate((b'lithium', b'sodium')):
+        src_path = tmp_path / f"{index}.jar"
+        src_path.write_bytes(content)
+        cache.add(str(src_path), 'sha1', hashlib.sha1(content).hexdigest())
+        object_path = cache.object_path('sha1', hashlib.sha1(content).hexdigest())
+        os.utime(object_path, (index, index))
+
+    cache.evict()
+
+    assert not os.path.exists(cache.object_path('sha1', hashlib.sha1(b'lithium').hexdigest()))
+    assert os.path.exists(cache.object_path('sha1', hashlib.sha1(b'sodium').hexdigest()))
+    assert cache.report()['evicted_bytes'] == len(b'lithium')
+    assert cache.report()['size'] == len(b'sodium')
+
+
+def test_install_keeps_mtime_of_hardlinked_files(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), 1024 * 1024)
+    src_path = tmp_path / 'sodium.jar'
+    src_path.write_bytes(PAYLOAD)
+    mtime_ns = os.stat(src_path).st_mtime_ns
+
+    cache.add(str(src_path), 'sha1', hashlib.sha1(PAYLOAD).hexdigest())
+    cache.install('sha1', hashlib.sha1(PAYLOAD).hexdigest(), str(tmp_path / 'installed.jar'))
+
+    assert os.stat(src_path).st_mtime_ns == mtime_ns
@@ -0,0 +1,106 @@
+import os
+import shutil
+
+from ansible.module_utils.fabricmc_exporter import Exporter, LogMetrics, parse_tick_query, render
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'logs')
+
+TICK_QUERY = (
+    'The game is running normally\n'
+    'Target tick rate: 20.0 per second.\n'
+    'Average time per tick: 62.5ms (Target: 50.0ms)\n'
+    'Percentiles: P50: 55.1ms P95: 80.2ms P99: 120.0ms, sample: 100'
+)
+
+
+def fixture_lines(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r') as fixture_file:
+        return fixture_file.read().splitlines()
+
+
+def make_install(tmp_path, log_fixture):
+    logs_dir = tmp_path / 'workspace' / 'logs'
+    logs_dir.mkdir(parents=True)
+    shutil.copy(os.path.join(FIXTURES_DIR, log_fixture), logs_dir / 'latest.log')
+    return logs_dir / 'latest.log'
+
+
+def test_log_metrics_of_recorded_log():
+    log_metrics = LogMetrics()
+    for line in fixture_lines('latest-1.log'):
+        log_metrics.feed(line)
+
+    assert log_metrics.counters == {
+        'cant_keep_up_total': 2,
+        'behind_milliseconds_total': 7515,
+        'behind_ticks_total': 150,
+        'starts_total': 1,
+        'player_joins_total': 2,
+        'player_leaves_total': 1,
+    }
+    assert log_metrics.startup_seconds == 14.732
+    # The chat message of Steve isn't a join
+    assert log_metrics.players == {'Alex_2'}
+
+
+def test_exporter_follows_rotation_and_resumes_from_saved_state(tmp_path, logger):
+    log_path = make_install(tmp_path, 'latest-1.log')
+    state_path = str(tmp_path / 'exporter' / 'state.json')
+
+    exporter = Exporter(str(tmp_path), 'fabricmc', state_path, logger, rcon_enabled=False)
+    exporter.collect()
+    exporter.close()
+    # A restarted exporter doesn't count the lines it already read
+    exporter = Exporter(str(tmp_path), 'fabricmc', state_path, logger, rcon_enabled=False)
+    exporter.collect()
+    assert exporter.log_metrics.counters['cant_keep_up_total'] == 2
+
+    # The server moves the log away when it starts again
+    os.rename(log_path, tmp_path / 'workspace' / 'logs' / '2026-01-01-1.log')
+    shutil.copy(os.path.join(FIXTURES_DIR, 'latest-2.log'), log_path)
+    metrics = exporter.collect()
+    exporter.close()
+
+    assert exporter.log_metrics.counters['cant_keep_up_total'] == 3
+    assert exporter.log_metrics.counters['starts_total'] == 2
+    assert exporter.log_metrics.players == {'Steve'}
+    assert 'fabricmc_behind_milliseconds_total{server="fabricmc"} 9615\n' in metrics
+    assert 'fabricmc_startup_seconds{server="fabricmc"} 8.5\n' in metrics
+    assert 'fabricmc_log_players_online{server="fabricmc"} 1\n' in metrics
+    assert 'fabricmc_rcon_up' not in metrics
+
+
+def test_exporter_samples_players_and_ticks_over_rcon(tmp_path, logger, rcon_server):
+    make_install(tmp_path, 'latest-2.log')
+    responses = {
+        'list': 'There are 1 of a max of 20 players online: Steve',
+        'tick query': TICK_QUERY,
+    }
+    server = rcon_server(lambda command: responses[command])
+    (tmp_path / 'workspace' / 'server.properties').write_text(
+        f'enable-rcon=true\nrcon.password=secret\nrcon.port={server.port}\n'
+    )
+
+    exporter = Exporter(str(tmp_path), 'fabricmc', str(tmp_path / 'state.json'), logger)
+    metrics = exporter.collect()
+    # The connection drops when the server stops
+    responses.clear()
+    metrics_after_stop = exporter.collect()
+    exporter.close()
+
+    assert 'fabricmc_rcon_up{server="fabricmc"} 1\n' in metrics
+    assert 'fabricmc_players_online{server="fabricmc"} 1\n' in metrics
+    assert 'fabricmc_mspt{server="fabricmc"} 62.5\n' in metrics
+    assert 'fabricmc_mspt_percentile{server="fabricmc",percentile="99"} 120.0\n' in metrics
+    assert 'fabricmc_tps{server="fabricmc"} 16.0\n' in metrics
+    assert 'fabricmc_rcon_up{server="fabricmc"} 0\n' in metrics_after_stop
+    assert 'fabricmc_mspt' not in metrics_after_stop
+
+
+def test_tick_query_tps_is_capped_by_target_rate():
+    sample = parse_tick_query(TICK_QUERY.replace('62.5ms', '2.5ms'))
+
+    assert sample['tps'] == 20.0
+    assert sample['mspt_percentiles'] == {'50': 55.1, '95': 80.2, '99': 120.0}
+    assert parse_tick_query('Unknown or incomplete command, see below for error') is None
+    assert render('fabricmc', LogMetrics()).count('# TYPE') == 7
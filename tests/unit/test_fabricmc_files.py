@@ -0,0 +1,215 @@
+import hashlib
+import os
+
+import pytest
+
+from ansible.module_utils import fabricmc_files
+from ansible.module_utils.fabricmc_files import (
+    HASH_INDEX_FILENAME, HashIndex, download_file, hash_files, remove_stale_partials, remove_unexpected_files,
+    swap_symlink
+)
+
+from conftest import FakeSession
+
+
+def count_hashes(monkeypatch):
+    calls = []
+    calculate_file_hashes = fabricmc_files.calculate_file_hashes
+
+    def counting_calculate_file_hashes(file_path, algorithms):
+        calls.append((file_path, algorithms))
+        return calculate_file_hashes(file_path, algorithms)
+
+    monkeypatch.setattr(fabricmc_files, 'calculate_file_hashes', counting_calculate_file_hashes)
+    return calls
+
+
+def test_hash_index_reuses_digest_of_unchanged_file(monkeypatch, tmp_path):
+    mod_path = tmp_path / 'sodium.jar'
+    mod_path.write_bytes(b'sodium')
+    calls = count_hashes(monkeypatch)
+
+    hash_index = HashIndex(str(tmp_path))
+    assert hash_index.digest(str(mod_path), 'sha1') == hashlib.sha1(b'sodium').hexdigest()
+    hash_index.save()
+    assert (tmp_path / HASH_INDEX_FILENAME).exists()
+
+    hash_index = HashIndex(str(tmp_path))
+    assert hash_index.digest(str(mod_path), 'sha1') == hashlib.sha1(b'sodium').hexdigest()
+    assert len(calls) == 1
+
+
+def test_hash_index_rehashes_changed_file(monkeypatch, tmp_path):
+    mod_path = tmp_path / 'sodium.jar'
+    mod_path.write_bytes(b'sodium')
+    hash_index = HashIndex(str(tmp_path))
+    hash_index.digest(str(mod_path), 'sha1')
+    hash_index.save()
+    mod_path.write_bytes(b'sodium-extra')
+    os.utime(mod_path, ns=(1, 1))
+    calls = count_hashes(monkeypatch)
+
+    hash_index = HashIndex(str(tmp_path))
+    assert hash_index.digest(str(mod_path), 'sha1') == hashlib.sha1(b'sodium-extra').hexdigest()
+    assert len(calls) == 1
+
+
+def test_hash_files_computes_every_digest_in_one_pass_per_file(monkeypatch, tmp_path):
+    contents = [b'sodium' * 300000, b'lithium', b'']
+    file_paths = []
+    for index, content in enumerate(contents):
+        file_paths.append(str(tmp_path / f"mod-{index}.jar"))
+        (tmp_path / f"mod-{index}.jar").write_bytes(content)
+    calls = count_hashes(monkeypatch)
+
+    digests = hash_files(HashIndex(str(tmp_path)), file_paths, ['sha1', 'sha512'], 3)
+
+    assert digests == [
+        {'sha1': hashlib.sha1(content).hexdigest(), 'sha512': hashlib.sha512(content).hexdigest()}
+        for content in contents
+    ]
+    assert sorted(calls) == [(file_path, ['sha1', 'sha512']) for file_path in file_paths]
+
+
+def test_hash_index_lookup_never_hashes(monkeypatch, tmp_path):
+    mod_path = tmp_path / 'sodium.jar'
+    mod_path.write_bytes(b'sodium')
+    calls = count_hashes(monkeypatch)
+    hash_index = HashIndex(str(tmp_path))
+
+    assert hash_index.lookup(str(mod_path), 'sha1') is None
+    hash_index.record(str(mod_path), 'sha1', hashlib.sha1(b'sodium').hexdigest())
+    assert hash_index.lookup(str(mod_path), 'sha1') == hashlib.sha1(b'sodium').hexdigest()
+    mod_path.write_bytes(b'sodium-extra')
+    assert hash_index.lookup(str(mod_path), 'sha1') is None
+    assert calls == []
+
+
+def test_hash_index_full_verification_rehashes_once_per_run(monkeypatch, tmp_path):
+    mod_path = tmp_path / 'sodium.jar'
+    mod_path.write_bytes(b'sodium')
+    hash_index = HashIndex(str(tmp_path))
+    hash_index.digest(str(mod_path), 'sha1')
+    hash_index.save()
+    calls = count_hashes(monkeypatch)
+
+    hash_index = HashIndex(str(tmp_path), full=True)
+    hash_index.digest(str(mod_path), 'sha1')
+    hash_index.digest(str(mod_path), 'sha1')
+    assert len(calls) == 1
+
+
+def test_hash_index_drops_removed_files(tmp_path):
+    mod_path = tmp_path / 'sodium.jar'
+    mod_path.write_bytes(b'sodium')
+    hash_index = HashIndex(str(tmp_path))
+    hash_index.digest(str(mod_path), 'sha1')
+    hash_index.save()
+    mod_path.unlink()
+
+    hash_index = HashIndex(str(tmp_path))
+    hash_index.save()
+    assert HashIndex(str(tmp_path)).entries == {}
+
+
+PAYLOAD = b'terralith' * 1000
+
+
+def file_info(payload=PAYLOAD):
+    return {
+        'url': 'https://cdn.modrinth.com/data/terralith.zip',
+        'filename': 'terralith.zip',
+        'primary': True,
+        'size': len(payload),
+        'hashes': {'sha1': hashlib.sha1(payload).hexdigest()},
+    }
+
+
+def range_handler(supports_range):
+    def handler(method, url, kwargs):
+        range_header = (kwargs.get('headers') or {}).get('Range')
+        if range_header and supports_range:
+            offset = int(range_header[len('bytes='):-1])
+            return 206, PAYLOAD[offset:], {
+                'Content-Range': f"bytes {offset}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}"
+            }
+        return 200, PAYLOAD, {}
+    return handler
+
+
+def test_download_file_resumes_partial_download(logger, tmp_path):
+    (tmp_path / 'terralith.zip.part').write_bytes(PAYLOAD[:1000])
+    session = FakeSession(range_handler(supports_range=True))
+
+    assert download_file(session, file_info(), str(tmp_path), 'Datapack', 'terralith', logger)
+
+    assert session.requests[0][2]['headers'] == {'Range': 'bytes=1000-'}
+    assert (tmp_path / 'terralith.zip').read_bytes() == PAYLOAD
+    assert not (tmp_path / 'terralith.zip.part').exists()
+
+
+def test_download_file_restarts_when_range_is_not_supported(logger, tmp_path):
+    (tmp_path / 'terralith.zip.part').write_bytes(PAYLOAD[:1000])
+    session = FakeSession(range_handler(supports_range=False))
+
+    assert download_file(session, file_info(), str(tmp_path), 'Datapack', 'terralith', logger)
+
+    assert len(session.requests) == 2
+    assert (tmp_path / 'terralith.zip').read_bytes() == PAYLOAD
+
+
+def test_download_file_restarts_when_resumed_partial_download_is_corrupt(logger, tmp_path):
+    (tmp_path / 'terralith.zip.part').write_bytes(b'x' * 1000)
+    session = FakeSession(range_handler(supports_range=True))
+
+    assert download_file(session, file_info(), str(tmp_path), 'Datapack', 'terralith', logger)
+
+    assert session.requests[0][2]['headers'] == {'Range': 'bytes=1000-'}
+    assert not session.requests[1][2].get('headers')
+    assert (tmp_path / 'terralith.zip').read_bytes() == PAYLOAD
+    assert not (tmp_path / 'terralith.zip.part').exists()
+
+
+def test_download_file_keeps_existing_file_on_checksum_mismatch(logger, tmp_path):
+    (tmp_path / 'terralith.zip').write_bytes(b'previous')
+    session = FakeSession(range_handler(supports_range=True))
+
+    with pytest.raises(Exception, match='Checksum mismatch'):
+        download_file(session, file_info(b'expected'), str(tmp_path), 'Datapack', 'terralith', logger)
+
+    assert (tmp_path / 'terralith.zip').read_bytes() == b'previous'
+    assert not (tmp_path / 'terralith.zip.part').exists()
+
+
+def test_remove_stale_partials(logger, tmp_path):
+    stale_path = tmp_path / 'sodium.jar.part'
+    stale_path.write_bytes(b'sodium')
+    os.utime(stale_path, (1, 1))
+    fresh_path = tmp_path / 'lithium.jar.part'
+    fresh_path.write_bytes(b'lithium')
+
+    remove_stale_partials(str(tmp_path), 3600, logger)
+
+    assert not stale_path.exists()
+    assert fresh_path.exists()
+
+
+def test_remove_unexpected_files_matches_exact_filenames(logger, tmp_path):
+    for filename in ['lithium-0.14.jar', 'lithium-extras-1.0.jar', 'sodium.jar.part', HASH_INDEX_FILENAME]:
+        (tmp_path / filename).write_bytes(b'mod')
+    (tmp_path / 'config').mkdir()
+
+    removed = remove_unexpected_files(str(tmp_path), {'lithium-0.14.jar'}, logger)
+
+    assert removed == ['lithium-extras-1.0.jar']
+    assert sorted(os.listdir(tmp_path)) == sorted([HASH_INDEX_FILENAME, 'config', 'lithium-0.14.jar', 'sodium.jar.part'])
+
+
+def test_swap_symlink_replaces_link_atomically(tmp_path):
+    link_path = str(tmp_path / 'minecraft_server_launcher.jar')
+
+    assert swap_symlink('launcher-0.16.9.jar', link_path)
+    assert swap_symlink('launcher-0.16.10.jar', link_path)
+    assert not swap_symlink('launcher-0.16.10.jar', link_path)
+    assert os.readlink(link_path) == 'launcher-0.16.10.jar'
+    assert os.listdir(tmp_path) == ['minecraft_server_launcher.jar']
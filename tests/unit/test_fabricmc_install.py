@@ -0,0 +1,140 @@
+import hashlib
+import os
+
+import pytest
+
+from ansible.module_utils.fabricmc_cache import ArtifactCache
+from ansible.module_utils.fabricmc_install import Installer, reconcile_files
+
+from conftest import FakeSession
+
+
+def manifest(*contents):
+    return [
+        {'slug': name, 'filename': f"{name}.jar", 'sha1': hashlib.sha1(content).hexdigest()}
+        for name, content in contents
+    ]
+
+
+def test_reconcile_files_keeps_installs_from_cache_and_reports_missing(logger, tmp_path):
+    dest_dir = tmp_path / 'mods'
+    dest_dir.mkdir()
+    (dest_dir / 'lithium.jar').write_bytes(b'lithium')
+    (dest_dir / 'sodium.jar').write_bytes(b'outdated sodium')
+    (dest_dir / 'unexpected.jar').write_bytes(b'unexpected')
+    cache = ArtifactCache(str(tmp_path / 'cache'), 1024 * 1024)
+    (tmp_path / 'ferrite-core.jar').write_bytes(b'ferrite-core')
+    cache.add(str(tmp_path / 'ferrite-core.jar'), 'sha1', hashlib.sha1(b'ferrite-core').hexdigest())
+    files = manifest(('lithium', b'lithium'), ('sodium', b'sodium'), ('ferrite-core', b'ferrite-core'))
+
+    result = reconcile_files(str(dest_dir), files, logger, cache=cache, state="exact")
+
+    assert result == {
+        'changed': True,
+        'added': ['ferrite-core.jar'],
+        'kept': ['lithium.jar'],
+        'missing': ['sodium.jar'],
+        'removed': ['unexpected.jar'],
+    }
+    assert (dest_dir / 'ferrite-core.jar').read_bytes() == b'ferrite-core'
+
+
+def test_reconcile_files_reports_no_change_when_in_place(logger, tmp_path):
+    dest_dir = tmp_path / 'mods'
+    dest_dir.mkdir()
+    (dest_dir / 'lithium.jar').write_bytes(b'lithium')
+
+    result = reconcile_files(str(dest_dir), manifest(('lithium', b'lithium')), logger)
+
+    assert not result['changed']
+    assert result['kept'] == ['lithium.jar']
+    assert result['missing'] == []
+
+
+def datapacks_lock(*slugs):
+    return {
+        'version': 1,
+        'kind': 'datapacks',
+        'minecraft_version': '1.21.4',
+        'loaders': None,
+        'projects': {
+            slug: {
+                'project_id': slug,
+                'version_id': slug,
+                'url': f"https://cdn.modrinth.com/data/{slug}.zip",
+                'filename': f"{slug}.zip",
+                'size': len(slug.encode()),
+                'hashes': {'sha1': hashlib.sha1(slug.encode()).hexdigest()},
+            }
+            for slug in slugs
+        },
+    }
+
+
+def test_install_dirs_downloads_shared_files_once_and_links_them(logger, tmp_path):
+    installer = Installer(2, "index", 86400, None, 0, "prefer-cache", 0, logger, None)
+    installer.session = FakeSession(lambda method, url, kwargs: (200, url.rsplit('/', 1)[1][:-len('.zip')].encode(), {}))
+    worlds = {str(tmp_path / world): slugs for world, slugs in (
+        ('world', ['terralith', 'incendium']),
+        ('world_nether', ['incendium']),
+        ('world_the_end', ['terralith', 'incendium', 'nullscape']),
+    )}
+
+    results = installer.install_dirs(
+        'datapacks', worlds, '1.21.4', datapacks_lock('terralith', 'incendium', 'nullscape'), state="exact"
+    )
+
+    assert sorted(url for _, url, _ in installer.session.requests) == [
+        'https://cdn.modrinth.com/data/incendium.zip',
+        'https://cdn.modrinth.com/data/nullscape.zip',
+        'https://cdn.modrinth.com/data/terralith.zip',
+    ]
+    assert results[str(tmp_path / 'world_nether')]['added'] == ['incendium.zip']
+    inodes = {os.stat(tmp_path / world / 'incendium.zip').st_ino for world in ('world', 'world_nether', 'world_the_end')}
+    assert len(inodes) == 1
+
+    results = installer.install_dirs('datapacks', worlds, '1.21.4', datapacks_lock('terralith', 'incendium', 'nullscape'))
+
+    assert len(installer.session.requests) == 3
+    assert not any(result['changed'] for result in results.values())
+
+
+def snapshot(path):
+    return {
+        str(file_path): (file_path.stat().st_mtime_ns, file_path.read_bytes())
+        for file_path in path.rglob('*') if file_path.is_file()
+    }
+
+
+def test_install_dirs_in_check_mode_plans_without_writing_or_sleeping(logger, monkeypatch, tmp_path):
+    monkeypatch.setattr('time.sleep', lambda seconds: pytest.fail("check mode must not sleep"))
+    installer = Installer(2, "index", 86400, str(tmp_path / 'cache'), 1, "prefer-cache", 0, logger, None, True)
+    installer.session = FakeSession(lambda method, url, kwargs: pytest.fail(f"check mode must not request {url}"))
+    world_dir = tmp_path / 'world'
+    world_dir.mkdir()
+    (world_dir / 'terralith.zip').write_bytes(b'terralith')
+    (world_dir / 'incendium.zip').write_bytes(b'outdated incendium')
+    (world_dir / 'unexpected.zip').write_bytes(b'unexpected')
+    before = snapshot(tmp_path)
+    worlds = {
+        str(world_dir): ['terralith', 'incendium'],
+        str(tmp_path / 'world_nether'): ['incendium', 'nullscape'],
+    }
+
+    results = installer.install_dirs(
+        'datapacks', worlds, '1.21.4', datapacks_lock('terralith', 'incendium', 'nullscape'), state="exact"
+    )
+
+    assert snapshot(tmp_path) == before
+    assert not (tmp_path / 'cache').exists()
+    assert not (tmp_path / 'world_nether').exists()
+    world = results[str(world_dir)]
+    assert (world['added'], world['replaced'], world['kept'], world['removed']) == (
+        [], ['incendium.zip'], ['terralith.zip'], ['unexpected.zip']
+    )
+    assert world['download_size'] == len(b'incendium')
+    assert world['diff']['after'] == 'incendium.zip\nterralith.zip\n'
+    world_nether = results[str(tmp_path / 'world_nether')]
+    assert world_nether['added'] == ['incendium.zip', 'nullscape.zip']
+    assert world_nether['download_size'] == len(b'nullscape')
+    assert installer.report()['metrics']['totals'].get('requests', 0) == 0
@@ -0,0 +1,57 @@
+import pytest
+
+from ansible.module_utils.fabricmc_lock import load_lock, lock_entry, locked_versions, write_lock
+
+VERSION = {
+    'id': 'Fz37KqRJ',
+    'project_id': 'AANobbMI',
+    'version_number': 'mc1.21.4-0.6.13-fabric',
+    'files': [],
+}
+
+FILE_INFO = {
+    'url': 'https://cdn.modrinth.com/data/AANobbMI/versions/Fz37KqRJ/sodium-fabric-0.6.13+mc1.21.4.jar',
+    'filename': 'sodium-fabric-0.6.13+mc1.21.4.jar',
+    'size': 1024,
+    'primary': True,
+    'hashes': {'sha1': 'da39a3ee5e6b4b0d3255bfef95601890afd80709'},
+}
+
+
+def lock(minecraft_version='1.21.4'):
+    return {
+        'version': 1,
+        'kind': 'mods',
+        'minecraft_version': minecraft_version,
+        'loaders': ['fabric'],
+        'projects': {'sodium': lock_entry(VERSION, FILE_INFO)},
+    }
+
+
+def test_locked_versions_returns_pinned_files():
+    versions = locked_versions(lock(), ['sodium'], '1.21.4')
+
+    assert versions['sodium']['id'] == 'Fz37KqRJ'
+    assert versions['sodium']['files'] == [FILE_INFO]
+
+
+def test_locked_versions_rejects_other_minecraft_version():
+    with pytest.raises(Exception, match='resolved for Minecraft 1.21.1'):
+        locked_versions(lock('1.21.1'), ['sodium'], '1.21.4')
+
+
+def test_locked_versions_rejects_missing_project():
+    with pytest.raises(Exception, match="'lithium' is missing from the lockfile"):
+        locked_versions(lock(), ['sodium', 'lithium'], '1.21.4')
+
+
+def test_write_lock_is_deterministic(tmp_path):
+    path = str(tmp_path / 'fabric-mods.lock.json')
+
+    write_lock(path, lock())
+    content = (tmp_path / 'fabric-mods.lock.json').read_text()
+    write_lock(path, load_lock(path))
+
+    assert (tmp_path / 'fabric-mods.lock.json').read_text() == content
+    assert load_lock(path) == lock()
+    assert load_lock(str(tmp_path / 'missing.lock.json')) is None
@@ -0,0 +1,85 @@
+import os
+import re
+
+import pytest
+
+from ansible.module_utils.fabricmc_log import LogTail, wait_for_pattern
+from ansible.module_utils.fabricmc_server import DONE_PATTERN
+
+
+def test_read_lines_returns_complete_lines_appended_since_last_read(tmp_path):
+    path = tmp_path / 'latest.log'
+    path.write_text('[12:00:00] [Server thread/INFO]: Starting minecraft server\n')
+    tail = LogTail.at_end(str(path))
+
+    assert tail.read_lines() == []
+
+    with open(path, 'a') as log_file:
+        log_file.write('[12:00:01] [Server thread/INFO]: Preparing level "world"\n[12:00:02] [Server')
+    assert tail.read_lines() == ['[12:00:01] [Server thread/INFO]: Preparing level "world"']
+
+    with open(path, 'a') as log_file:
+        log_file.write(' thread/INFO]: Done (1.234s)! For help, type "help"\n')
+    assert tail.read_lines() == ['[12:00:02] [Server thread/INFO]: Done (1.234s)! For help, type "help"']
+
+
+def test_read_lines_follows_rotation_and_truncation(tmp_path):
+    path = tmp_path / 'latest.log'
+    path.write_text('old line 1\nold line 2\n')
+    tail = LogTail.at_end(str(path))
+
+    # The server gzips latest.log away and starts a new file when it starts
+    os.rename(path, tmp_path / '2026-01-01-1.log')
+    path.write_text('new line 1\n')
+    assert tail.read_lines() == ['new line 1']
+
+    path.write_text('')
+    with open(path, 'a') as log_file:
+        log_file.write('truncated\n')
+    assert tail.read_lines() == ['truncated']
+
+
+def test_read_lines_finishes_rotated_file_before_new_one(tmp_path):
+    path = tmp_path / 'latest.log'
+    path.write_text('line 1\n')
+    tail = LogTail(str(path))
+    assert tail.read_lines() == ['line 1']
+
+    with open(path, 'a') as log_file:
+        log_file.write('line 2\n')
+    os.rename(path, tmp_path / '2026-01-01-1.log')
+    assert tail.read_lines() == ['line 2']
+    path.write_text('line 3\n')
+    assert tail.read_lines() == ['line 3']
+    assert tail.read_lines() == []
+
+
+def test_read_lines_of_missing_file_waits_for_it(tmp_path):
+    path = tmp_path / 'logs' / 'latest.log'
+    tail = LogTail.at_end(str(path))
+
+    assert tail.read_lines() == []
+    path.parent.mkdir()
+    path.write_text('first\n')
+    assert tail.read_lines() == ['first']
+
+
+def test_wait_for_pattern_returns_match_or_raises_after_timeout(tmp_path):
+    path = tmp_path / 'latest.log'
+    path.write_text('')
+    tail = LogTail.at_end(str(path))
+    now = [0.0]
+    checks = []
+
+    def sleep(seconds):
+        now[0] += seconds
+        if now[0] == 3:
+            path.write_text('[12:00:02] [Server thread/INFO]: Done (12.5s)! For help, type "help"\n')
+
+    match = wait_for_pattern(tail, DONE_PATTERN, 10, lambda: checks.append(now[0]), clock=lambda: now[0],
+                             sleep=sleep)
+    assert match.group(1) == '12.5'
+    assert checks == [0, 1, 2]
+
+    with pytest.raises(Exception, match='within 5s'):
+        wait_for_pattern(tail, re.compile('Stopping server'), 5, clock=lambda: now[0], sleep=sleep)
@@ -0,0 +1,49 @@
+import json
+
+from ansible.module_utils.fabricmc_http import run_parallel
+from ansible.module_utils.fabricmc_metrics import Metrics, write_metrics
+
+
+def test_metrics_attributes_values_to_the_item_of_each_thread():
+    metrics = Metrics()
+    metrics.add('requests', 1)
+
+    def install(slug):
+        with metrics.item(slug):
+            metrics.add('requests', 2)
+            metrics.add('bytes_downloaded', 1000)
+            metrics.add('download_seconds', 0.5)
+            metrics.set('http_status', 200)
+            metrics.set('cache', 'miss' if slug == 'sodium' else 'hit')
+
+    run_parallel(install, ['sodium', 'lithium'], 2)
+    report = metrics.report()
+
+    assert report['items']['sodium'] == {
+        'requests': 2,
+        'bytes_downloaded': 1000,
+        'download_seconds': 0.5,
+        'http_status': 200,
+        'cache': 'miss',
+        'throughput_bytes_per_second': 2000.0,
+    }
+    assert report['totals']['requests'] == 5
+    assert report['totals']['bytes_downloaded'] == 2000
+    assert report['totals']['throughput_bytes_per_second'] == 2000.0
+    assert (report['totals']['cache_hits'], report['totals']['cache_misses']) == (1, 1)
+    assert 'http_status' not in report['totals']
+
+
+def test_write_metrics_appends_json_lines(tmp_path):
+    metrics = Metrics()
+    with metrics.item('sodium'):
+        metrics.add('requests', 1)
+    path = tmp_path / 'metrics.jsonl'
+
+    write_metrics(str(path), 'fabric_mods', metrics.report())
+    write_metrics(str(path), 'fabric_mods', metrics.report())
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line['type'], line.get('item')) for line in lines] == [('item', 'sodium'), ('totals', None)] * 2
+    assert lines[0]['module'] == 'fabric_mods'
+    assert lines[1]['requests'] == 1
@@ -0,0 +1,160 @@
+import hashlib
+import json
+from urllib.parse import urlparse
+
+import pytest
+
+from ansible.module_utils.fabricmc_modrinth import MetadataCache, ModrinthClient, resolve_versions
+
+from conftest import FakeSession
+
+MODS = [f"mod-{index}" for index in range(100)]
+
+
+def version_for(slug):
+    return {
+        'id': f"version-{slug}",
+        'project_id': f"project-{slug}",
+        'loaders': ['fabric'],
+        'game_versions': ['1.21.4'],
+        'files': [{
+            'url': f"https://cdn.modrinth.com/data/{slug}.jar",
+            'filename': f"{slug}.jar",
+            'primary': True,
+            'size': len(slug),
+            'hashes': {'sha1': hashlib.sha1(slug.encode()).hexdigest()},
+        }],
+    }
+
+
+def modrinth_handler(method, url, kwargs):
+    path = urlparse(url).path
+    if path == '/v2/projects':
+        slugs = json.loads(kwargs['params']['ids'])
+        return 200, [
+            {'id': f"project-{slug}", 'slug': slug, 'loaders': ['fabric'], 'game_versions': ['1.21.4']}
+            for slug in slugs
+        ], {}
+    if path == '/v2/version_files/update':
+        body = kwargs['json']
+        assert body['loaders'] == ['fabric']
+        assert body['game_versions'] == ['1.21.4']
+        by_hash = {hashlib.sha1(slug.encode()).hexdigest(): slug for slug in MODS}
+        return 200, {
+            file_hash: version_for(by_hash[file_hash])
+            for file_hash in body['hashes'] if file_hash in by_hash
+        }, {}
+    if path.startswith('/v2/project/') and path.endswith('/version'):
+        assert json.loads(kwargs['params']['loaders']) == ['fabric']
+        assert json.loads(kwargs['params']['game_versions']) == ['1.21.4']
+        return 200, [version_for(path.split('/')[3][len('project-'):])], {}
+    return 404, {}, {}
+
+
+def resolve(session, installed_hashes, logger):
+    client = ModrinthClient(session, None)
+    return resolve_versions(client, MODS, ['fabric'], ['1.21.4'], installed_hashes, 4, logger)
+
+
+def test_resolve_versions_without_installed_files(logger):
+    session = FakeSession(modrinth_handler)
+
+    versions = resolve(session, [], logger)
+
+    assert versions == {slug: version_for(slug) for slug in MODS}
+    paths = [urlparse(url).path for _, url, _ in session.requests]
+    assert paths.count('/v2/projects') == 1
+    assert paths.count('/v2/version_files/update') == 0
+    assert len(session.requests) == 1 + len(MODS)
+
+
+def test_resolve_versions_with_installed_files(logger):
+    installed_hashes = [hashlib.sha1(slug.encode()).hexdigest() for slug in MODS]
+    session = FakeSession(modrinth_handler)
+
+    versions = resolve(session, installed_hashes, logger)
+
+    assert versions == {slug: version_for(slug) for slug in MODS}
+    assert [urlparse(url).path for _, url, _ in session.requests] == [
+        '/v2/projects',
+        '/v2/version_files/update',
+    ]
+
+
+def test_resolve_versions_skips_incompatible_and_missing_projects(logger):
+    def handler(method, url, kwargs):
+        if urlparse(url).path == '/v2/projects':
+            return 200, [{'id': 'AANobbMI', 'slug': 'sodium', 'loaders': ['forge'], 'game_versions': ['1.21.4']}], {}
+        return 404, {}, {}
+    session = FakeSession(handler)
+    client = ModrinthClient(session, None)
+
+    versions = resolve_versions(client, ['sodium', 'unknown'], ['fabric'], ['1.21.4'], [], 4, logger)
+
+    assert versions == {'sodium': None, 'unknown': None}
+    assert len(session.requests) == 1
+
+
+def metadata_client(tmp_path, handler, mode='prefer-cache', ttl=3600):
+    session = FakeSession(handler)
+    metadata_cache = MetadataCache(str(tmp_path / 'metadata'), ttl, mode)
+    return session, ModrinthClient(session, None, metadata_cache=metadata_cache)
+
+
+def test_metadata_cache_uses_fresh_responses(tmp_path):
+    session, client = metadata_client(tmp_path, lambda method, url, kwargs: (200, {'slug': 'sodium'}, {}))
+
+    assert client.get_project('sodium') == {'slug': 'sodium'}
+    assert client.get_project('sodium') == {'slug': 'sodium'}
+
+    assert len(session.requests) == 1
+    assert client.metadata_cache.report()['fresh'] == 1
+
+
+def test_metadata_cache_revalidates_expired_responses(tmp_path):
+    def handler(method, url, kwargs):
+        if kwargs['headers'].get('If-None-Match') == '"v1"':
+            return 304, b'', {'ETag': '"v1"'}
+        return 200, {'slug': 'sodium'}, {'ETag': '"v1"'}
+    session, client = metadata_client(tmp_path, handler, ttl=0)
+
+    assert client.get_project('sodium') == {'slug': 'sodium'}
+    assert client.get_project('sodium') == {'slug': 'sodium'}
+
+    assert session.requests[1][2]['headers'] == {'If-None-Match': '"v1"'}
+    assert client.metadata_cache.report()['revalidated'] == 1
+
+
+def test_metadata_cache_revalidates_fresh_responses_on_request(tmp_path):
+    def handler(method, url, kwargs):
+        if kwargs['headers'].get('If-None-Match') == '"v1"':
+            return 304, b'', {'ETag': '"v1"'}
+        return 200, {'slug': 'fabric-api', 'versions': ['a']}, {'ETag': '"v1"'}
+    session, client = metadata_client(tmp_path, handler)
+
+    client.get_project('fabric-api')
+    assert client.get_project('fabric-api', revalidate=True) == {'slug': 'fabric-api', 'versions': ['a']}
+
+    assert len(session.requests) == 2
+    assert session.requests[1][2]['headers'] == {'If-None-Match': '"v1"'}
+    assert client.metadata_cache.report()['revalidated'] == 1
+
+
+def test_metadata_cache_falls_back_to_stale_responses_during_outage(tmp_path):
+    session, client = metadata_client(tmp_path, lambda method, url, kwargs: (200, {'slug': 'sodium'}, {}), ttl=0)
+    client.get_project('sodium')
+    session.handler = lambda method, url, kwargs: (503, b'', {})
+
+    assert client.get_project('sodium') == {'slug': 'sodium'}
+    assert client.metadata_cache.report()['stale'] == 1
+
+
+def test_metadata_cache_offline_mode(tmp_path):
+    session, client = metadata_client(tmp_path, lambda method, url, kwargs: (200, {'slug': 'sodium'}, {}))
+    client.get_project('sodium')
+    session, client = metadata_client(tmp_path, None, mode='offline', ttl=0)
+
+    assert client.get_project('sodium') == {'slug': 'sodium'}
+    with pytest.raises(Exception, match='offline cache mode'):
+        client.get_project('lithium')
+    assert session.requests == []
@@ -0,0 +1,127 @@
+import pytest
+
+from ansible.module_utils.fabricmc_pregen import can_resume, is_done, load_state, pregenerate, save_state
+from ansible.module_utils.fabricmc_rcon import RconClient
+
+
+class FakeChunky:
+    """Answers Chunky's commands, its task processes a quarter of 400 chunks per progress poll."""
+
+    def __init__(self, saved_task=False, continue_response=None):
+        self.saved_task = saved_task
+        self.continue_response = continue_response
+        self.chunks = 100 if saved_task else None
+
+    def __call__(self, command):
+        if command == 'chunky continue':
+            if self.continue_response:
+                return self.continue_response
+            return 'Task continuing for minecraft:overworld.'
+        if command == 'chunky start':
+            if self.saved_task:
+                return 'Task already exists for minecraft:overworld. Use /chunky confirm to overwrite it.'
+            self.chunks = 0
+            return 'Task started for minecraft:overworld at 0, 0 with radius 160.'
+        if command == 'chunky confirm':
+            self.chunks = 0
+            return 'Task started for minecraft:overworld at 0, 0 with radius 160.'
+        if command == 'chunky progress':
+            if self.chunks is None or self.chunks >= 400:
+                return 'No tasks running.'
+            self.chunks += 100
+            return (f'Task running for minecraft:overworld. Processed: {self.chunks} chunks '
+                    f'({self.chunks / 4:.2f}%), ETA: 0:00:10, Rate: 10.0 cps, Current: 1, 2')
+        return 'ok'
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def run_pregen(rcon_server, logger, chunky, resume=False):
+    server = rcon_server(chunky)
+    clock = FakeClock()
+    progress = []
+    with RconClient('127.0.0.1', server.port, 'secret') as rcon:
+        result = pregenerate(rcon, 160, resume, 10, logger, progress.append, clock=clock, sleep=clock.sleep)
+    return server.commands, progress, result
+
+
+def test_pregenerate_starts_task_and_reports_progress_until_done(rcon_server, logger):
+    commands, progress, result = run_pregen(rcon_server, logger, FakeChunky())
+
+    assert commands[:4] == ['chunky world minecraft:overworld', 'chunky spawn', 'chunky radius 160', 'chunky start']
+    assert [sample['chunks'] for sample in progress] == [100, 200, 300, 400]
+    assert progress[1]['chunks_per_second'] == 10.0
+    assert progress[1]['eta_seconds'] == 20.0
+    assert result == {
+        'chunks': 400, 'percent': 100.0, 'chunks_per_second': 10.0, 'eta_seconds': 0, 'seconds': 40.0, 'finished': True
+    }
+
+
+def test_pregenerate_continues_interrupted_task(rcon_server, logger):
+    commands, progress, result = run_pregen(rcon_server, logger, FakeChunky(saved_task=True), resume=True)
+
+    assert commands[0] == 'chunky continue'
+    assert 'chunky start' not in commands
+    assert [sample['chunks'] for sample in progress] == [200, 300, 400]
+
+
+def test_pregenerate_replaces_saved_task_it_cannot_continue(rcon_server, logger):
+    chunky = FakeChunky(saved_task=True, continue_response='No tasks to continue.')
+
+    commands, progress, result = run_pregen(rcon_server, logger, chunky, resume=True)
+
+    assert commands[:6] == [
+        'chunky continue', 'chunky world minecraft:overworld', 'chunky spawn', 'chunky radius 160', 'chunky start',
+        'chunky confirm',
+    ]
+    assert result['chunks'] == 400
+
+
+def test_pregenerate_pauses_on_timeout_and_next_run_continues(rcon_server, logger):
+    chunky = FakeChunky()
+    server = rcon_server(chunky)
+    clock = FakeClock()
+
+    with RconClient('127.0.0.1', server.port, 'secret') as rcon:
+        result = pregenerate(rcon, 160, False, 10, logger, timeout=20, clock=clock, sleep=clock.sleep)
+    assert (result['finished'], result['chunks'], result['percent']) == (False, 200, 50.0)
+    assert server.commands[-1] == 'chunky pause'
+
+    with RconClient('127.0.0.1', server.port, 'secret') as rcon:
+        result = pregenerate(rcon, 160, True, 10, logger, timeout=20, clock=clock, sleep=clock.sleep)
+    assert (result['finished'], result['chunks']) == (True, 400)
+    assert server.commands[4:] == ['chunky progress', 'chunky progress', 'chunky pause', 'chunky continue',
+                                   'chunky progress', 'chunky progress']
+
+
+def test_pregenerate_fails_when_chunky_does_not_start(rcon_server, logger):
+    with pytest.raises(Exception, match='Chunky did not start'):
+        run_pregen(rcon_server, logger, lambda command: 'Unknown or incomplete command')
+
+
+def test_state_resumes_only_the_world_owning_chunky_task(tmp_path):
+    state = load_state(str(tmp_path))
+    state['worlds'] = {
+        'world': {'radius': 160, 'status': 'running'},
+        'other': {'radius': 160, 'status': 'done'},
+    }
+    state['chunky_task'] = 'world'
+    save_state(str(tmp_path), state)
+    state = load_state(str(tmp_path))
+
+    assert can_resume(state, 'world', 160)
+    assert not can_resume(state, 'world', 320)
+    assert is_done(state, 'other', 160)
+    assert not is_done(state, 'other', 320)
+    state['chunky_task'] = 'other'
+    assert not can_resume(state, 'world', 160)
@@ -0,0 +1,50 @@
+import os
+
+from ansible.module_utils.fabricmc_properties import merge_properties, read_properties
+from ansible.module_utils.fabricmc_rcon import rcon_settings
+
+
+def test_merge_properties_updates_and_appends_in_one_write(tmp_path):
+    path = tmp_path / 'server.properties'
+    path.write_text('#Minecraft server properties\nmotd=A Minecraft Server\npvp=true\n')
+
+    changed = merge_properties(str(path), {'motd': 'Managed by Ansible', 'pvp': True, 'view-distance': 8})
+
+    assert changed == ['motd', 'view-distance']
+    assert path.read_text() == (
+        '#Minecraft server properties\nmotd=Managed by Ansible\npvp=true\nview-distance=8\n'
+    )
+
+
+def test_merge_properties_leaves_unchanged_file_alone(tmp_path):
+    path = tmp_path / 'server.properties'
+    path.write_text('pvp=false\n')
+    os.utime(path, (1, 1))
+
+    assert merge_properties(str(path), {'pvp': False}) == []
+    assert os.stat(path).st_mtime == 1
+
+
+def test_read_properties_skips_comments_and_missing_file(tmp_path):
+    path = tmp_path / 'server.properties'
+    assert read_properties(str(path)) == {}
+
+    path.write_text('#Minecraft server properties\nmotd=a=b\nlevel-seed=\n')
+
+    assert read_properties(str(path)) == {'motd': 'a=b', 'level-seed': ''}
+
+
+def test_properties_written_by_server_are_unescaped_and_left_alone(tmp_path):
+    path = tmp_path / 'server.properties'
+    # java.util.Properties escapes separators and non-ASCII characters
+    path.write_text('#Minecraft server properties\nenable-rcon=true\nrcon.password=a\\=b\\:c\nmotd=Caf\\u00E9 \\#1\n')
+    os.utime(path, (1, 1))
+
+    assert read_properties(str(path))['rcon.password'] == 'a=b:c'
+    assert merge_properties(str(path), {'rcon.password': 'a=b:c', 'motd': 'Café #1', 'enable-rcon': True}) == []
+    assert os.stat(path).st_mtime == 1
+    assert rcon_settings(str(path)) == (25575, 'a=b:c')
+
+    assert merge_properties(str(path), {'motd': ' Crème: brûlée'}) == ['motd']
+    assert path.read_text().splitlines()[3] == 'motd=\\ Cr\\u00E8me\\: br\\u00FBl\\u00E9e'
+    assert read_properties(str(path))['motd'] == ' Crème: brûlée'
@@ -0,0 +1,31 @@
+import pytest
+
+from ansible.module_utils.fabricmc_rcon import RconClient, rcon_settings
+
+
+def test_command_joins_responses_split_over_several_packets(rcon_server):
+    server = rcon_server(lambda command: 'x' * 5000 if command == 'help' else f'ran {command}', max_payload=4096)
+
+    with RconClient('127.0.0.1', server.port, 'secret') as rcon:
+        assert rcon.command('help') == 'x' * 5000
+        assert rcon.command('list') == 'ran list'
+
+    assert server.commands == ['help', 'list']
+
+
+def test_connect_fails_with_wrong_password(rcon_server):
+    server = rcon_server(lambda command: '')
+
+    with pytest.raises(Exception, match='RCON authentication .* failed'):
+        RconClient('127.0.0.1', server.port, 'wrong').connect()
+
+
+def test_rcon_settings_require_enabled_rcon_with_password(tmp_path):
+    path = tmp_path / 'server.properties'
+    path.write_text('enable-rcon=true\nrcon.password=secret\nrcon.port=25580\n')
+
+    assert rcon_settings(str(path)) == (25580, 'secret')
+
+    path.write_text('enable-rcon=false\nrcon.password=secret\n')
+    with pytest.raises(Exception, match='RCON is not enabled'):
+        rcon_settings(str(path))
@@ -0,0 +1,37 @@
+import sys
+
+import pytest
+
+from ansible.module_utils.fabricmc_server import boot_server
+
+FAKE_SERVER = r'''
+import sys, time
+print("[Server thread/INFO]: Starting minecraft server version 1.21.4", flush=True)
+time.sleep(float(sys.argv[1]))
+print('[Server thread/INFO]: Done (1.234s)! For help, type "help"', flush=True)
+if sys.stdin.readline().strip() == "stop":
+    print("[Server thread/INFO]: Stopping server", flush=True)
+    sys.exit(0)
+sys.exit(3)
+'''
+
+
+def fake_server(delay=0):
+    return [sys.executable, '-c', FAKE_SERVER, str(delay)]
+
+
+def test_boot_server_waits_for_done_then_stops(logger, tmp_path):
+    result = boot_server(fake_server(), str(tmp_path), 30, logger)
+
+    assert result['reported_seconds'] == 1.234
+    assert 0 < result['boot_seconds'] < 30
+
+
+def test_boot_server_fails_when_server_exits_before_done(logger, tmp_path):
+    with pytest.raises(Exception, match='exited with code 1 before it started'):
+        boot_server([sys.executable, '-c', 'print("Failed to load eula.txt"); exit(1)'], str(tmp_path), 30, logger)
+
+
+def test_boot_server_kills_server_not_done_in_time(logger, tmp_path):
+    with pytest.raises(Exception, match='did not start within 1s'):
+        boot_server(fake_server(30), str(tmp_path), 1, logger)